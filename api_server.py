@@ -0,0 +1,230 @@
+# HTTP API entry point
+"""
+API Server
+Headless HTTP API for ingesting PDFs and asking questions about them
+
+Run with:
+    python api_server.py
+or:
+    uvicorn api_server:app --workers 4
+"""
+
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import uvicorn
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+
+import config
+from database import (
+    initialize_pinecone,
+    get_index_health,
+    find_document,
+    get_document,
+    get_document_versions,
+    delete_document_vectors,
+    is_local_backend
+)
+from utils import compute_content_hash
+from utils.warmup import start_warmup, get_warmup_status
+from retrieval import get_qa_chain_for_pdf, aask_question, astream_question
+from ingestion import submit_ingestion_job, get_job
+
+
+class AskRequest(BaseModel):
+    """Body of POST /documents/{pdf_id}/ask"""
+    question: str
+    stream: bool = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Validate config, connect to Pinecone and start loading models once per worker"""
+    config.validate_config()
+    if not is_local_backend():
+        initialize_pinecone()
+    start_warmup()
+    yield
+
+
+app = FastAPI(title="RAG Chat Assistant API", lifespan=lifespan)
+
+
+def _sse_event(event: str, data) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _source_payload(source_documents: list) -> list:
+    """Serialize retrieved documents for a response"""
+    return [
+        {"content": doc.page_content, "metadata": doc.metadata}
+        for doc in source_documents
+    ]
+
+
+def _require_document(pdf_id: str) -> dict:
+    """Return the registered document or raise 404"""
+    document = get_document(pdf_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"Unknown document: {pdf_id}")
+    return document
+
+
+@app.get("/health")
+def health(probe: bool = False):
+    """
+    Liveness plus warm-up progress; 'ready' once the embedding model is loaded
+
+    Index health comes from the cached bootstrap result; pass probe=true
+    to also query the Pinecone data plane.
+    """
+    warmup = get_warmup_status()
+    ready = warmup["state"] != "running" and "embedding model load" not in warmup["errors"]
+    result = {"ready": ready, "warmup": warmup}
+    if not is_local_backend():
+        result["index"] = get_index_health(probe)
+        result["ready"] = ready and result["index"]["initialized"]
+    return result
+
+
+# Endpoints that only make blocking calls are plain functions, which
+# FastAPI runs in its threadpool instead of on the event loop
+
+@app.post("/documents")
+def upload_document(file: UploadFile = File(...)):
+    """
+    Upload a PDF for ingestion
+
+    Already indexed content is reused immediately (200). New content is
+    queued for background ingestion (202); poll GET /jobs/{job_id}.
+    """
+    pdf_bytes = file.file.read()
+    if not pdf_bytes:
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    content_hash = compute_content_hash(pdf_bytes)
+    document = find_document(content_hash)
+    if document:
+        return {
+            "pdf_id": document["pdf_id"],
+            "pdf_name": document["pdf_name"],
+            "status": document["status"],
+            "total_chunks": document["total_chunks"]
+        }
+
+    job_id = submit_ingestion_job(pdf_bytes, file.filename or "document.pdf", content_hash)
+    return JSONResponse(status_code=202, content=get_job(job_id))
+
+
+@app.put("/documents/{pdf_id}")
+def update_document(pdf_id: str, file: UploadFile = File(...)):
+    """
+    Upload a revised version of an indexed PDF
+
+    The document keeps its pdf_id: only changed chunks are embedded, and
+    questions keep being answered from the current version until the new
+    one switches in (202; poll GET /jobs/{job_id}). Content that is already
+    indexed is not re-indexed: 200 if it is this document's current
+    version, 409 if it belongs to another document.
+    """
+    _require_document(pdf_id)
+    pdf_bytes = file.file.read()
+    if not pdf_bytes:
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    content_hash = compute_content_hash(pdf_bytes)
+    document = find_document(content_hash)
+    if document:
+        if document["pdf_id"] != pdf_id:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Content already indexed as document {document['pdf_id']}"
+            )
+        return {
+            "pdf_id": document["pdf_id"],
+            "pdf_name": document["pdf_name"],
+            "status": document["status"],
+            "total_chunks": document["total_chunks"],
+            "version": document["version"]
+        }
+
+    job_id = submit_ingestion_job(
+        pdf_bytes, file.filename or "document.pdf", content_hash, update_pdf_id=pdf_id
+    )
+    return JSONResponse(status_code=202, content=get_job(job_id))
+
+
+@app.get("/documents/{pdf_id}/versions")
+def list_document_versions(pdf_id: str):
+    """Get the version history of a document, oldest first"""
+    _require_document(pdf_id)
+    return get_document_versions(pdf_id)
+
+
+@app.get("/jobs/{job_id}")
+def get_ingestion_job(job_id: str):
+    """Get the status and progress of an ingestion job"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.post("/documents/{pdf_id}/ask")
+async def ask_document(pdf_id: str, request: AskRequest):
+    """
+    Ask a question about a document
+
+    With stream=true (default) the response is a text/event-stream of a
+    "sources" event, "token" events and a final "done" event.
+    """
+    # Registry lookups and building a chain (first use loads the vector store) block
+    await run_in_threadpool(_require_document, pdf_id)
+    qa_chain = await run_in_threadpool(get_qa_chain_for_pdf, pdf_id)
+
+    if not request.stream:
+        result = await aask_question(qa_chain, request.question)
+        return {
+            "answer": result["answer"],
+            "source_documents": _source_payload(result["source_documents"])
+        }
+
+    result = await astream_question(qa_chain, request.question)
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse_event("sources", _source_payload(result["source_documents"]))
+        try:
+            async for token in result["answer_stream"]:
+                yield _sse_event("token", token)
+        except Exception as e:
+            yield _sse_event("error", str(e))
+            return
+        yield _sse_event("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.delete("/documents/{pdf_id}", status_code=204)
+def delete_document(pdf_id: str):
+    """Delete a document's vectors, registry entry and cached answers"""
+    _require_document(pdf_id)
+    delete_document_vectors(pdf_id)
+    return Response(status_code=204)
+
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "api_server:app",
+        host=config.API_HOST,
+        port=config.API_PORT,
+        workers=config.API_WORKERS
+    )
@@ -4,29 +4,34 @@ Main Application File
 Orchestrates all modules and handles user interactions
 """
 
-import uuid
-from io import BytesIO
-
 # Import custom modules
 import config
-from database import initialize_pinecone, store_embeddings
-from utils import extract_text_from_pdf, chunk_text
-from retrieval import build_qa_chain, ask_question
+from database import initialize_pinecone, find_document, is_local_backend
+from utils import compute_content_hash
+from utils.warmup import start_warmup
+from retrieval import get_qa_chain_for_pdf, stream_question
+from ingestion import submit_ingestion_job
 from frontend import (
     display_header,
     display_pdf_uploader,
     display_question_input,
-    display_answer,
+    display_answer_stream,
     display_source_documents,
     display_sidebar_info,
     display_error,
     display_success,
     display_info,
+    display_ingestion_progress,
     initialize_session_state,
     update_pdf_session,
     is_pdf_loaded,
     get_current_pdf_id,
     get_current_pdf_name,
+    get_current_pdf_hash,
+    set_ingestion_job,
+    get_ingestion_job_status,
+    set_failed_pdf_hash,
+    get_failed_pdf_hash,
     get_qa_chain,
     add_to_chat_history,
     display_chat_history,
@@ -34,50 +39,83 @@ from frontend import (
 )
 
 
-def process_pdf_upload(uploaded_file):
+def process_pdf_upload(uploaded_file, content_hash: str = None):
     """
     Process uploaded PDF file
     
+    PDFs whose content was already indexed (by this or any other session)
+    reuse the existing namespace instead of being embedded again. New PDFs
+    are queued for background ingestion so the page stays responsive.
+    
     Args:
         uploaded_file: Streamlit uploaded file object
+        content_hash: Precomputed content hash of the PDF bytes (optional)
         
     Returns:
-        tuple: (pdf_id, pdf_name, qa_chain) or (None, None, None) on error
+        tuple: (pdf_id, pdf_name, qa_chain) for an already indexed PDF,
+        otherwise (None, None, None)
     """
     try:
-        # Generate unique ID for this PDF
-        pdf_id = str(uuid.uuid4())
         pdf_name = uploaded_file.name
         
         # Read file from memory
-        pdf_bytes = uploaded_file.read()
-        pdf_buffer = BytesIO(pdf_bytes)
-        
-        # Extract text
-        display_info("📖 Extracting text from PDF...")
-        text = extract_text_from_pdf(pdf_buffer)
-        
-        if len(text.strip()) < 100:
-            display_error("PDF appears to be empty or has no extractable text")
-            return None, None, None
-        
-        # Chunk text
-        display_info("✂️ Splitting text into chunks...")
-        chunks = chunk_text(text)
+        pdf_bytes = uploaded_file.getvalue()
+        if content_hash is None:
+            content_hash = compute_content_hash(pdf_bytes)
+        
+        # Skip ingestion if this exact document is already indexed
+        document = find_document(content_hash)
+        if document:
+            display_info("♻️ Document already indexed, reusing stored embeddings...")
+            qa_chain = get_qa_chain_for_pdf(document['pdf_id'])
+            return document['pdf_id'], pdf_name, qa_chain
+        
+        # Extract, chunk, embed and store on the ingestion worker pool
+        job_id = submit_ingestion_job(pdf_bytes, pdf_name, content_hash)
+        set_ingestion_job(job_id)
+        return None, None, None
+    
+    except Exception as e:
+        display_error(f"Error processing PDF: {str(e)}")
+        return None, None, None
+
+
+def track_ingestion_job():
+    """
+    Report on this session's background ingestion job
+    
+    Loads the PDF as soon as it becomes queryable (streaming ingestion
+    keeps indexing the rest of it) and shows live progress until done.
+    """
+    job = get_ingestion_job_status()
+    if job is None:
+        return
+    
+    try:
+        if job['status'] == 'failed':
+            # Not resubmitted on later reruns while the same file stays uploaded
+            set_failed_pdf_hash(job['content_hash'])
+            set_ingestion_job(None)
+            display_error(f"Error processing PDF: {job['error']}")
+            return
         
-        # Create embeddings and store in Pinecone
-        display_info(f"🔍 Creating embeddings for {len(chunks)} chunks...")
-        store_embeddings(chunks, pdf_id, pdf_name)
+        if job['queryable'] and job['pdf_id'] != get_current_pdf_id():
+            display_info("🤖 Initializing QA system...")
+            get_qa_chain_for_pdf(job['pdf_id'])
+            update_pdf_session(job['pdf_id'], job['pdf_name'], job['content_hash'])
         
-        # Build QA chain
-        display_info("🤖 Initializing QA system...")
-        qa_chain = build_qa_chain(pdf_id)
+        if job['status'] == 'done':
+            set_ingestion_job(None)
+            display_success(f"PDF '{job['pdf_name']}' processed successfully!")
+            display_info("You can now ask questions about the document below")
+            return
         
-        return pdf_id, pdf_name, qa_chain
+        if job['queryable']:
+            display_info("You can already ask questions; the rest of the document is still being indexed")
+        display_ingestion_progress(get_ingestion_job_status, job['queryable'])
     
     except Exception as e:
         display_error(f"Error processing PDF: {str(e)}")
-        return None, None, None
 
 
 def handle_question(question: str):
@@ -94,19 +132,19 @@ def handle_question(question: str):
             display_error("Please upload a PDF first")
             return
         
-        # Process question
+        # Retrieve context; generation starts when the stream is consumed
         display_info("🔍 Searching for answer...")
-        result = ask_question(qa_chain, question)
+        result = stream_question(qa_chain, question)
         
-        # Display answer
-        display_answer(result['answer'])
-        
-        # Display source documents
+        # Display source documents as soon as retrieval is done
         if result.get('source_documents'):
             display_source_documents(result['source_documents'])
         
+        # Display answer tokens as they are generated
+        answer = display_answer_stream(result['answer_stream'])
+        
         # Add to chat history
-        add_to_chat_history(question, result['answer'])
+        add_to_chat_history(question, answer)
     
     except Exception as e:
         display_error(f"Error processing question: {str(e)}")
@@ -115,20 +153,24 @@ def handle_question(question: str):
 def main():
     """Main application function"""
     
+    # Load models in the background so the first question doesn't pay for it
+    start_warmup()
+    
     # Display header
     display_header()
     
     # Initialize session state
     initialize_session_state()
     
-    # Check Pinecone connection
-    try:
-        initialize_pinecone()
-        display_success("Connected to Pinecone")
-    except Exception as e:
-        display_error(f"Failed to connect to Pinecone: {str(e)}")
-        display_info("Please check your PINECONE_API_KEY environment variable")
-        return
+    # Check Pinecone connection (not needed for the local vector store)
+    if not is_local_backend():
+        try:
+            initialize_pinecone()  # Bootstraps once per process; no network call on reruns
+            display_success("Connected to Pinecone")
+        except Exception as e:
+            display_error(f"Failed to connect to Pinecone: {str(e)}")
+            display_info("Please check your PINECONE_API_KEY environment variable")
+            return
     
     # Display sidebar
     display_sidebar_info(
@@ -140,14 +182,25 @@ def main():
     uploaded_file = display_pdf_uploader()
     
     if uploaded_file is not None:
-        # Process PDF
-        pdf_id, pdf_name, qa_chain = process_pdf_upload(uploaded_file)
-        
-        if pdf_id and pdf_name and qa_chain:
-            # Update session
-            update_pdf_session(pdf_id, pdf_name, qa_chain)
-            display_success(f"PDF '{pdf_name}' processed successfully!")
-            display_info("You can now ask questions about the document below")
+        content_hash = compute_content_hash(uploaded_file.getvalue())
+        
+        job = get_ingestion_job_status()
+        if content_hash != get_failed_pdf_hash():
+            set_failed_pdf_hash(None)
+        
+        # Streamlit reruns the script on every interaction; only process new uploads
+        if (content_hash != get_current_pdf_hash() and content_hash != get_failed_pdf_hash() and
+                (job is None or job['content_hash'] != content_hash)):
+            pdf_id, pdf_name, qa_chain = process_pdf_upload(uploaded_file, content_hash)
+            
+            if pdf_id and pdf_name and qa_chain:
+                # Update session
+                update_pdf_session(pdf_id, pdf_name, content_hash)
+                display_success(f"PDF '{pdf_name}' processed successfully!")
+                display_info("You can now ask questions about the document below")
+    
+    # Progress of a PDF being ingested in the background
+    track_ingestion_job()
     
     # Question Section (only show if PDF is loaded)
     if is_pdf_loaded():
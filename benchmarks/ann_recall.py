@@ -0,0 +1,91 @@
+# ANN recall benchmark
+"""
+ANN Recall Benchmark
+Measures recall@TOP_K_RESULTS and query latency of the IVF-PQ index
+against exact search over the same vectors
+
+Vectors are synthetic: a low-rank mixture with noise, L2-normalized like
+sentence embeddings. Queries are held-out draws from the same
+distribution, so their neighbours are similar but not near-duplicates.
+
+Usage:
+    python benchmarks/ann_recall.py --vectors 20000 --queries 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from database.ann_index import IVFPQIndex
+from database.local_vector_store import LocalVectorStore, _normalize
+
+
+def make_vectors(count: int, dim: int, noise: float, seed: int = 0) -> np.ndarray:
+    """Clustered low-rank vectors with isotropic noise, normalized"""
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((64, dim)).astype(np.float32)
+    centers = rng.standard_normal((256, 64)).astype(np.float32)
+    latent = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.standard_normal((count, 64))
+    vectors = latent.astype(np.float32) @ basis + noise * rng.standard_normal((count, dim)).astype(np.float32)
+    return _normalize(vectors)
+
+
+def percentiles(samples: list) -> str:
+    """p50 / p99 of latency samples in milliseconds"""
+    p50, p99 = np.percentile(np.array(samples) * 1000, [50, 99])
+    return f"p50 {p50:6.2f} ms  p99 {p99:6.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=config.TOP_K_RESULTS)
+    parser.add_argument("--noise", type=float, default=20.0, help="Per-dimension noise (higher = harder)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+
+    dim = config.EMBEDDING_DIMENSION
+    data = make_vectors(args.vectors + args.queries, dim, args.noise)
+    vectors, queries = data[:args.vectors], data[args.vectors:]
+
+    exact_latency, truth = [], []
+    for query in queries:
+        start = time.perf_counter()
+        rows, _ = LocalVectorStore._exact_search(query, args.k, vectors)
+        exact_latency.append(time.perf_counter() - start)
+        truth.append(set(rows.tolist()))
+    print(f"{args.vectors} vectors x {dim} dims, {args.queries} queries, k={args.k}")
+    print(f"exact                          {percentiles(exact_latency)}")
+
+    index = IVFPQIndex(
+        nlist=config.IVF_NLIST,
+        subvectors=config.PQ_SUBVECTORS,
+        min_train_size=config.ANN_MIN_TRAIN_SIZE
+    )
+    start = time.perf_counter()
+    index.sync(vectors)
+    print(f"trained {len(index.centroids)} lists in {time.perf_counter() - start:.1f}s")
+
+    for nprobe in args.nprobe:
+        for rerank in args.rerank:
+            index.nprobe, index.rerank_factor = nprobe, rerank
+            hits, latency = 0, []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                result = index.search(query, args.k, vectors)
+                latency.append(time.perf_counter() - start)
+                if result is not None:
+                    hits += len(expected & set(result[0].tolist()))
+            recall = hits / (len(queries) * args.k)
+            print(f"nprobe {nprobe:3d} rerank {rerank:2d}  recall@{args.k} {recall:.3f}  {percentiles(latency)}")
+
+
+if __name__ == "__main__":
+    main()
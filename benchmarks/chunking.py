@@ -0,0 +1,87 @@
+# Chunking benchmark
+"""
+Chunking Benchmark
+Throughput and peak allocation of split_spans() versus LangChain's
+RecursiveCharacterTextSplitter on PDF-style and newline-free text
+
+Usage:
+    python benchmarks/chunking.py --megabytes 1 --repeat 5
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from utils.pdf_processor import CHUNK_SEPARATORS, split_spans
+
+
+def make_texts(size: int) -> dict:
+    """PDF-style lines (short lines, paragraph breaks) and newline-free prose of about size chars"""
+    rng = random.Random(0)
+    words = "the supplier shall inspect pump valve AB-1234 under clause 4.2.1 every month and record".split()
+
+    lines = []
+    while sum(len(line) + 1 for line in lines) < size:
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(4, 14))) + "."
+        lines.append(line + ("\n" if rng.random() < 0.1 else ""))
+    prose = []
+    while sum(len(sentence) + 2 for sentence in prose) < size:
+        prose.append(" ".join(rng.choice(words) for _ in range(rng.randint(6, 25))))
+
+    return {"PDF-style lines": "\n".join(lines), "newline-free prose": ". ".join(prose)}
+
+
+def measure(function, text: str, repeat: int) -> tuple:
+    """Best-of-repeat MB/s and peak traced allocation in MB"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(text)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(text) / best / 1e6, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    candidates = {
+        "split_spans (offsets)": lambda text: split_spans(text),
+        "split_spans (strings)": lambda text: [text[start:end] for start, end in split_spans(text)]
+    }
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=config.CHUNK_SIZE,
+            chunk_overlap=config.CHUNK_OVERLAP,
+            length_function=len,
+            separators=CHUNK_SEPARATORS
+        )
+        candidates["RecursiveCharacterTextSplitter"] = splitter.split_text
+    except ImportError:
+        print("langchain-text-splitters not installed; timing split_spans only")
+
+    print(f"CHUNK_SIZE {config.CHUNK_SIZE}, CHUNK_OVERLAP {config.CHUNK_OVERLAP}")
+    for label, text in make_texts(int(args.megabytes * 1e6)).items():
+        print(f"{label} ({len(text) / 1e6:.1f} MB)")
+        for name, function in candidates.items():
+            throughput, peak = measure(function, text, args.repeat)
+            print(f"  {name:32} {throughput:7.1f} MB/s   peak {peak:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
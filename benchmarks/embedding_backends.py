@@ -0,0 +1,87 @@
+# Embedding backend benchmark
+"""
+Embedding Backend Benchmark
+Throughput and query latency of the torch and ONNX Runtime (int8)
+embedding backends on the same synthetic chunks, plus their agreement
+(cosine similarity per chunk)
+
+Needs sentence-transformers and optimum[onnxruntime]; the ONNX export is
+created under ONNX_MODEL_DIR on first run.
+
+Usage:
+    python benchmarks/embedding_backends.py --chunks 256 --queries 50
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from utils.embeddings import _create_torch_embeddings
+from utils.onnx_embeddings import load_onnx_embeddings
+
+
+def make_chunks(count: int, rng: np.random.Generator) -> list:
+    """Chunks of roughly CHUNK_SIZE characters built from a small vocabulary"""
+    words = ("pump valve inspection clause supplier warranty pressure maintenance schedule "
+             "temperature record agreement termination notice section table operating").split()
+    chunks = []
+    for i in range(count):
+        text = f"Section {i}. "
+        while len(text) < config.CHUNK_SIZE:
+            text += " ".join(rng.choice(words, 12)) + ". "
+        chunks.append(text)
+    return chunks
+
+
+def benchmark(name: str, embeddings, chunks: list, queries: list) -> np.ndarray:
+    """Print throughput and query latency; returns the chunk vectors"""
+    embeddings.embed_documents(chunks[:8])  # Warm up kernels and allocators
+
+    start = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(chunks))
+    seconds = time.perf_counter() - start
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embeddings.embed_query(query)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+
+    print(f"{name:6} {len(chunks) / seconds:8.1f} chunks/s   query p50 {p50:6.1f} ms  p99 {p99:6.1f} ms")
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    chunks = make_chunks(args.chunks, rng)
+    queries = [f"How often is the pump in section {i} inspected?" for i in range(args.queries)]
+
+    torch_embeddings = _create_torch_embeddings()
+    onnx_model = load_onnx_embeddings(lambda: torch_embeddings)
+    if onnx_model is None:
+        print("ONNX backend unavailable or failed parity; nothing to compare")
+        return
+
+    print(f"{config.EMBEDDING_MODEL_NAME}, {args.chunks} chunks of ~{config.CHUNK_SIZE} chars, "
+          f"batch size {config.EMBEDDING_BATCH_SIZE}")
+    torch_vectors = benchmark("torch", torch_embeddings, chunks, queries)
+    onnx_vectors = benchmark("onnx", onnx_model, chunks, queries)
+
+    cosines = np.sum(torch_vectors * onnx_vectors, axis=1)
+    print(f"cosine torch vs onnx: min {cosines.min():.4f}  mean {cosines.mean():.4f}  "
+          f"(threshold {config.ONNX_PARITY_THRESHOLD})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# PDF extraction benchmark
+"""
+PDF Extraction Benchmark
+Times iter_pages_from_pdf on a synthetic many-page PDF with serial
+extraction versus the parallel page-range worker pool, and checks both
+return the same text. Speed-ups need as many free cores as workers.
+
+Usage:
+    python benchmarks/pdf_extraction.py --pages 1000 --workers 0
+"""
+
+import os
+import sys
+import time
+import argparse
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from utils.pdf_processor import iter_pages_from_pdf
+
+
+def make_pdf(pages: int, lines: int = 40) -> bytes:
+    """
+    Build a text-only PDF with one Helvetica content stream per page
+
+    Args:
+        pages: Number of pages
+        lines: Lines of text per page
+
+    Returns:
+        bytes: PDF file content
+    """
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Page tree, filled in once the page object numbers are known
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    page_numbers = []
+    for page in range(pages):
+        text = " ".join(
+            f"(Section {page}.{line}: clause AB-{page * lines + line} lorem ipsum dolor sit amet.) '"
+            for line in range(lines)
+        )
+        stream = f"BT /F1 10 Tf 50 770 Td 12 TL {text} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+            f"/Resources << /Font << /F1 3 0 R >> >> >>"
+        )
+        page_numbers.append(len(objects))
+    kids = " ".join(f"{number} 0 R" for number in page_numbers)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>"
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, content in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{content}\nendobj\n".encode("latin-1")
+
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode("latin-1")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(output)
+
+
+def time_extraction(pdf_bytes: bytes, workers: int) -> tuple:
+    """Extract every page with the given worker setting; returns (seconds, pages)"""
+    config.PDF_EXTRACTION_WORKERS = workers
+    start = time.perf_counter()
+    pages = list(iter_pages_from_pdf(BytesIO(pdf_bytes)))
+    return time.perf_counter() - start, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=0, help="Parallel workers (0 = all CPU cores)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pdf_bytes = make_pdf(args.pages)
+    print(f"Generated {args.pages}-page PDF ({len(pdf_bytes) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+    serial_seconds, serial_pages = time_extraction(pdf_bytes, 1)
+    print(f"serial                 {serial_seconds:6.2f}s  {args.pages / serial_seconds:7.1f} pages/s")
+
+    workers = args.workers or os.cpu_count()
+    # The first parallel run includes spawning the worker processes
+    for label in ("parallel (cold pool)", "parallel (warm pool)"):
+        seconds, pages = time_extraction(pdf_bytes, workers)
+        assert pages == serial_pages, "parallel extraction returned different text"
+        print(f"{label:22} {seconds:6.2f}s  {args.pages / seconds:7.1f} pages/s  "
+              f"{serial_seconds / seconds:.1f}x with {workers} workers")
+
+
+if __name__ == "__main__":
+    main()
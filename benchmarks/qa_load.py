@@ -0,0 +1,150 @@
+# QA load test
+"""
+QA Load Test
+Concurrent-question throughput of the async path (aask_question on one
+event loop) versus the sync path (ask_question on a thread pool)
+
+Retrieval runs for real against a synthetic document in the local vector
+store; generation is a stub that waits --llm-latency seconds in place of
+Ollama. --stub-embeddings replaces the embedding model with a hashing
+embedding so no model has to be downloaded.
+
+Usage:
+    python benchmarks/qa_load.py --questions 200 --concurrency 50 --threads 8
+"""
+
+import os
+import sys
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before config is imported
+os.environ.setdefault("RAG_DATA_DIR", tempfile.mkdtemp(prefix="rag-bench-"))
+os.environ["VECTOR_STORE_BACKEND"] = "local"
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda
+import config
+import utils.embeddings
+from utils.pdf_processor import iter_chunk_spans
+from database.document_store import write_document_text
+from database.document_registry import register_document
+from database.vector_store import store_embeddings
+from retrieval.retriever import create_retriever
+from retrieval.qa_chain import QAChainWrapper, ask_question, aask_question
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag-of-words hashing embedding; deterministic and model-free"""
+
+    def _embed(self, text: str) -> list:
+        vector = np.zeros(config.EMBEDDING_DIMENSION, dtype=np.float32)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % len(vector)] += 1.0
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+
+def make_answer_chain(latency: float) -> RunnableLambda:
+    """Stub generation step that waits like an LLM call (blocking or awaited)"""
+    def answer(inputs: dict) -> str:
+        time.sleep(latency)
+        return f"Stub answer using {len(inputs['context'])} context chars"
+
+    async def aanswer(inputs: dict) -> str:
+        await asyncio.sleep(latency)
+        return f"Stub answer using {len(inputs['context'])} context chars"
+
+    return RunnableLambda(answer, afunc=aanswer)
+
+
+def index_document(pdf_id: str, pages: int) -> int:
+    """Ingest a synthetic document into the local store; returns its chunk count"""
+    page_texts = [
+        "\n".join(
+            f"Clause {page}.{line}: the supplier shall inspect pump AB-{page * 20 + line} every "
+            f"{line + 1} months and record the result in the maintenance log."
+            for line in range(20)
+        )
+        for page in range(pages)
+    ]
+    write_document_text(pdf_id, page_texts)
+    spans = list(iter_chunk_spans(page_texts))
+    store_embeddings([span["text"] for span in spans], pdf_id, "load-test.pdf", spans)
+    register_document(f"load-test-{pdf_id}", pdf_id, "load-test.pdf", len(spans))
+    return len(spans)
+
+
+def summarize(label: str, seconds: float, latencies: list):
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    print(f"{label:28} {len(latencies) / seconds:7.1f} questions/s  "
+          f"p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  ({seconds:.1f}s total)")
+
+
+def run_sync(qa_chain: QAChainWrapper, questions: list, threads: int):
+    def timed(question: str) -> float:
+        start = time.perf_counter()
+        ask_question(qa_chain, question)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(timed, questions))
+    summarize(f"sync ({threads} threads)", time.perf_counter() - start, latencies)
+
+
+async def run_async(qa_chain: QAChainWrapper, questions: list, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def timed(question: str) -> float:
+        async with slots:
+            start = time.perf_counter()
+            await aask_question(qa_chain, question)
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(question) for question in questions))
+    summarize(f"async ({concurrency} in flight)", time.perf_counter() - start, latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="Questions in flight on the event loop")
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads for the sync path")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per stub generation")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--stub-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    if args.stub_embeddings:
+        utils.embeddings._embedding_model = HashingEmbeddings()
+    # Every question must go through retrieval and generation
+    config.ANSWER_CACHE_ENABLED = False
+
+    pdf_id = "load-test"
+    print(f"Indexed {index_document(pdf_id, args.pages)} chunks; "
+          f"{args.questions} questions, stub LLM latency {args.llm_latency}s")
+
+    qa_chain = QAChainWrapper(make_answer_chain(args.llm_latency), create_retriever(pdf_id), pdf_id)
+    questions = [f"How often is pump AB-{i * 7} inspected under clause {i % args.pages}.{i % 20}?"
+                 for i in range(args.questions)]
+
+    run_sync(qa_chain, questions, args.threads)
+    asyncio.run(run_async(qa_chain, questions, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,30 +14,126 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY", "")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT", "us-east-1")
 INDEX_NAME = "chat-assistant"
 PINECONE_CLOUD = "aws"
+INDEX_READY_TIMEOUT_SECONDS = 300  # How long to wait for a new index to become ready
+INDEX_INFO_TTL_SECONDS = 3600  # Reuse the cached index description this long
+INDEX_INFO_RECHECK_SECONDS = 30  # After a failed data-plane call, describe the index again at most this often
 
 # ==================== EMBEDDING CONFIGURATION ====================
-EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-EMBEDDING_DIMENSION = 384
+EMBEDDING_MODEL_NAME = "BAAI/bge-large-en-v1.5"
+EMBEDDING_DIMENSION = 1024       # Must match the Pinecone index dimension
+EMBEDDING_MAX_TOKENS = 512       # Model max sequence length; longer inputs are truncated
+EMBEDDING_BATCH_SIZE = 32        # Texts per forward pass inside the model
+EMBEDDING_NUM_THREADS = 0        # Torch/ONNX Runtime intra-op threads; 0 = all CPU cores
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx"
+ONNX_QUANTIZE = True             # Dynamic int8 quantization of the exported graph
+ONNX_QUANTIZATION_TARGET = "avx2"  # "avx2", "avx512", "avx512_vnni" or "arm64"
+ONNX_PARITY_THRESHOLD = 0.99     # Min cosine vs torch outputs, else fall back to torch
+INGESTION_BATCH_SIZE = 128       # Chunks embedded and upserted per pipeline step
+INGESTION_QUEUE_SIZE = 4         # Batches buffered between streaming ingestion stages
+STREAMING_INGESTION = True       # Pipeline extract → chunk → embed → upsert page by page
+INGESTION_MAX_CONCURRENT_JOBS = 2    # Background ingestion jobs running at once
+EMBEDDING_MAX_CONCURRENT_BATCHES = 1  # Ingestion batches in the embedding model at once
+QUERY_BATCHING_ENABLED = True    # Coalesce concurrent query embeddings into one forward pass
+QUERY_BATCH_MAX_SIZE = 32        # Queries per coalesced forward pass
+QUERY_BATCH_MAX_WAIT_MS = 5      # How long the first query waits for others to join its batch
 
 # ==================== TEXT PROCESSING CONFIGURATION ====================
-CHUNK_SIZE = 1000
+CHUNK_LENGTH_UNIT = os.getenv("CHUNK_LENGTH_UNIT", "chars")  # "chars" or "tokens" (embedding tokenizer)
+CHUNK_SIZE = 1000                # Characters per chunk in "chars" mode
 CHUNK_OVERLAP = 200
+CHUNK_OVERLAP_TOKENS = 64        # Overlap in "tokens" mode; chunks fill EMBEDDING_MAX_TOKENS
+CHUNK_CHARS_PER_TOKEN = 5        # Generous characters per embedding token; sizes the "tokens" mode chunking window
+REPORT_CHUNK_TOKENS = os.getenv("REPORT_CHUNK_TOKENS", "false").lower() == "true"  # Tokenize "chars" mode chunks to log tokens per chunk
+PDF_EXTRACTION_WORKERS = 0       # Processes for page extraction; 0 = all CPU cores
+PDF_PARALLEL_MIN_PAGES = 32      # Smaller PDFs are extracted in-process
+
+# ==================== STORAGE CONFIGURATION ====================
+DATA_DIR = os.getenv("RAG_DATA_DIR", ".rag_data")
+DOCUMENT_REGISTRY_PATH = os.path.join(DATA_DIR, "documents.db")
+INGESTION_JOBS_PATH = os.path.join(DATA_DIR, "jobs.db")
+ONNX_MODEL_DIR = os.path.join(DATA_DIR, "onnx")
+INDEX_INFO_CACHE_PATH = os.path.join(DATA_DIR, "pinecone_index.json")
+BM25_INDEX_DIR = os.path.join(DATA_DIR, "bm25")
+DOCUMENT_STORE_DIR = os.path.join(DATA_DIR, "documents")  # Extracted text, sliced into chunks on demand
+DOCUMENT_UPDATE_TIMEOUT_SECONDS = 3600  # A version still building after this long is treated as abandoned
+DOCUMENT_INDEXING_TIMEOUT_SECONDS = 3600  # A new document still indexing after this long is treated as abandoned
+INGESTION_JOB_TIMEOUT_SECONDS = 3600  # An active job without progress for this long is treated as dead
+
+# ==================== VECTOR STORE CONFIGURATION ====================
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")  # "pinecone" or "local"
+LOCAL_VECTOR_STORE_DIR = os.path.join(DATA_DIR, "vectors")
+
+# Local index type: "exact" (brute force) or "ivfpq" (approximate, for large corpora)
+LOCAL_INDEX_TYPE = os.getenv("LOCAL_INDEX_TYPE", "exact")
+IVF_NLIST = 0            # Coarse clusters; 0 = ~4*sqrt(n) at training time
+IVF_NPROBE = 16          # Clusters scanned per query (higher = better recall, slower)
+PQ_SUBVECTORS = 64       # Bytes per compressed vector; must divide EMBEDDING_DIMENSION
+ANN_RERANK_FACTOR = 16   # Candidates re-scored exactly = k * factor (>= 0.99 recall@5, see benchmarks/ann_recall.py)
+ANN_MIN_TRAIN_SIZE = 2048  # Below this many vectors exact search is used
+
+# ==================== EMBEDDING CACHE CONFIGURATION ====================
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = os.path.join(DATA_DIR, "embedding_cache.db")
+EMBEDDING_CACHE_MAX_ENTRIES = 200000  # Least recently used entries are evicted beyond this
 
 # ==================== RETRIEVAL CONFIGURATION ====================
 TOP_K_RESULTS = 5
 SIMILARITY_METRIC = "cosine"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # "hybrid" (BM25 + dense) or "dense"
+HYBRID_FETCH_K = 20      # Candidates taken from each of the sparse and dense searches
+RRF_K = 60               # Reciprocal rank fusion constant
+BM25_K1 = 1.5
+BM25_B = 0.75
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_FETCH_K = 20      # Candidates retrieved for the cross-encoder to score
+RERANK_BUDGET_MS = 150   # Fall back to retrieval order if reranking takes longer
+CONTEXT_CHARS_PER_TOKEN = 4      # Token estimate; the LLM tokenizer runs inside Ollama
+# Prompt context budget after merging overlapping chunks: room for TOP_K_RESULTS
+# full chunks (1250 tokens in "chars" mode, 2560 in "tokens" mode; llama3 has 8192)
+CONTEXT_MAX_TOKENS = TOP_K_RESULTS * (
+    EMBEDDING_MAX_TOKENS if CHUNK_LENGTH_UNIT == "tokens" else -(-CHUNK_SIZE // CONTEXT_CHARS_PER_TOKEN)
+)
+
+# ==================== QA CACHE CONFIGURATION ====================
+QUERY_CACHE_MAX_ENTRIES = 1000  # Normalized query -> embedding
+QUERY_CACHE_TTL_SECONDS = 24 * 3600
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_MAX_ENTRIES = 500  # (pdf_id, question, model, prompt version) -> answer
+ANSWER_CACHE_TTL_SECONDS = 3600
+DOCUMENT_VERSION_TTL_SECONDS = 2  # How long a process may key answers by another process's superseded version
+
+# ==================== RESOURCE REGISTRY CONFIGURATION ====================
+# Vector stores and QA chains are shared by all sessions, one per document
+VECTOR_STORE_CACHE_MAX_ENTRIES = 32
+VECTOR_STORE_CACHE_MAX_BYTES = 2 * 1024 ** 3  # Estimated local index memory; 0 = unlimited
+QA_CHAIN_CACHE_MAX_ENTRIES = 32
 
 # ==================== LLM CONFIGURATION ====================
 LLM_MODEL = "llama3:instruct"
 LLM_TEMPERATURE = 0.2
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
+# ==================== STARTUP CONFIGURATION ====================
+WARMUP_ON_START = True           # Load the embedding model and ping Ollama in the background
+WARMUP_PRELOAD_LLM = True        # Also ask Ollama to load LLM_MODEL into memory
+
+# ==================== API SERVER CONFIGURATION ====================
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "2"))  # Each worker loads its own embedding model
 
 # ==================== VALIDATION ====================
 def validate_config():
     """Validate that all required configurations are set"""
-    if not PINECONE_API_KEY:
+    if VECTOR_STORE_BACKEND not in ("pinecone", "local"):
+        raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND}")
+    if EMBEDDING_BACKEND not in ("torch", "onnx"):
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND}")
+    if CHUNK_LENGTH_UNIT not in ("chars", "tokens"):
+        raise ValueError(f"Unknown CHUNK_LENGTH_UNIT: {CHUNK_LENGTH_UNIT}")
+    if RETRIEVAL_MODE not in ("hybrid", "dense"):
+        raise ValueError(f"Unknown RETRIEVAL_MODE: {RETRIEVAL_MODE}")
+    if VECTOR_STORE_BACKEND == "pinecone" and not PINECONE_API_KEY:
         raise ValueError("PINECONE_API_KEY environment variable is not set")
     return True
-
-
-EMBEDDING_MODEL_NAME = "BAAI/bge-large-en-v1.5"  # 1024 dimensions
-EMBEDDING_DIMENSION = 1024
\ No newline at end of file
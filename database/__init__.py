@@ -1,11 +1,41 @@
 """Database package for RAG Chatbot"""
 
-from .pinecone_manager import initialize_pinecone, get_pinecone_client
-from .vector_store import store_embeddings, search_similar_chunks
+from .pinecone_manager import initialize_pinecone, get_pinecone_client, get_index_health
+from .vector_store import (
+    store_embeddings,
+    upsert_embeddings,
+    search_similar_chunks,
+    asearch_similar_chunks,
+    delete_document_vectors,
+    is_local_backend
+)
+from .document_registry import (
+    find_document,
+    get_document,
+    get_document_version,
+    register_document,
+    mark_document_ready,
+    unregister_document,
+    begin_document_version,
+    get_document_versions
+)
 
 __all__ = [
     'initialize_pinecone',
     'get_pinecone_client',
+    'get_index_health',
     'store_embeddings',
-    'search_similar_chunks'
+    'upsert_embeddings',
+    'search_similar_chunks',
+    'asearch_similar_chunks',
+    'delete_document_vectors',
+    'is_local_backend',
+    'find_document',
+    'get_document',
+    'get_document_version',
+    'register_document',
+    'mark_document_ready',
+    'unregister_document',
+    'begin_document_version',
+    'get_document_versions'
 ]
\ No newline at end of file
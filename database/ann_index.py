@@ -0,0 +1,252 @@
+# Approximate nearest neighbour index
+"""
+ANN Index Module
+IVF + product quantization index for large local namespaces
+"""
+
+import os
+from typing import Optional, Tuple
+import numpy as np
+
+
+ANN_INDEX_FILE = "ivfpq.npz"
+_KMEANS_ITERATIONS = 20
+_KMEANS_MAX_TRAIN_ROWS = 65536  # Train on a sample; assignment is done for all rows
+_ASSIGN_BLOCK_SIZE = 8192
+
+
+def _nearest_centroids(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid (L2) for every row, computed in blocks"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(data), dtype=np.int32)
+
+    for start in range(0, len(data), _ASSIGN_BLOCK_SIZE):
+        block = np.asarray(data[start:start + _ASSIGN_BLOCK_SIZE], dtype=np.float32)
+        distances = centroid_norms - 2.0 * (block @ centroids.T)
+        assignments[start:start + len(block)] = distances.argmin(axis=1)
+
+    return assignments
+
+
+def _kmeans(data: np.ndarray, k: int, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd k-means; empty clusters are re-seeded from random rows"""
+    rng = np.random.default_rng(seed)
+    if len(data) > _KMEANS_MAX_TRAIN_ROWS:
+        data = data[rng.choice(len(data), _KMEANS_MAX_TRAIN_ROWS, replace=False)]
+    data = np.asarray(data, dtype=np.float32)
+
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+
+    for _ in range(_KMEANS_ITERATIONS):
+        assignments = _nearest_centroids(data, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        if not filled.all():
+            centroids[~filled] = data[rng.choice(len(data), int((~filled).sum()), replace=False)]
+
+    return centroids
+
+
+class IVFPQIndex:
+    """
+    Inverted file index with product-quantized residuals
+
+    Vectors (L2-normalized) are assigned to the nearest of `nlist` coarse
+    centroids; the residual to that centroid is split into `subvectors`
+    pieces, each encoded as one byte. A query scans only the `nprobe`
+    closest lists, scores candidates with lookup tables and re-ranks the
+    best `k * rerank_factor` exactly against the full vectors.
+    """
+
+    def __init__(self, nlist: int = 0, nprobe: int = 8, subvectors: int = 64,
+                 rerank_factor: int = 4, min_train_size: int = 2048):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.subvectors = subvectors
+        self.rerank_factor = rerank_factor
+        self.min_train_size = min_train_size
+        self.reset()
+
+    def reset(self):
+        """Drop all trained state and encoded vectors"""
+        self.centroids = None       # (nlist, dim)
+        self.codebooks = None       # (subvectors, 256, dim / subvectors)
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.codes = np.zeros((0, self.subvectors), dtype=np.uint8)
+        self.trained_size = 0
+        self._list_order = None
+        self._list_offsets = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.assignments)
+
+    def needs_training(self, size: int) -> bool:
+        """Whether sync() on `size` vectors would (re)train the index"""
+        return size >= self.min_train_size and (not self.is_trained or size > 4 * self.trained_size)
+
+    def train(self, vectors: np.ndarray):
+        """Learn coarse centroids and PQ codebooks from the given vectors"""
+        dim = vectors.shape[1]
+        if dim % self.subvectors:
+            raise ValueError(f"Dimension {dim} is not divisible by {self.subvectors} subvectors")
+
+        nlist = self.nlist or int(np.clip(4 * np.sqrt(len(vectors)), 16, 4096))
+        self.centroids = _kmeans(vectors, nlist)
+
+        assignments = _nearest_centroids(vectors, self.centroids)
+        residuals = np.asarray(vectors, dtype=np.float32) - self.centroids[assignments]
+        sub_dim = dim // self.subvectors
+        self.codebooks = np.stack([
+            _kmeans(residuals[:, m * sub_dim:(m + 1) * sub_dim], 256, seed=m + 1)
+            for m in range(self.subvectors)
+        ])
+        self.trained_size = len(vectors)
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Coarse assignment and PQ codes for a block of vectors"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        assignments = _nearest_centroids(vectors, self.centroids)
+        residuals = vectors - self.centroids[assignments]
+
+        sub_dim = residuals.shape[1] // self.subvectors
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for m in range(self.subvectors):
+            codes[:, m] = _nearest_centroids(residuals[:, m * sub_dim:(m + 1) * sub_dim], self.codebooks[m])
+
+        return assignments, codes
+
+    def _rebuild_lists(self):
+        """Group row ids by inverted list for fast probing"""
+        self._list_order = np.argsort(self.assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(self.assignments, minlength=len(self.centroids))
+        self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def sync(self, vectors: np.ndarray, appended_from: Optional[int] = None):
+        """
+        Bring the index in line with the namespace's vector matrix
+
+        Appended rows are encoded incrementally; any other change re-encodes
+        every row. The index is (re)trained once there are enough vectors,
+        and again when the namespace has grown well past the training set.
+
+        Args:
+            vectors: Full (n, dim) normalized vector matrix
+            appended_from: Row where newly appended vectors start, if the
+                change was a pure append
+        """
+        if len(vectors) < self.min_train_size:
+            self.reset()
+            return
+
+        if self.needs_training(len(vectors)):
+            self.train(vectors)
+            appended_from = None
+
+        if appended_from is not None and appended_from == self.ntotal:
+            assignments, codes = self._encode(vectors[appended_from:])
+            self.assignments = np.concatenate([self.assignments, assignments])
+            self.codes = np.concatenate([self.codes, codes])
+        else:
+            self.assignments, self.codes = self._encode(vectors)
+
+        self._rebuild_lists()
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        vectors: np.ndarray,
+        mask: Optional[np.ndarray] = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Approximate inner-product search
+
+        Args:
+            query: Normalized query vector
+            k: Number of results
+            vectors: Full vector matrix used for exact re-ranking
+            mask: Optional boolean row mask (metadata filter)
+
+        Returns:
+            (row ids, scores) best first, or None when the index cannot
+            answer (untrained or too few candidates) and exact search
+            should be used instead
+        """
+        if not self.is_trained or self.ntotal != len(vectors):
+            return None
+
+        coarse_scores = self.centroids @ query
+        nprobe = min(self.nprobe, len(self.centroids))
+        probe = np.argpartition(-coarse_scores, nprobe - 1)[:nprobe]
+
+        candidates = np.concatenate([
+            self._list_order[self._list_offsets[l]:self._list_offsets[l + 1]] for l in probe
+        ])
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        if len(candidates) < k:
+            return None
+
+        # Score candidates with per-subvector lookup tables (asymmetric distance)
+        sub_dim = len(query) // self.subvectors
+        lookup = np.einsum(
+            "mkd,md->mk",
+            self.codebooks,
+            query.reshape(self.subvectors, sub_dim)
+        )
+        approx = coarse_scores[self.assignments[candidates]] + \
+            lookup[np.arange(self.subvectors), self.codes[candidates]].sum(axis=1)
+
+        shortlist_size = min(len(candidates), k * self.rerank_factor)
+        shortlist = candidates[np.argpartition(-approx, shortlist_size - 1)[:shortlist_size]]
+        shortlist.sort()  # Sequential reads from the memory map
+
+        exact = np.asarray(vectors[shortlist]) @ query
+        top = np.argpartition(-exact, k - 1)[:k]
+        top = top[np.argsort(-exact[top])]
+
+        return shortlist[top], exact[top]
+
+    def save(self, directory: str):
+        """Persist the index next to the namespace's vectors"""
+        path = os.path.join(directory, ANN_INDEX_FILE)
+        if not self.is_trained:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        with open(path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                codebooks=self.codebooks,
+                assignments=self.assignments,
+                codes=self.codes,
+                trained_size=np.array(self.trained_size)
+            )
+        os.replace(path + ".tmp", path)
+
+    def load(self, directory: str) -> "IVFPQIndex":
+        """Load persisted state if present; returns self"""
+        path = os.path.join(directory, ANN_INDEX_FILE)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                codebooks = data["codebooks"]
+                if codebooks.shape[0] == self.subvectors:
+                    self.centroids = data["centroids"]
+                    self.codebooks = codebooks
+                    self.assignments = data["assignments"]
+                    self.codes = data["codes"]
+                    self.trained_size = int(data["trained_size"])
+                    self._rebuild_lists()
+        return self
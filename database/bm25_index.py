@@ -0,0 +1,344 @@
+# Sparse keyword index
+"""
+BM25 Index Module
+Per-PDF inverted index for exact-term (identifier, clause number) search
+"""
+
+import os
+import re
+import json
+import math
+import shutil
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import config
+from utils.resource_registry import ResourceRegistry
+
+
+INDEX_FILE = "bm25.jsonl"
+LEGACY_INDEX_FILE = "bm25.json"
+
+# Words plus dotted/dashed identifiers such as "4.2.1", "AB-1234" or "v2/api"
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._\-/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase search terms
+
+    Compound identifiers are kept whole and also split into their parts,
+    so "AB-1234" matches both "ab-1234" and "1234".
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List[str]: Terms in order of appearance
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(re.split(r"[._\-/]", token))
+    return terms
+
+
+def _chunk_record(text: str, metadata: dict) -> Dict[str, Any]:
+    """Log record of a chunk: term counts, metadata, and the text only if it has no offsets"""
+    terms = Counter(tokenize(text))
+    record = {"metadata": dict(metadata), "length": sum(terms.values()), "terms": dict(terms)}
+    if "char_start" not in metadata:
+        record["text"] = text
+    return record
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunks of one PDF
+
+    Postings, per-chunk term counts and metadata are kept in memory and
+    persisted next to the other per-PDF data as an append-only JSON-lines
+    log with one line per added batch or deletion, so streaming ingestion
+    writes each batch once instead of re-serializing the whole index. The
+    log is compacted when deleted chunks outweigh live ones. Chunk text is
+    only kept for chunks without offsets; the others are sliced from the
+    document store. Another process's writes are picked up on the next
+    search. Searches score against NumPy copies of the postings, rebuilt
+    lazily after the index changes.
+    """
+
+    def __init__(self, pdf_id: str, directory: str = None):
+        self.pdf_id = pdf_id
+        self.directory = os.path.join(directory or config.BM25_INDEX_DIR, pdf_id)
+        self._lock = threading.RLock()
+        self._load()
+
+    def _path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _disk_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._path())
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _load(self):
+        """Load the index from disk (empty if not built yet)"""
+        self._chunks = {}    # chunk id -> {"metadata", "length", "terms"} plus "text" if it has no offsets
+        self._postings = {}  # term -> {chunk id: term frequency}
+        self._offset = 0     # Bytes of the log applied so far
+        self._log_rows = 0   # Chunk records in the log, including replaced and deleted ones
+        self._version = None
+
+        if self._disk_version() is None and os.path.exists(os.path.join(self.directory, LEGACY_INDEX_FILE)):
+            self._migrate_legacy()
+        self._read_log()
+
+    def _read_log(self):
+        """Apply log lines written since the last read (caller holds the lock)"""
+        try:
+            with open(self._path(), "rb") as f:
+                stat = os.fstat(f.fileno())
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            self._version = None
+            return
+
+        # A line still being written is applied on the next read
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self._apply(json.loads(line))
+        self._offset += end
+        self._version = stat.st_ino, stat.st_size
+        self._compiled = None
+
+    def _refresh(self):
+        """Pick up another instance's or process's writes (caller holds the lock)"""
+        version = self._disk_version()
+        if version == self._version:
+            return
+        if version is not None and self._version is not None and version[0] == self._version[0] \
+                and version[1] >= self._offset:
+            self._read_log()
+        else:
+            # Rewritten (compacted) or deleted
+            self._load()
+
+    def _apply(self, entry: Dict[str, Any]):
+        """Apply one log entry to the in-memory index (caller holds the lock)"""
+        if "delete" in entry:
+            self._remove([chunk_id for chunk_id in entry["delete"] if chunk_id in self._chunks])
+            return
+
+        records = entry["add"]
+        self._remove([chunk_id for chunk_id in records if chunk_id in self._chunks])
+        for chunk_id, record in records.items():
+            terms = record["terms"]
+            self._chunks[chunk_id] = {**record, "terms": list(terms)}
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[chunk_id] = frequency
+        self._log_rows += len(records)
+
+    def _append(self, entry: Dict[str, Any]):
+        """Append one entry to the log (caller holds the lock and has applied it)"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(), "ab") as f:
+            f.write((json.dumps(entry) + "\n").encode("utf-8"))
+            self._offset = f.tell()
+        self._version = self._disk_version()
+        self._compiled = None
+
+    def _record(self, chunk_id: str) -> Dict[str, Any]:
+        """Log form of an indexed chunk, with its term counts"""
+        chunk = self._chunks[chunk_id]
+        record = {key: value for key, value in chunk.items() if key != "terms"}
+        record["terms"] = {term: self._postings[term][chunk_id] for term in chunk["terms"]}
+        return record
+
+    def _compact(self):
+        """Rewrite the log as a single batch of the live chunks (caller holds the lock)"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path() + ".tmp"
+        with open(tmp_path, "wb") as f:
+            if self._chunks:
+                entry = {"add": {chunk_id: self._record(chunk_id) for chunk_id in self._chunks}}
+                f.write((json.dumps(entry) + "\n").encode("utf-8"))
+            offset = f.tell()
+        os.replace(tmp_path, self._path())
+        self._offset = offset
+        self._log_rows = len(self._chunks)
+        self._version = self._disk_version()
+        self._compiled = None
+
+    def _migrate_legacy(self):
+        """Convert a bm25.json index (full chunk text) to the log, keeping text only where needed"""
+        legacy_path = os.path.join(self.directory, LEGACY_INDEX_FILE)
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for chunk_id, chunk in data["chunks"].items():
+            self._apply({"add": {chunk_id: _chunk_record(chunk["text"], chunk["metadata"])}})
+        self._compact()
+        os.remove(legacy_path)
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def memory_bytes(self) -> int:
+        """Rough estimate of the memory held by postings, term lists and unsliceable texts"""
+        text_bytes = sum(len(chunk.get("text", "")) + 8 * len(chunk["terms"]) for chunk in self._chunks.values())
+        posting_bytes = sum(len(term) + 16 * len(docs) for term, docs in self._postings.items())
+        return text_bytes + posting_bytes
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[dict]):
+        """
+        Index chunks; chunks with existing ids are replaced
+
+        Args:
+            ids: Chunk ids (same ids as in the vector store)
+            texts: Chunk texts
+            metadatas: Chunk metadata
+        """
+        entry = {
+            "add": {
+                chunk_id: _chunk_record(text, metadata)
+                for chunk_id, text, metadata in zip(ids, texts, metadatas)
+            }
+        }
+
+        with self._lock:
+            self._refresh()
+            self._apply(entry)
+            self._append(entry)
+
+    def _remove(self, ids: List[str]):
+        """Drop chunks from the postings (caller holds the lock)"""
+        for chunk_id in ids:
+            chunk = self._chunks.pop(chunk_id)
+            for term in chunk["terms"]:
+                docs = self._postings.get(term)
+                if docs is not None:
+                    docs.pop(chunk_id, None)
+                    if not docs:
+                        del self._postings[term]
+
+    def delete(self, ids: Optional[List[str]] = None):
+        """
+        Delete chunks by id, or the whole index when ids is None
+
+        Args:
+            ids: Chunk ids to delete
+        """
+        with self._lock:
+            if ids is None:
+                shutil.rmtree(self.directory, ignore_errors=True)
+                self._load()
+                return
+
+            self._refresh()
+            ids = [chunk_id for chunk_id in ids if chunk_id in self._chunks]
+            if not ids:
+                return
+            self._remove(ids)
+            if self._log_rows > 2 * len(self._chunks):
+                self._compact()
+            else:
+                self._append({"delete": ids})
+
+    def _compile(self) -> Dict[str, Any]:
+        """Array form of the postings for vectorized scoring (caller holds the lock)"""
+        if self._compiled is None:
+            chunk_ids = list(self._chunks)
+            row = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+            lengths = np.array([self._chunks[chunk_id]["length"] for chunk_id in chunk_ids], dtype=np.float32)
+            average_length = lengths.mean() if len(lengths) else 1.0
+
+            self._compiled = {
+                "chunks": dict(self._chunks),  # Snapshot; adds may mutate the live dict
+                "chunk_ids": chunk_ids,
+                # Per-chunk length normalization of the BM25 denominator
+                "norms": config.BM25_K1 * (1 - config.BM25_B + config.BM25_B * lengths / max(average_length, 1e-9)),
+                "postings": {
+                    term: (
+                        np.fromiter((row[chunk_id] for chunk_id in docs), dtype=np.int64, count=len(docs)),
+                        np.fromiter(docs.values(), dtype=np.float32, count=len(docs))
+                    )
+                    for term, docs in self._postings.items()
+                }
+            }
+        return self._compiled
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float, str, dict]]:
+        """
+        Rank chunks by BM25 score for a query
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            List of (chunk id, score, text, metadata), best first; text is
+            empty for chunks stored by offset (see hydrate_documents)
+        """
+        with self._lock:
+            self._refresh()
+            compiled = self._compile()
+
+        chunks, chunk_ids = compiled["chunks"], compiled["chunk_ids"]
+        norms, postings = compiled["norms"], compiled["postings"]
+        num_chunks = len(chunk_ids)
+        if num_chunks == 0:
+            return []
+
+        scores = np.zeros(num_chunks, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in postings:
+                continue
+            rows, frequencies = postings[term]
+            idf = math.log(1 + (num_chunks - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * frequencies * (config.BM25_K1 + 1) / (frequencies + norms[rows])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched])]
+
+        return [
+            (chunk_ids[i], float(scores[i]), chunks[chunk_ids[i]].get("text", ""), dict(chunks[chunk_ids[i]]["metadata"]))
+            for i in matched
+        ]
+
+
+_bm25_indexes = ResourceRegistry(
+    "bm25_indexes",
+    config.VECTOR_STORE_CACHE_MAX_ENTRIES,
+    config.VECTOR_STORE_CACHE_MAX_BYTES,
+    size_fn=lambda index: index.memory_bytes()
+)
+
+
+def get_bm25_index(pdf_id: str) -> BM25Index:
+    """
+    Get the shared BM25 index for a PDF
+
+    Args:
+        pdf_id: PDF identifier
+
+    Returns:
+        BM25Index: Index (empty if the PDF was ingested before BM25 indexing)
+    """
+    return _bm25_indexes.get_or_create(pdf_id, lambda: BM25Index(pdf_id))
+
+
+def delete_bm25_index(pdf_id: str):
+    """
+    Delete a PDF's BM25 index from disk and memory
+
+    Args:
+        pdf_id: PDF identifier
+    """
+    get_bm25_index(pdf_id).delete()
+    _bm25_indexes.evict(lambda key: key == pdf_id)
@@ -0,0 +1,631 @@
+# Indexed document registry
+"""
+Document Registry Module
+Tracks which PDFs are already indexed, keyed by a hash of their content,
+with the version history and chunk hashes of each namespace
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+import config
+from utils.resource_registry import ResourceRegistry
+
+
+_connection = None  # Singleton pattern
+_lock = threading.Lock()
+_versions = {}  # pdf_id -> (live version, status, time.monotonic() it was read)
+
+# Chunk maps of active versions of fully indexed documents, keyed by (pdf_id, version)
+_active_chunks = ResourceRegistry(
+    "active_chunks",
+    config.VECTOR_STORE_CACHE_MAX_ENTRIES,
+    size_fn=lambda chunks: 64 * len(chunks)
+)
+
+
+def _get_connection() -> sqlite3.Connection:
+    """
+    Get or open the registry database (singleton)
+
+    Returns:
+        sqlite3.Connection: Open registry connection
+    """
+    global _connection
+
+    if _connection is None:
+        os.makedirs(os.path.dirname(config.DOCUMENT_REGISTRY_PATH) or ".", exist_ok=True)
+        connection = sqlite3.connect(
+            config.DOCUMENT_REGISTRY_PATH,
+            check_same_thread=False,
+            timeout=30
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                content_hash TEXT PRIMARY KEY,
+                pdf_id TEXT NOT NULL,
+                pdf_name TEXT NOT NULL,
+                total_chunks INTEGER NOT NULL,
+                created_at TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'ready'
+            )
+            """
+        )
+
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS document_versions (
+                pdf_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                pdf_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total_chunks INTEGER NOT NULL DEFAULT 0,
+                chunks_added INTEGER NOT NULL DEFAULT 0,
+                chunks_removed INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (pdf_id, version)
+            )
+            """
+        )
+        # One row per chunk of a version; origin_* name the version and
+        # chunk index the chunk's vector was embedded under
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS document_chunks (
+                pdf_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                origin_version INTEGER NOT NULL,
+                origin_index INTEGER NOT NULL,
+                char_start INTEGER,
+                char_end INTEGER,
+                page INTEGER,
+                page_end INTEGER,
+                PRIMARY KEY (pdf_id, version, chunk_index)
+            )
+            """
+        )
+
+        # Registries created before streaming ingestion lack the status column
+        columns = [row["name"] for row in connection.execute("PRAGMA table_info(documents)")]
+        if "status" not in columns:
+            connection.execute(
+                "ALTER TABLE documents ADD COLUMN status TEXT NOT NULL DEFAULT 'ready'"
+            )
+        # ... and registries created before re-indexing lack versions
+        if "version" not in columns:
+            connection.execute(
+                "ALTER TABLE documents ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
+            connection.execute(
+                """
+                INSERT OR IGNORE INTO document_versions
+                    (pdf_id, version, content_hash, pdf_name, status, total_chunks, chunks_added, created_at)
+                SELECT pdf_id, 1, content_hash, pdf_name, 'active', total_chunks, total_chunks, created_at
+                FROM documents
+                """
+            )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_documents_pdf_id ON documents (pdf_id)"
+        )
+        connection.commit()
+        _connection = connection
+
+    return _connection
+
+
+def _is_abandoned(row: sqlite3.Row) -> bool:
+    """Whether a row is a streamed ingestion that should have finished long ago"""
+    if row["status"] != "indexing":
+        return False
+    deadline = datetime.now() - timedelta(seconds=config.DOCUMENT_INDEXING_TIMEOUT_SECONDS)
+    return datetime.fromisoformat(row["created_at"]) < deadline
+
+
+def _live_entry(connection: sqlite3.Connection, content_hash: str) -> Optional[sqlite3.Row]:
+    """The documents row holding content_hash, dropping it if abandoned (caller commits)"""
+    existing = connection.execute(
+        "SELECT * FROM documents WHERE content_hash = ?",
+        (content_hash,)
+    ).fetchone()
+    if existing is not None and _is_abandoned(existing):
+        print(f"Replacing abandoned ingestion of {existing['pdf_name']} (ID: {existing['pdf_id']})")
+        for table in ("documents", "document_versions", "document_chunks"):
+            connection.execute(f"DELETE FROM {table} WHERE pdf_id = ?", (existing["pdf_id"],))
+        return None
+    return existing
+
+
+def find_document(content_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up an already indexed document by content hash
+
+    A document stuck "indexing" past DOCUMENT_INDEXING_TIMEOUT_SECONDS
+    (its ingestion died) is treated as absent so the PDF can be ingested
+    again.
+
+    Args:
+        content_hash: Hash of the PDF bytes
+
+    Returns:
+        Dict with document info, or None if not indexed yet
+    """
+    try:
+        with _lock:
+            row = _get_connection().execute(
+                "SELECT * FROM documents WHERE content_hash = ?",
+                (content_hash,)
+            ).fetchone()
+        return dict(row) if row and not _is_abandoned(row) else None
+
+    except Exception as e:
+        raise Exception(f"Error reading document registry: {str(e)}")
+
+
+def get_document(pdf_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up an indexed document by its namespace
+
+    Args:
+        pdf_id: PDF ID (namespace)
+
+    Returns:
+        Dict with document info, or None if no such document is registered
+    """
+    try:
+        with _lock:
+            row = _get_connection().execute(
+                "SELECT * FROM documents WHERE pdf_id = ?",
+                (pdf_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    except Exception as e:
+        raise Exception(f"Error reading document registry: {str(e)}")
+
+
+def get_document_version(pdf_id: str) -> int:
+    """
+    Get the live version of a document, read at most every DOCUMENT_VERSION_TTL_SECONDS
+
+    Versions switched by this process are seen at once, those switched by
+    other processes within the TTL.
+
+    Args:
+        pdf_id: PDF ID (namespace)
+
+    Returns:
+        int: Live version (1 if no such document is registered)
+    """
+    try:
+        return _live_version(pdf_id)[0]
+
+    except Exception as e:
+        raise Exception(f"Error reading document registry: {str(e)}")
+
+
+def _live_version(pdf_id: str) -> Tuple[int, Optional[str]]:
+    """Live version and status of a document (None if not registered), cached for the TTL"""
+    with _lock:
+        cached = _versions.get(pdf_id)
+        if cached and time.monotonic() - cached[2] < config.DOCUMENT_VERSION_TTL_SECONDS:
+            return cached[0], cached[1]
+
+        row = _get_connection().execute(
+            "SELECT version, status FROM documents WHERE pdf_id = ?", (pdf_id,)
+        ).fetchone()
+        version, status = (row["version"], row["status"]) if row else (1, None)
+        _versions[pdf_id] = (version, status, time.monotonic())
+    return version, status
+
+
+def register_document(
+    content_hash: str,
+    pdf_id: str,
+    pdf_name: str,
+    total_chunks: int,
+    status: str = "ready"
+) -> Dict[str, Any]:
+    """
+    Record an indexed (or partially indexed) document
+
+    If another process registered the same content first, that entry wins
+    and is returned so callers converge on a single namespace, unless it
+    is an abandoned "indexing" entry, which is replaced.
+
+    Args:
+        content_hash: Hash of the PDF bytes
+        pdf_id: Namespace the chunks were stored in
+        pdf_name: Name of the PDF file
+        total_chunks: Number of stored chunks
+        status: "ready", or "indexing" while streaming ingestion is running
+
+    Returns:
+        Dict with the registered document info
+    """
+    try:
+        with _lock:
+            connection = _get_connection()
+            _live_entry(connection, content_hash)
+
+            now = datetime.now().isoformat()
+            inserted = connection.execute(
+                """
+                INSERT OR IGNORE INTO documents
+                    (content_hash, pdf_id, pdf_name, total_chunks, created_at, status)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (content_hash, pdf_id, pdf_name, total_chunks, now, status)
+            ).rowcount
+            if inserted:
+                connection.execute(
+                    """
+                    INSERT OR IGNORE INTO document_versions
+                        (pdf_id, version, content_hash, pdf_name, status, total_chunks, chunks_added, created_at)
+                    VALUES (?, 1, ?, ?, 'active', ?, ?, ?)
+                    """,
+                    (pdf_id, content_hash, pdf_name, total_chunks, total_chunks, now)
+                )
+            connection.commit()
+            _versions.pop(pdf_id, None)
+        return find_document(content_hash)
+
+    except Exception as e:
+        raise Exception(f"Error updating document registry: {str(e)}")
+
+
+def mark_document_ready(content_hash: str, total_chunks: int):
+    """
+    Mark a streamed document as fully indexed
+
+    Args:
+        content_hash: Hash of the PDF bytes
+        total_chunks: Final number of stored chunks
+    """
+    try:
+        with _lock:
+            connection = _get_connection()
+            connection.execute(
+                "UPDATE documents SET status = 'ready', total_chunks = ? WHERE content_hash = ?",
+                (total_chunks, content_hash)
+            )
+            connection.execute(
+                """
+                UPDATE document_versions SET total_chunks = ?, chunks_added = ?
+                WHERE (pdf_id, version) IN (SELECT pdf_id, version FROM documents WHERE content_hash = ?)
+                """,
+                (total_chunks, total_chunks, content_hash)
+            )
+            connection.commit()
+            for row in connection.execute(
+                "SELECT pdf_id FROM documents WHERE content_hash = ?", (content_hash,)
+            ):
+                _versions.pop(row["pdf_id"], None)
+
+    except Exception as e:
+        raise Exception(f"Error updating document registry: {str(e)}")
+
+
+def unregister_document(pdf_id: str):
+    """
+    Remove all registry entries pointing to a namespace
+
+    Args:
+        pdf_id: PDF ID (namespace) that was deleted
+    """
+    try:
+        with _lock:
+            connection = _get_connection()
+            connection.execute("DELETE FROM documents WHERE pdf_id = ?", (pdf_id,))
+            connection.execute("DELETE FROM document_versions WHERE pdf_id = ?", (pdf_id,))
+            connection.execute("DELETE FROM document_chunks WHERE pdf_id = ?", (pdf_id,))
+            connection.commit()
+            _versions.pop(pdf_id, None)
+        _active_chunks.evict(lambda key: key[0] == pdf_id)
+
+    except Exception as e:
+        raise Exception(f"Error updating document registry: {str(e)}")
+
+
+def add_document_chunks(pdf_id: str, version: int, chunks: List[Dict[str, Any]]):
+    """
+    Record chunks of a document version
+
+    Args:
+        pdf_id: PDF ID (namespace)
+        version: Version the chunks belong to
+        chunks: Dicts with 'chunk_index', 'chunk_hash', 'origin_version',
+            'origin_index' and optionally 'char_start', 'char_end', 'page'
+            and 'page_end'
+    """
+    try:
+        with _lock:
+            connection = _get_connection()
+            _insert_chunks(connection, pdf_id, version, chunks)
+            connection.commit()
+
+    except Exception as e:
+        raise Exception(f"Error updating document registry: {str(e)}")
+
+
+def _insert_chunks(connection: sqlite3.Connection, pdf_id: str, version: int, chunks: List[Dict[str, Any]]):
+    """Insert or replace chunk rows (caller holds the lock and commits)"""
+    connection.executemany(
+        """
+        INSERT OR REPLACE INTO document_chunks
+            (pdf_id, version, chunk_index, chunk_hash, origin_version, origin_index,
+             char_start, char_end, page, page_end)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                pdf_id, version, chunk["chunk_index"], chunk["chunk_hash"],
+                chunk["origin_version"], chunk["origin_index"],
+                chunk.get("char_start"), chunk.get("char_end"), chunk.get("page"), chunk.get("page_end")
+            )
+            for chunk in chunks
+        ]
+    )
+
+
+def get_document_chunks(pdf_id: str, version: int) -> List[Dict[str, Any]]:
+    """
+    Get the recorded chunks of a document version
+
+    Args:
+        pdf_id: PDF ID (namespace)
+        version: Document version
+
+    Returns:
+        List of chunk dicts in chunk order (empty for documents indexed
+        before chunks were recorded)
+    """
+    try:
+        with _lock:
+            rows = _get_connection().execute(
+                "SELECT * FROM document_chunks WHERE pdf_id = ? AND version = ? ORDER BY chunk_index",
+                (pdf_id, version)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    except Exception as e:
+        raise Exception(f"Error reading document registry: {str(e)}")
+
+
+def get_active_chunks(pdf_id: str) -> Tuple[int, Dict[Tuple[int, int], tuple]]:
+    """
+    Get the live version of a document and where its chunks are
+
+    Vectors are never rewritten when a document is re-indexed, so a
+    vector's metadata names the version and chunk index it was embedded
+    under. The map translates those into the chunk's place in the live
+    version. Searches call this for every result set, so the version is
+    read at most every DOCUMENT_VERSION_TTL_SECONDS (see
+    get_document_version) and the map is loaded once per version.
+
+    Args:
+        pdf_id: PDF ID (namespace)
+
+    Returns:
+        Tuple of the active version and a dict mapping (origin version,
+        origin chunk index) to (chunk_index, char_start, char_end, page,
+        page_end) in that version; the dict is empty when no chunks were
+        recorded (documents indexed before re-indexing support) and while
+        a first ingestion is running, whose vectors carry their final
+        positions
+    """
+    version, status = _live_version(pdf_id)
+    if status != "ready":
+        return version, {}
+
+    def load_chunks() -> Dict[Tuple[int, int], tuple]:
+        return {
+            (chunk["origin_version"], chunk["origin_index"]): (
+                chunk["chunk_index"], chunk["char_start"], chunk["char_end"],
+                chunk["page"], chunk["page_end"]
+            )
+            for chunk in get_document_chunks(pdf_id, version)
+        }
+
+    return version, _active_chunks.get_or_create((pdf_id, version), load_chunks)
+
+
+def get_document_versions(pdf_id: str) -> List[Dict[str, Any]]:
+    """
+    Get the version history of a document
+
+    Args:
+        pdf_id: PDF ID (namespace)
+
+    Returns:
+        List of version dicts (version, content_hash, pdf_name, status,
+        total_chunks, chunks_added, chunks_removed, created_at), oldest first
+    """
+    try:
+        with _lock:
+            rows = _get_connection().execute(
+                "SELECT * FROM document_versions WHERE pdf_id = ? ORDER BY version",
+                (pdf_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    except Exception as e:
+        raise Exception(f"Error reading document registry: {str(e)}")
+
+
+def begin_document_version(pdf_id: str, content_hash: str, pdf_name: str) -> int:
+    """
+    Reserve the next version of an indexed document
+
+    Only one version of a document is built at a time; a version still
+    building after DOCUMENT_UPDATE_TIMEOUT_SECONDS is considered abandoned.
+    Content that is already indexed (by this or another document) is
+    rejected here, before anything is embedded, since the version could
+    never be activated.
+
+    Args:
+        pdf_id: PDF ID (namespace) to re-index
+        content_hash: Hash of the revised PDF bytes
+        pdf_name: Name of the revised PDF file
+
+    Returns:
+        int: New version number
+    """
+    try:
+        with _lock:
+            connection = _get_connection()
+            document = connection.execute(
+                "SELECT version FROM documents WHERE pdf_id = ?", (pdf_id,)
+            ).fetchone()
+            if document is None:
+                raise Exception(f"PDF {pdf_id} is not indexed")
+
+            indexed = _live_entry(connection, content_hash)
+            if indexed is not None:
+                connection.commit()
+                if indexed["pdf_id"] == pdf_id:
+                    raise Exception(f"PDF {pdf_id} already holds this content")
+                raise Exception(f"Content already indexed as document {indexed['pdf_id']}")
+
+            abandoned_before = (
+                datetime.now() - timedelta(seconds=config.DOCUMENT_UPDATE_TIMEOUT_SECONDS)
+            ).isoformat()
+            connection.execute(
+                """
+                UPDATE document_versions SET status = 'failed'
+                WHERE pdf_id = ? AND status = 'building' AND created_at < ?
+                """,
+                (pdf_id, abandoned_before)
+            )
+            building = connection.execute(
+                "SELECT version FROM document_versions WHERE pdf_id = ? AND status = 'building'",
+                (pdf_id,)
+            ).fetchone()
+            if building:
+                connection.commit()
+                raise Exception(f"PDF {pdf_id} is already being updated to version {building['version']}")
+
+            latest = connection.execute(
+                "SELECT MAX(version) AS version FROM document_versions WHERE pdf_id = ?", (pdf_id,)
+            ).fetchone()["version"]
+            version = max(latest or 1, document["version"]) + 1
+            connection.execute(
+                """
+                INSERT INTO document_versions (pdf_id, version, content_hash, pdf_name, status, created_at)
+                VALUES (?, ?, ?, ?, 'building', ?)
+                """,
+                (pdf_id, version, content_hash, pdf_name, datetime.now().isoformat())
+            )
+            connection.commit()
+        return version
+
+    except Exception as e:
+        raise Exception(f"Error starting document version: {str(e)}")
+
+
+def activate_document_version(
+    pdf_id: str,
+    version: int,
+    chunks: List[Dict[str, Any]],
+    chunks_added: int,
+    chunks_removed: int
+):
+    """
+    Make a built version the live version of its document
+
+    The chunk map, version history and content hash entry are switched in
+    a single transaction, so every reader sees either the old version or
+    the new one. Chunk rows of older versions are dropped.
+
+    Args:
+        pdf_id: PDF ID (namespace)
+        version: Version reserved with begin_document_version()
+        chunks: The version's chunks (see add_document_chunks)
+        chunks_added: Chunks embedded for this version
+        chunks_removed: Chunks of the previous version that are gone
+    """
+    try:
+        with _lock:
+            connection = _get_connection()
+            try:
+                pending = connection.execute(
+                    "SELECT * FROM document_versions WHERE pdf_id = ? AND version = ? AND status = 'building'",
+                    (pdf_id, version)
+                ).fetchone()
+                if pending is None:
+                    raise Exception(f"Version {version} of PDF {pdf_id} is not being built")
+
+                _insert_chunks(connection, pdf_id, version, chunks)
+                connection.execute(
+                    "UPDATE document_versions SET status = 'superseded' WHERE pdf_id = ? AND status = 'active'",
+                    (pdf_id,)
+                )
+                connection.execute(
+                    """
+                    UPDATE document_versions
+                    SET status = 'active', total_chunks = ?, chunks_added = ?, chunks_removed = ?
+                    WHERE pdf_id = ? AND version = ?
+                    """,
+                    (len(chunks), chunks_added, chunks_removed, pdf_id, version)
+                )
+                # The namespace now holds the revised content only (a conflict
+                # means that content is indexed under another namespace)
+                connection.execute("DELETE FROM documents WHERE pdf_id = ?", (pdf_id,))
+                connection.execute(
+                    """
+                    INSERT INTO documents
+                        (content_hash, pdf_id, pdf_name, total_chunks, created_at, status, version)
+                    VALUES (?, ?, ?, ?, ?, 'ready', ?)
+                    """,
+                    (
+                        pending["content_hash"], pdf_id, pending["pdf_name"], len(chunks),
+                        datetime.now().isoformat(), version
+                    )
+                )
+                connection.execute(
+                    "DELETE FROM document_chunks WHERE pdf_id = ? AND version < ?",
+                    (pdf_id, version)
+                )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            _versions.pop(pdf_id, None)
+        _active_chunks.evict(lambda key: key[0] == pdf_id and key[1] != version)
+
+    except Exception as e:
+        raise Exception(f"Error activating document version: {str(e)}")
+
+
+def fail_document_version(pdf_id: str, version: int):
+    """
+    Mark a version that could not be built as failed
+
+    Args:
+        pdf_id: PDF ID (namespace)
+        version: Version reserved with begin_document_version()
+    """
+    try:
+        with _lock:
+            connection = _get_connection()
+            connection.execute(
+                "UPDATE document_versions SET status = 'failed' WHERE pdf_id = ? AND version = ? AND status = 'building'",
+                (pdf_id, version)
+            )
+            connection.execute(
+                "DELETE FROM document_chunks WHERE pdf_id = ? AND version = ?",
+                (pdf_id, version)
+            )
+            connection.commit()
+            _versions.pop(pdf_id, None)
+        _active_chunks.evict(lambda key: key == (pdf_id, version))
+
+    except Exception as e:
+        raise Exception(f"Error updating document registry: {str(e)}")
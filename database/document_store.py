@@ -0,0 +1,347 @@
+# Extracted document text
+"""
+Document Store Module
+Keeps each PDF's extracted text once on disk and slices chunks from it
+"""
+
+import os
+import mmap
+import bisect
+import shutil
+import threading
+from typing import List, Iterable, Optional, Callable, Tuple
+from langchain_core.documents import Document
+import config
+from utils.resource_registry import ResourceRegistry
+from database.document_registry import get_active_chunks
+
+
+TEXT_FILE = "text.txt"
+PAGES_FILE = "pages.tsv"  # Per page: char offset, byte offset, char length, byte length
+FETCH_GROWTH = 4  # Factor a top-k search is widened by while live results are missing
+
+
+def _text_directory(pdf_id: str, version: int = 1, directory: str = None) -> str:
+    """Directory of a document version's text (version 1 at the top, later ones below it)"""
+    path = os.path.join(directory or config.DOCUMENT_STORE_DIR, pdf_id)
+    return path if version == 1 else os.path.join(path, f"v{version}")
+
+
+class DocumentTextWriter:
+    """
+    Appends a PDF's pages to its document text as they are extracted
+
+    The text is the pages joined with "\\n", UTF-8 encoded, which is what
+    iter_chunk_spans() offsets refer to. Every page is flushed before the
+    next one is accepted, so chunks of a page can be read back as soon as
+    their vectors are stored, while ingestion is still running.
+    """
+
+    def __init__(self, pdf_id: str, directory: str = None, version: int = 1):
+        self.directory = _text_directory(pdf_id, version, directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self._text_file = open(os.path.join(self.directory, TEXT_FILE), "wb")
+        self._pages_file = open(os.path.join(self.directory, PAGES_FILE), "w", encoding="utf-8")
+        self._pages = 0
+        self._chars = 0
+        self._bytes = 0
+
+    def add_page(self, text: str):
+        """
+        Append the next page
+
+        Args:
+            text: Page text ("" for pages without text)
+        """
+        if self._pages:
+            self._text_file.write(b"\n")
+            self._chars += 1
+            self._bytes += 1
+
+        data = text.encode("utf-8")
+        self._text_file.write(data)
+        self._text_file.flush()
+        # The page table is written after the text it describes
+        self._pages_file.write(f"{self._chars}\t{self._bytes}\t{len(text)}\t{len(data)}\n")
+        self._pages_file.flush()
+
+        self._pages += 1
+        self._chars += len(text)
+        self._bytes += len(data)
+
+    def close(self):
+        self._text_file.close()
+        self._pages_file.close()
+
+    def __enter__(self) -> "DocumentTextWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DocumentText:
+    """
+    Read-only, memory-mapped view of a PDF's document text
+
+    Slicing by character offsets maps straight to byte offsets on pages
+    that are pure ASCII; other pages are decoded once per lookup. A slice
+    past the mapped end re-maps the file, since the text may still be
+    growing during ingestion.
+    """
+
+    def __init__(self, pdf_id: str, directory: str = None, version: int = 1):
+        self.pdf_id = pdf_id
+        self.directory = _text_directory(pdf_id, version, directory)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Map the text file and read the page table (empty if not written yet)"""
+        self._char_starts, self._byte_starts = [], []
+        self._char_lengths, self._byte_lengths = [], []
+        try:
+            with open(os.path.join(self.directory, PAGES_FILE), "r", encoding="utf-8") as f:
+                for line in f:
+                    fields = line.split("\t")
+                    if len(fields) != 4:
+                        break  # Partially written last line
+                    char_start, byte_start, char_length, byte_length = map(int, fields)
+                    self._char_starts.append(char_start)
+                    self._byte_starts.append(byte_start)
+                    self._char_lengths.append(char_length)
+                    self._byte_lengths.append(byte_length)
+        except FileNotFoundError:
+            pass
+
+        self._map = b""
+        if self._char_starts:
+            with open(os.path.join(self.directory, TEXT_FILE), "rb") as f:
+                if os.fstat(f.fileno()).st_size:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        """Number of characters currently readable"""
+        if not self._char_starts:
+            return 0
+        return self._char_starts[-1] + self._char_lengths[-1]
+
+    @property
+    def page_count(self) -> int:
+        return len(self._char_starts)
+
+    def _page_index(self, offset: int) -> int:
+        return max(bisect.bisect_right(self._char_starts, offset) - 1, 0)
+
+    def _byte_offset(self, offset: int) -> int:
+        """Translate a character offset into a byte offset of the UTF-8 text"""
+        page = self._page_index(offset)
+        relative = offset - self._char_starts[page]
+        char_length, byte_length = self._char_lengths[page], self._byte_lengths[page]
+
+        if relative >= char_length:
+            # Past the page text: only the "\n" separator follows
+            return self._byte_starts[page] + byte_length + (relative - char_length)
+        if char_length == byte_length:
+            return self._byte_starts[page] + relative
+
+        start = self._byte_starts[page]
+        page_text = self._map[start:start + byte_length].decode("utf-8")
+        return start + len(page_text[:relative].encode("utf-8"))
+
+    def page_of(self, offset: int) -> int:
+        """
+        Get the page holding a character offset
+
+        Args:
+            offset: Character offset into the document text
+
+        Returns:
+            int: 1-based page number
+        """
+        return self._page_index(offset) + 1
+
+    def slice(self, start: int, end: int) -> str:
+        """
+        Read the text between two character offsets
+
+        Args:
+            start: Start offset
+            end: End offset (exclusive)
+
+        Returns:
+            str: Text of the span
+        """
+        with self._lock:
+            if end > len(self):
+                self._load()
+            if end > len(self):
+                raise Exception(f"Offsets {start}-{end} are beyond the text of PDF {self.pdf_id}")
+
+            return self._map[self._byte_offset(start):self._byte_offset(end)].decode("utf-8")
+
+    def memory_bytes(self) -> int:
+        """Page table size; mapped text pages are managed by the OS page cache"""
+        return 32 * len(self._char_starts)
+
+
+_document_texts = ResourceRegistry(
+    "document_texts",
+    config.VECTOR_STORE_CACHE_MAX_ENTRIES,
+    size_fn=lambda text: text.memory_bytes()
+)
+
+
+def open_document_text(pdf_id: str, version: int = 1) -> DocumentTextWriter:
+    """
+    Start (or restart) writing a PDF's document text
+
+    Args:
+        pdf_id: PDF identifier
+        version: Document version the text belongs to
+
+    Returns:
+        DocumentTextWriter: Writer to append pages to, then close
+    """
+    _document_texts.evict(lambda key: key == (pdf_id, version))
+    return DocumentTextWriter(pdf_id, version=version)
+
+
+def write_document_text(pdf_id: str, pages: Iterable[str], version: int = 1):
+    """
+    Write a PDF's complete document text
+
+    Args:
+        pdf_id: PDF identifier
+        pages: Page texts in order
+        version: Document version the text belongs to
+    """
+    with open_document_text(pdf_id, version) as writer:
+        for page in pages:
+            writer.add_page(page)
+
+
+def get_document_text(pdf_id: str, version: int = 1) -> DocumentText:
+    """
+    Get the shared memory-mapped text of a PDF
+
+    Args:
+        pdf_id: PDF identifier
+        version: Document version
+
+    Returns:
+        DocumentText: Text view (empty if the PDF has no stored text)
+    """
+    return _document_texts.get_or_create(
+        (pdf_id, version), lambda: DocumentText(pdf_id, version=version)
+    )
+
+
+def delete_document_text(pdf_id: str, version: Optional[int] = None):
+    """
+    Delete a PDF's document text from disk and memory
+
+    Args:
+        pdf_id: PDF identifier
+        version: Only delete the text of this version (default: all versions)
+    """
+    if version is None:
+        _document_texts.evict(lambda key: key[0] == pdf_id)
+        shutil.rmtree(_text_directory(pdf_id), ignore_errors=True)
+        return
+
+    _document_texts.evict(lambda key: key == (pdf_id, version))
+    if version != 1:
+        shutil.rmtree(_text_directory(pdf_id, version), ignore_errors=True)
+        return
+    # Version 1 shares its directory with the later versions
+    for name in (TEXT_FILE, PAGES_FILE):
+        try:
+            os.remove(os.path.join(_text_directory(pdf_id), name))
+        except FileNotFoundError:
+            pass
+
+
+def hydrate_documents(docs: List[Document], pdf_id: Optional[str] = None) -> List[Document]:
+    """
+    Map search results onto their PDF's live version and fill in their text
+
+    Chunks carried over from an earlier version get their position in the
+    live one. Chunks that are not part of it (embedded for an update that
+    is not live yet, or removed by one whose cleanup is still running)
+    are dropped. Documents that already have text keep it; the others are
+    sliced from the document text by offset.
+
+    Args:
+        docs: Documents from a vector or keyword search, updated in place
+        pdf_id: PDF identifier (default: each document's 'pdf_id' metadata)
+
+    Returns:
+        List[Document]: The documents that belong to the live version, in order
+    """
+    live_versions = {}
+    hydrated = []
+    for doc in docs:
+        metadata = doc.metadata
+        doc_pdf_id = pdf_id or metadata.get("pdf_id")
+        if doc_pdf_id is None or "chunk_index" not in metadata:
+            hydrated.append(doc)
+            continue
+
+        if doc_pdf_id not in live_versions:
+            live_versions[doc_pdf_id] = get_active_chunks(doc_pdf_id)
+        version, chunks = live_versions[doc_pdf_id]
+
+        origin = (int(metadata.get("version", 1)), int(metadata["chunk_index"]))
+        if chunks:
+            location = chunks.get(origin)
+            if location is None:
+                continue
+            chunk_index, char_start, char_end, page, page_end = location
+            metadata["chunk_index"] = chunk_index
+            if char_start is not None:
+                # Offsets (and the 'version' of the text they index) of the live version
+                metadata.update(
+                    version=version, char_start=char_start, char_end=char_end, page=page, page_end=page_end
+                )
+        elif origin[0] > version:
+            continue
+
+        if not doc.page_content and "char_start" in metadata:
+            text = get_document_text(doc_pdf_id, int(metadata.get("version", 1)))
+            doc.page_content = text.slice(int(metadata["char_start"]), int(metadata["char_end"]))
+        hydrated.append(doc)
+    return hydrated
+
+
+def search_live_documents(
+    search: Callable[[int], List[Tuple[Document, float]]],
+    k: int,
+    pdf_id: str,
+    max_k: int
+) -> List[Tuple[Document, float]]:
+    """
+    Run a top-k search until k of its results belong to the live version
+
+    hydrate_documents() drops hits outside the live version (chunks of an
+    update still being built, or removed by one whose cleanup is running),
+    which would leave fewer than k results. The search is repeated with a
+    FETCH_GROWTH times larger k until enough survive, the search runs out
+    of candidates or max_k is reached.
+
+    Args:
+        search: Runs the search for a given k, returning (Document, score) best first
+        k: Number of live results wanted
+        pdf_id: PDF identifier
+        max_k: Largest k to search with
+
+    Returns:
+        List of at most k hydrated (Document, score) tuples, best first
+    """
+    fetch_k = min(k, max_k)
+    while True:
+        results = search(fetch_k)
+        live = {id(doc) for doc in hydrate_documents([doc for doc, _ in results], pdf_id)}
+        if len(live) >= k or len(results) < fetch_k or fetch_k >= max_k:
+            return [(doc, score) for doc, score in results if id(doc) in live][:k]
+        fetch_k = min(fetch_k * FETCH_GROWTH, max_k)
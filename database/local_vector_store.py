@@ -0,0 +1,581 @@
+# Local vector index
+"""
+Local Vector Store Module
+In-process brute-force vector search over NumPy matrices persisted to disk
+"""
+
+import os
+import json
+import uuid
+import shutil
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+import config
+from database.ann_index import IVFPQIndex
+from database.document_store import search_live_documents
+
+
+MANIFEST_FILE = "manifest.json"      # Points at the live generation of the two files below
+VECTORS_FILE = "vectors-{}.f32"      # Raw float32 rows of one generation
+METADATA_FILE = "metadata-{}.jsonl"  # One [id, text, metadata] line per row
+LEGACY_VECTORS_FILE = "vectors.npy"
+LEGACY_METADATA_FILE = "metadata.json"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so a dot product equals cosine similarity"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _new_ann_index() -> IVFPQIndex:
+    """Create an empty ANN index with the configured recall/latency knobs"""
+    return IVFPQIndex(
+        nlist=config.IVF_NLIST,
+        nprobe=config.IVF_NPROBE,
+        subvectors=config.PQ_SUBVECTORS,
+        rerank_factor=config.ANN_RERANK_FACTOR,
+        min_train_size=config.ANN_MIN_TRAIN_SIZE
+    )
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Vector store holding one namespace as a normalized float32 matrix
+
+    Each namespace lives in its own directory as a memory-mapped float32
+    matrix plus a JSON-lines sidecar with ids, texts and metadata (texts
+    are empty for chunks sliced from the document store). Both files are
+    written under a new generation number and published together by
+    replacing a small manifest, so readers never pair the vectors of one
+    write with the metadata of another. Adds that only append rows extend
+    the live generation in place and publish the new row count the same
+    way, so streaming ingestion never rewrites the matrix. Search is a
+    single matrix-vector product followed by argpartition, or an IVF-PQ
+    lookup when LOCAL_INDEX_TYPE is "ivfpq" and the namespace is large
+    enough to have a trained index. Training runs on a background thread
+    outside the store lock; searches use exact search until the trained
+    index is swapped in.
+    """
+
+    def __init__(self, namespace: str, embedding: Embeddings, directory: str = None):
+        self.namespace = namespace
+        self._embedding = embedding
+        self.directory = os.path.join(directory or config.LOCAL_VECTOR_STORE_DIR, namespace)
+        self._lock = threading.RLock()
+        self._filter_masks = {}
+        self._ann_index = None
+        self._training = False
+        self._load()
+
+        with self._lock:
+            if self._ann_index is not None and (
+                    self._ann_index.needs_training(len(self._ids)) or
+                    (self._ann_index.is_trained and self._ann_index.ntotal != len(self._ids))):
+                # A previous process stopped before its index caught up
+                self._train_in_background()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _load(self, ann_index: IVFPQIndex = None):
+        """Load the generation the manifest points to (vectors are memory-mapped)"""
+        if self._read_manifest() is None and os.path.exists(os.path.join(self.directory, LEGACY_VECTORS_FILE)):
+            self._migrate_legacy()
+
+        while True:
+            version = self._disk_version()
+            manifest = self._read_manifest()
+            try:
+                self._read_generation(manifest)
+                break
+            except FileNotFoundError:
+                # A writer published and removed a generation between reading the manifest and its files
+                continue
+
+        self._version = version
+
+        if config.LOCAL_INDEX_TYPE == "ivfpq" and ann_index is None:
+            ann_index = _new_ann_index().load(self.directory)
+        self._ann_index = ann_index
+        self._filter_masks = {}
+
+    def _read_manifest(self) -> Optional[dict]:
+        """Read the manifest, or None if the namespace has not been written yet"""
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _read_generation(self, manifest: Optional[dict], appended: bool = False):
+        """
+        Map the vectors and parse the metadata of the generation in the manifest
+
+        Args:
+            manifest: Parsed manifest, or None for an empty namespace
+            appended: Parse only the rows added since the last read of
+                the same generation
+        """
+        if not appended:
+            self._ids, self._texts, self._metadatas = [], [], []
+            self._metadata_bytes = self._text_bytes = 0
+        self._generation = manifest["generation"] if manifest else None
+        if manifest is None or manifest["rows"] == 0:
+            self._vectors = np.zeros((0, config.EMBEDDING_DIMENSION), dtype=np.float32)
+            return
+
+        generation = manifest["generation"]
+        with open(os.path.join(self.directory, METADATA_FILE.format(generation)), "rb") as f:
+            f.seek(self._metadata_bytes)
+            lines = f.read(manifest["metadata_bytes"] - self._metadata_bytes).splitlines()
+        vectors = np.memmap(
+            os.path.join(self.directory, VECTORS_FILE.format(generation)),
+            dtype=np.float32,
+            mode="r",
+            shape=(manifest["rows"], manifest["dimension"])
+        )
+
+        for line in lines:
+            vector_id, text, metadata = json.loads(line)
+            self._ids.append(vector_id)
+            self._texts.append(text)
+            self._metadatas.append(metadata)
+            self._text_bytes += len(text)
+        self._vectors = vectors
+        self._metadata_bytes = manifest["metadata_bytes"]
+
+    def _migrate_legacy(self):
+        """Convert a namespace written as vectors.npy + metadata.json to the manifest layout"""
+        vectors_path = os.path.join(self.directory, LEGACY_VECTORS_FILE)
+        metadata_path = os.path.join(self.directory, LEGACY_METADATA_FILE)
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        vectors = np.load(vectors_path)
+        self._write_generation(1, vectors, sidecar["ids"], sidecar["texts"], sidecar["metadatas"])
+        os.remove(vectors_path)
+        os.remove(metadata_path)
+        print(f"Migrated local namespace '{self.namespace}' to the manifest layout")
+
+    def _write_generation(
+        self,
+        generation: int,
+        vectors: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[dict]
+    ):
+        """Write both files of a generation, then publish them with one manifest replace"""
+        os.makedirs(self.directory, exist_ok=True)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        with open(os.path.join(self.directory, VECTORS_FILE.format(generation)), "wb") as f:
+            f.write(vectors.tobytes())
+        with open(os.path.join(self.directory, METADATA_FILE.format(generation)), "wb") as f:
+            metadata_bytes = 0
+            for row in zip(ids, texts, metadatas):
+                line = (json.dumps(list(row)) + "\n").encode("utf-8")
+                f.write(line)
+                metadata_bytes += len(line)
+
+        dimension = int(vectors.shape[1]) if vectors.ndim == 2 else config.EMBEDDING_DIMENSION
+        self._write_manifest(generation, len(ids), dimension, metadata_bytes)
+
+    def _append_rows(
+        self,
+        manifest: dict,
+        vectors: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[dict]
+    ):
+        """Append rows to the live generation, then publish them with one manifest replace"""
+        generation = manifest["generation"]
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        metadata_bytes = manifest["metadata_bytes"]
+
+        # Truncating first drops the tail of an append that was never published
+        with open(os.path.join(self.directory, VECTORS_FILE.format(generation)), "r+b") as f:
+            f.truncate(manifest["rows"] * manifest["dimension"] * vectors.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(vectors.tobytes())
+        with open(os.path.join(self.directory, METADATA_FILE.format(generation)), "r+b") as f:
+            f.truncate(metadata_bytes)
+            f.seek(0, os.SEEK_END)
+            for row in zip(ids, texts, metadatas):
+                line = (json.dumps(list(row)) + "\n").encode("utf-8")
+                f.write(line)
+                metadata_bytes += len(line)
+
+        self._write_manifest(generation, manifest["rows"] + len(ids), manifest["dimension"], metadata_bytes)
+
+    def _write_manifest(self, generation: int, rows: int, dimension: int, metadata_bytes: int):
+        """Atomically point the namespace at a generation and its published size"""
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "generation": generation,
+                "rows": rows,
+                "dimension": dimension,
+                "metadata_bytes": metadata_bytes
+            }, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def _remove_generations(self, live: int):
+        """Delete the files of every generation other than the live one"""
+        keep = {VECTORS_FILE.format(live), METADATA_FILE.format(live)}
+        for name in os.listdir(self.directory):
+            if name.startswith(("vectors-", "metadata-")) and name not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _disk_version(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the manifest file, or None if not written yet"""
+        try:
+            stat = os.stat(os.path.join(self.directory, MANIFEST_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        """Reload if another instance or process rewrote the namespace (caller holds the lock)"""
+        version = self._disk_version()
+        if version == self._version:
+            return
+
+        manifest = self._read_manifest()
+        if (manifest is not None and manifest["generation"] == self._generation
+                and manifest["rows"] >= len(self._ids)):
+            try:
+                # Rows were only appended: parse just the new metadata
+                self._read_generation(manifest, appended=True)
+                self._version = version
+                self._filter_masks = {}
+                if self._ann_index is not None:
+                    self._ann_index = _new_ann_index().load(self.directory)
+                return
+            except FileNotFoundError:
+                pass
+        self._load()
+
+    def memory_bytes(self) -> int:
+        """
+        Estimate the memory held by this namespace
+
+        Returns:
+            int: Bytes of vectors (mapped pages are touched by every exact
+            search), chunk text and ANN codes
+        """
+        total = self._vectors.nbytes + self._text_bytes
+        if self._ann_index is not None:
+            total += self._ann_index.codes.nbytes + self._ann_index.assignments.nbytes
+        return int(total)
+
+    def _save(
+        self,
+        vectors: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[dict],
+        appended_from: Optional[int] = None
+    ):
+        """Write the namespace as a new generation, update the ANN index, then re-map it from disk"""
+        manifest = self._read_manifest()
+        generation = (manifest["generation"] if manifest else 0) + 1
+
+        self._write_generation(generation, vectors, ids, texts, metadatas)
+        # Release the current memory map before removing the generation it points to
+        self._vectors = None
+        self._remove_generations(generation)
+
+        self._load(self._ann_index)
+        self._sync_ann_index(appended_from)
+
+    def _append(
+        self,
+        manifest: dict,
+        vectors: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[dict]
+    ):
+        """Append rows without rewriting the namespace, then extend the in-memory view"""
+        appended_from = len(self._ids)
+        self._append_rows(manifest, vectors, ids, texts, metadatas)
+
+        self._read_generation(self._read_manifest(), appended=True)
+        self._version = self._disk_version()
+        self._filter_masks = {}
+
+        self._sync_ann_index(appended_from)
+
+    def _sync_ann_index(self, appended_from: Optional[int] = None):
+        """Bring the ANN index up to date with the mapped vectors (caller holds the lock)"""
+        ann_index = self._ann_index
+        if ann_index is None:
+            return
+        if ann_index.needs_training(len(self._ids)):
+            self._train_in_background()
+            return
+        ann_index.sync(self._vectors, appended_from)
+        ann_index.save(self.directory)
+
+    def _train_in_background(self):
+        """Start training a fresh ANN index unless one is already training (caller holds the lock)"""
+        if self._training:
+            return
+        self._training = True
+        threading.Thread(
+            target=self._train_ann_index,
+            name=f"ann-train-{self.namespace[:8]}",
+            daemon=True
+        ).start()
+
+    def _train_ann_index(self):
+        """Train and encode on a snapshot without the lock, then swap the index in"""
+        try:
+            while True:
+                with self._lock:
+                    self._refresh()
+                    vectors, generation = self._vectors, self._generation
+                if len(vectors) < config.ANN_MIN_TRAIN_SIZE:
+                    return
+
+                ann_index = _new_ann_index()
+                ann_index.sync(vectors)
+
+                with self._lock:
+                    self._refresh()
+                    if (self._generation == generation and len(self._ids) >= len(vectors)
+                            and not ann_index.needs_training(len(self._ids))):
+                        # Encode only the rows appended while training
+                        ann_index.sync(self._vectors, len(vectors))
+                        ann_index.save(self.directory)
+                        self._ann_index = ann_index
+                        return
+                # The namespace was rewritten or outgrew the snapshot; train again
+        except Exception as e:
+            print(f"Error training ANN index for namespace {self.namespace}: {str(e)}")
+        finally:
+            self._training = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._ids)
+
+    def list_ids(self, prefix: str = "") -> List[str]:
+        """Ids of the stored vectors that start with prefix"""
+        with self._lock:
+            self._refresh()
+            return [vector_id for vector_id in self._ids if vector_id.startswith(prefix)]
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        embeddings = self._embedding.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas, ids)
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Add precomputed embeddings; existing ids are overwritten
+
+        Args:
+            texts: Chunk texts
+            embeddings: Embedding vectors, one per text
+            metadatas: Metadata dicts, one per text
+            ids: Vector ids (random UUIDs if omitted)
+
+        Returns:
+            List[str]: Ids of the stored vectors
+        """
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+
+        new_vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+
+        with self._lock:
+            self._refresh()
+            replaced = set(ids)
+            keep = [i for i, vector_id in enumerate(self._ids) if vector_id not in replaced]
+
+            manifest = self._read_manifest()
+            if manifest is not None and len(keep) == len(self._ids):
+                self._append(manifest, new_vectors, list(ids), list(texts), [dict(m) for m in metadatas])
+                return list(ids)
+
+            if keep:
+                vectors = np.concatenate([np.asarray(self._vectors)[keep], new_vectors])
+            else:
+                vectors = new_vectors
+            self._save(
+                vectors,
+                [self._ids[i] for i in keep] + list(ids),
+                [self._texts[i] for i in keep] + list(texts),
+                [self._metadatas[i] for i in keep] + [dict(m) for m in metadatas],
+                appended_from=len(keep) if len(keep) == len(self._ids) else None
+            )
+
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Delete vectors by id, or the whole namespace when ids is None"""
+        with self._lock:
+            self._refresh()
+            if ids is None:
+                self._vectors = None
+                shutil.rmtree(self.directory, ignore_errors=True)
+                self._load(_new_ann_index() if self._ann_index is not None else None)
+                return True
+
+            removed = set(ids)
+            keep = [i for i, vector_id in enumerate(self._ids) if vector_id not in removed]
+            self._save(
+                np.asarray(self._vectors)[keep],
+                [self._ids[i] for i in keep],
+                [self._texts[i] for i in keep],
+                [self._metadatas[i] for i in keep]
+            )
+            return True
+
+    def _filter_mask(self, filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Boolean mask of rows whose metadata equals every filter value (cached)"""
+        if not filter:
+            return None
+
+        key = tuple(sorted(filter.items()))
+        mask = self._filter_masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (all(metadata.get(k) == v for k, v in filter.items()) for metadata in self._metadatas),
+                dtype=bool,
+                count=len(self._metadatas)
+            )
+            self._filter_masks[key] = mask
+        return mask
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Cosine search for a query vector (approximate once the ANN index is trained)
+
+        Hits outside the document's live version are dropped and the
+        search widened to make up for them (see search_live_documents).
+
+        Args:
+            embedding: Query vector
+            k: Number of results
+            filter: Metadata equality filter
+
+        Returns:
+            List of (Document, cosine similarity) tuples, best first
+        """
+        with self._lock:
+            self._refresh()
+            vectors, texts, metadatas = self._vectors, self._texts, self._metadatas
+            ann_index = self._ann_index
+            mask = self._filter_mask(filter)
+
+        if len(texts) == 0:
+            return []
+
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+
+        def search(fetch_k: int) -> List[Tuple[Document, float]]:
+            result = None
+            if ann_index is not None:
+                result = ann_index.search(query, fetch_k, vectors, mask)
+
+            if result is None:
+                result = self._exact_search(query, fetch_k, vectors, mask)
+
+            return [
+                (Document(page_content=texts[i], metadata=dict(metadatas[i])), float(score))
+                for i, score in zip(*result)
+            ]
+
+        # Chunks stored by offset get their text from the document store
+        return search_live_documents(search, k, self.namespace, len(texts))
+
+    @staticmethod
+    def _exact_search(
+        query: np.ndarray,
+        k: int,
+        vectors: np.ndarray,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force cosine search; returns (row ids, scores) best first"""
+        scores = vectors @ query
+
+        if mask is not None and not mask.all():
+            scores = np.where(mask, scores, -np.inf)
+            k = min(k, int(mask.sum()))
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k, filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        namespace: str = "default",
+        **kwargs: Any
+    ) -> "LocalVectorStore":
+        vector_store = cls(namespace, embedding)
+        vector_store.add_texts(texts, metadatas, ids)
+        return vector_store
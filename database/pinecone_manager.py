@@ -4,58 +4,195 @@ Pinecone Manager Module
 Handles Pinecone client initialization and index management
 """
 
-from pinecone import Pinecone, ServerlessSpec
+import os
+import json
+import time
+import socket
+import threading
+from typing import TYPE_CHECKING, Optional, Dict, Any, Callable
 import config
+from database.document_registry import unregister_document
+
+if TYPE_CHECKING:
+    from pinecone import Pinecone
 
 
 _pinecone_client = None  # Singleton pattern
+_index = None
+_index_handle = None
+_index_info = None
+_last_refresh = None
+_lock = threading.Lock()
+
+# urllib3 errors raised when the cached host cannot be reached
+_HOST_ERRORS = {"MaxRetryError", "NewConnectionError", "NameResolutionError", "ConnectTimeoutError", "ProtocolError"}
 
 
-def initialize_pinecone() -> Pinecone:
+def _describe_index(client: "Pinecone") -> Optional[Dict[str, Any]]:
     """
-    Initialize Pinecone client and create index if needed
-    
+    Describe the configured index
+
+    Returns:
+        Dict with 'name', 'dimension', 'metric', 'host' and 'ready', or None
+        if the index does not exist
+    """
+    from pinecone.exceptions import NotFoundException
+
+    try:
+        description = client.describe_index(config.INDEX_NAME)
+    except NotFoundException:
+        return None
+
+    return {
+        "name": config.INDEX_NAME,
+        "dimension": int(description.dimension),
+        "metric": description.metric,
+        "host": description.host,
+        "ready": bool(description.status["ready"])
+    }
+
+
+def _load_cached_index_info() -> Optional[Dict[str, Any]]:
+    """Read a fresh, ready index description cached by this or another process"""
+    try:
+        with open(config.INDEX_INFO_CACHE_PATH, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if (
+        info.get("name") != config.INDEX_NAME or
+        not info.get("ready") or
+        time.time() - info.get("checked_at", 0) > config.INDEX_INFO_TTL_SECONDS
+    ):
+        return None
+    return info
+
+
+def _save_index_info(info: Dict[str, Any]):
+    """Cache the index description on disk for other processes"""
+    os.makedirs(os.path.dirname(config.INDEX_INFO_CACHE_PATH) or ".", exist_ok=True)
+    tmp_path = config.INDEX_INFO_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(tmp_path, config.INDEX_INFO_CACHE_PATH)
+
+
+def _wait_until_ready(client: "Pinecone") -> Dict[str, Any]:
+    """
+    Poll the index with exponential backoff until it reports ready
+
+    create_index() returns before the index can serve requests.
+
+    Returns:
+        Dict with the ready index description
+    """
+    deadline = time.monotonic() + config.INDEX_READY_TIMEOUT_SECONDS
+    delay = 1.0
+
+    while True:
+        info = _describe_index(client)
+        if info and info["ready"]:
+            return info
+        if time.monotonic() + delay > deadline:
+            raise Exception(
+                f"Index '{config.INDEX_NAME}' not ready after {config.INDEX_READY_TIMEOUT_SECONDS}s"
+            )
+        print(f"Waiting for Pinecone index '{config.INDEX_NAME}' to become ready...")
+        time.sleep(delay)
+        delay = min(delay * 2, 30.0)
+
+
+def _validate_index(info: Dict[str, Any]):
+    """Fail fast if the index cannot hold this model's embeddings"""
+    if info["dimension"] != config.EMBEDDING_DIMENSION:
+        raise Exception(
+            f"Index '{config.INDEX_NAME}' has dimension {info['dimension']} but "
+            f"EMBEDDING_DIMENSION is {config.EMBEDDING_DIMENSION} ({config.EMBEDDING_MODEL_NAME}); "
+            f"recreate the index or change the embedding model"
+        )
+    if info["metric"] != config.SIMILARITY_METRIC:
+        print(f"Warning: index metric is '{info['metric']}', config expects '{config.SIMILARITY_METRIC}'")
+
+
+def _bootstrap_index(client: "Pinecone") -> Dict[str, Any]:
+    """
+    Make sure the index exists, is ready and matches the embedding model
+
+    A ready description cached within INDEX_INFO_TTL_SECONDS (by any
+    process) is trusted without calling the control plane.
+
+    Args:
+        client: Pinecone client
+
+    Returns:
+        Dict with the index description
+    """
+    from pinecone import ServerlessSpec
+
+    info = _load_cached_index_info()
+    if info is not None and info["dimension"] != config.EMBEDDING_DIMENSION:
+        info = None  # The index may have been recreated since; check again
+    if info is None:
+        info = _describe_index(client)
+
+        if info is None:
+            client.create_index(
+                name=config.INDEX_NAME,
+                dimension=config.EMBEDDING_DIMENSION,
+                metric=config.SIMILARITY_METRIC,
+                spec=ServerlessSpec(
+                    cloud=config.PINECONE_CLOUD,
+                    region=config.PINECONE_ENVIRONMENT
+                )
+            )
+            print(f"Created new Pinecone index: {config.INDEX_NAME}")
+
+        if info is None or not info["ready"]:
+            info = _wait_until_ready(client)
+        else:
+            print(f"Using existing Pinecone index: {config.INDEX_NAME}")
+
+        info["checked_at"] = time.time()
+        _save_index_info(info)
+
+    _validate_index(info)
+    return info
+
+
+def initialize_pinecone() -> "Pinecone":
+    """
+    Initialize Pinecone client and bootstrap the index (once per process)
+
     Returns:
         Pinecone: Initialized Pinecone client
     """
-    global _pinecone_client
-    
+    global _pinecone_client, _index_info
+
     if _pinecone_client is None:
-        try:
-            # Validate configuration
-            config.validate_config()
-            
-            # Initialize Pinecone
-            _pinecone_client = Pinecone(api_key=config.PINECONE_API_KEY)
-            
-            # Check if index exists
-            existing_indexes = _pinecone_client.list_indexes().names()
-            
-            if config.INDEX_NAME not in existing_indexes:
-                # Create new index
-                _pinecone_client.create_index(
-                    name=config.INDEX_NAME,
-                    dimension=config.EMBEDDING_DIMENSION,
-                    metric=config.SIMILARITY_METRIC,
-                    spec=ServerlessSpec(
-                        cloud=config.PINECONE_CLOUD,
-                        region=config.PINECONE_ENVIRONMENT
-                    )
-                )
-                print(f"Created new Pinecone index: {config.INDEX_NAME}")
-            else:
-                print(f"Using existing Pinecone index: {config.INDEX_NAME}")
-        
-        except Exception as e:
-            raise Exception(f"Failed to initialize Pinecone: {str(e)}")
-    
+        with _lock:
+            if _pinecone_client is None:
+                try:
+                    # Validate configuration
+                    config.validate_config()
+
+                    # Imported on first use to keep app startup fast
+                    from pinecone import Pinecone
+
+                    client = Pinecone(api_key=config.PINECONE_API_KEY)
+                    _index_info = _bootstrap_index(client)
+                    _pinecone_client = client
+
+                except Exception as e:
+                    raise Exception(f"Failed to initialize Pinecone: {str(e)}")
+
     return _pinecone_client
 
 
-def get_pinecone_client() -> Pinecone:
+def get_pinecone_client() -> "Pinecone":
     """
     Get the initialized Pinecone client
-    
+
     Returns:
         Pinecone: Pinecone client instance
     """
@@ -64,15 +201,187 @@ def get_pinecone_client() -> Pinecone:
     return _pinecone_client
 
 
+def _connect():
+    """Get the Pinecone index connection for the current host (singleton)"""
+    global _index
+
+    if _index is None:
+        client = get_pinecone_client()
+        _index = client.Index(name=config.INDEX_NAME, host=_index_info["host"])
+
+    return _index
+
+
+def _is_stale_host_error(error: Exception) -> bool:
+    """Whether a failed data-plane call suggests the cached host is stale"""
+    if isinstance(error, (ConnectionError, socket.gaierror)):
+        return True
+    if getattr(error, "status", None) == 404:
+        return True
+    return any(cls.__name__ in _HOST_ERRORS for cls in type(error).__mro__)
+
+
+def _refresh_index_info() -> bool:
+    """
+    Describe the index again after a failed data-plane call
+
+    The cached host and dimension may be stale (the index was deleted and
+    recreated, or moved). The fresh description replaces the cached one,
+    including the one on disk shared with other processes, and a changed
+    dimension fails like it does at startup. The index is never created
+    here: a missing index is an error until the next startup. Skipped if
+    the index was described within INDEX_INFO_RECHECK_SECONDS.
+
+    Returns:
+        bool: True if the host changed, so the failed call is worth retrying
+    """
+    global _index, _index_info, _last_refresh
+
+    with _lock:
+        now = time.monotonic()
+        if _last_refresh is not None and now - _last_refresh < config.INDEX_INFO_RECHECK_SECONDS:
+            return False
+        _last_refresh = now
+
+    # Described outside the lock; other calls keep using the current connection
+    info = _describe_index(_pinecone_client)
+    if info is None:
+        raise Exception(f"Index '{config.INDEX_NAME}' no longer exists")
+    if not info["ready"]:
+        raise Exception(f"Index '{config.INDEX_NAME}' is not ready")
+    _validate_index(info)
+    info["checked_at"] = time.time()
+    _save_index_info(info)
+
+    with _lock:
+        moved = info["host"] != _index_info["host"]
+        _index_info = info
+        if moved:
+            _index = None
+
+    if moved:
+        print(f"Pinecone index '{config.INDEX_NAME}' moved to {info['host']}; reconnecting")
+    return moved
+
+
+def _retry_on_moved_host(error: Exception, retry: Callable[[], Any]) -> Any:
+    """
+    Retry a failed data-plane call once if the index host moved
+
+    Args:
+        error: Exception raised by the call
+        retry: Repeats the call on the current connection
+
+    Returns:
+        Result of the retried call
+
+    Raises:
+        The original error, chained to the refresh or retry error if any
+    """
+    if not _is_stale_host_error(error):
+        raise error
+
+    try:
+        moved = _refresh_index_info()
+    except Exception as refresh_error:
+        raise error from refresh_error
+    if not moved:
+        raise error
+
+    try:
+        return retry()
+    except Exception as retry_error:
+        raise error from retry_error
+
+
+class _IndexHandle:
+    """
+    Pinecone index proxy that survives a stale index description
+
+    Calls go to the connection for the current host. When one fails with a
+    connection, 404 or host error, the index is described again; if its
+    host changed the call is retried once on the new connection, otherwise
+    the original error is raised.
+    """
+
+    def __getattr__(self, name: str):
+        attribute = getattr(_connect(), name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            try:
+                return attribute(*args, **kwargs)
+            except Exception as error:
+                return _retry_on_moved_host(error, lambda: getattr(_connect(), name)(*args, **kwargs))
+
+        return call
+
+    def list(self, **kwargs):
+        """
+        Yield pages of vector ids, like Index.list
+
+        Index.list is a generator, so it fails while being iterated rather
+        than when called. Only a failure before the first page is retried.
+        """
+        pages = _connect().list(**kwargs)
+        yielded = False
+        try:
+            for page in pages:
+                yielded = True
+                yield page
+        except Exception as error:
+            if yielded:
+                raise
+            yield from _retry_on_moved_host(error, lambda: list(_connect().list(**kwargs)))
+
+
 def get_index():
     """
-    Get the Pinecone index object
-    
+    Get the Pinecone index object (singleton)
+
+    Connects by the cached host, so no describe call is needed; a failing
+    call describes the index again and follows it if it moved.
+
     Returns:
-        Index: Pinecone index instance
+        Index: Pinecone index proxy
     """
-    client = get_pinecone_client()
-    return client.Index(config.INDEX_NAME)
+    global _index_handle
+
+    if _index_handle is None:
+        get_pinecone_client()
+        _index_handle = _IndexHandle()
+
+    return _index_handle
+
+
+def get_index_health(probe: bool = False) -> Dict[str, Any]:
+    """
+    Report index health without a network call per Streamlit rerun
+
+    Args:
+        probe: Also query the data plane (describe_index_stats) for
+            reachability and vector count
+
+    Returns:
+        Dict with 'initialized', 'index' (cached description) and, when
+        probing, 'reachable', 'total_vectors' or 'error'
+    """
+    health = {
+        "initialized": _pinecone_client is not None,
+        "index": dict(_index_info) if _index_info else None
+    }
+
+    if probe and health["initialized"]:
+        try:
+            stats = get_index().describe_index_stats()
+            health["reachable"] = True
+            health["total_vectors"] = stats.total_vector_count
+        except Exception as e:
+            health["reachable"] = False
+            health["error"] = str(e)
+
+    return health
 
 
 def delete_namespace(pdf_id: str):
@@ -85,6 +394,11 @@ def delete_namespace(pdf_id: str):
     try:
         index = get_index()
         index.delete(namespace=pdf_id, delete_all=True)
+        unregister_document(pdf_id)
+        
+        # Imported here to avoid a circular import (retrieval depends on database)
+        from retrieval.cache import invalidate_pdf_cache
+        invalidate_pdf_cache(pdf_id)
         print(f"Deleted namespace: {pdf_id}")
     
     except Exception as e:
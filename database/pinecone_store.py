@@ -0,0 +1,163 @@
+# Pinecone search with local text
+"""
+Pinecone Store Module
+Vector store over a Pinecone namespace whose vectors carry offsets, not text
+"""
+
+import uuid
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from database.document_store import search_live_documents
+from database.pinecone_manager import get_index
+
+
+MAX_TOP_K = 1000  # Largest top_k Pinecone serves with metadata
+
+
+def _restore_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Pinecone returns every number as a float; give integers back their type"""
+    return {
+        key: int(value) if isinstance(value, float) and value.is_integer() else value
+        for key, value in metadata.items()
+    }
+
+
+class PineconeChunkStore(VectorStore):
+    """
+    Vector store querying one Pinecone namespace directly
+
+    Chunk vectors hold only ids and positions (pdf_id, chunk_index,
+    char_start/char_end, page/page_end), so a query returns a few numbers
+    per match; the chunk text is sliced from the local document store and
+    matches outside the document's live version are dropped.
+    Vectors written with an inline "text" field (older ingestions, or
+    add_texts()) are returned as stored.
+    """
+
+    def __init__(self, index, embedding: Embeddings, namespace: str):
+        self._index = index
+        self._embedding = embedding
+        self.namespace = namespace
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+
+        # No document text to slice from, so the text travels with the vector
+        self._index.upsert(
+            vectors=[
+                {"id": vector_id, "values": vector, "metadata": {**metadata, "text": text}}
+                for vector_id, vector, metadata, text in zip(
+                    ids, self._embedding.embed_documents(texts), metadatas, texts
+                )
+            ],
+            namespace=self.namespace
+        )
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Delete vectors by id, or the whole namespace when ids is None"""
+        if ids is None:
+            self._index.delete(delete_all=True, namespace=self.namespace)
+        else:
+            self._index.delete(ids=ids, namespace=self.namespace)
+        return True
+
+    def list_ids(self, prefix: str = "") -> List[str]:
+        """Ids of the namespace's vectors that start with prefix (serverless indexes)"""
+        return [
+            vector_id
+            for page in self._index.list(prefix=prefix, namespace=self.namespace)
+            for vector_id in page
+        ]
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Query the namespace for a vector
+
+        Matches outside the document's live version are dropped and the
+        query widened to make up for them (see search_live_documents).
+
+        Args:
+            embedding: Query vector
+            k: Number of results
+            filter: Pinecone metadata filter
+
+        Returns:
+            List of (Document, similarity score) tuples, best first
+        """
+        def search(top_k: int) -> List[Tuple[Document, float]]:
+            response = self._index.query(
+                vector=embedding,
+                top_k=top_k,
+                namespace=self.namespace,
+                filter=filter,
+                include_metadata=True,
+                include_values=False
+            )
+
+            results = []
+            for match in response.matches:
+                metadata = _restore_metadata(match.metadata or {})
+                text = metadata.pop("text", "")
+                results.append((Document(page_content=text, metadata=metadata), float(match.score)))
+            return results
+
+        return search_live_documents(search, k, self.namespace, max(k, MAX_TOP_K))
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k, filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        namespace: str = "default",
+        **kwargs: Any
+    ) -> "PineconeChunkStore":
+        vector_store = cls(get_index(), embedding, namespace)
+        vector_store.add_texts(texts, metadatas, ids)
+        return vector_store
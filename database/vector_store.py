@@ -1,91 +1,442 @@
 # Store/search vectors
 """
 Vector Store Module
-Handles storing and searching vectors in Pinecone
+Handles storing and searching vectors in the configured backend
+(Pinecone or the local NumPy index)
 """
 
 
-from langchain_pinecone import PineconeVectorStore
-from typing import List, Dict, Any
-from datetime import datetime
+import asyncio
+from collections import deque
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from typing import List, Dict, Any, Optional
 import config
-from utils.embeddings import get_embedding_model
+from utils.embeddings import get_embedding_model, embed_in_batches
+from utils.pdf_processor import compute_chunk_hash
+from utils.resource_registry import ResourceRegistry
+from database.local_vector_store import LocalVectorStore
+from database.pinecone_store import PineconeChunkStore
+from database.document_store import delete_document_text
+from database.bm25_index import get_bm25_index, delete_bm25_index
+from database.pinecone_manager import delete_namespace, get_index
+from database.document_registry import (
+    get_document,
+    get_document_chunks,
+    add_document_chunks,
+    activate_document_version,
+    fail_document_version,
+    unregister_document
+)
+
+
+# Chunk location metadata stored with each vector in place of its text
+POSITION_KEYS = ("char_start", "char_end", "page", "page_end")
+DELETE_BATCH_SIZE = 1000  # Pinecone accepts at most this many ids per delete
+
+
+def _vector_store_bytes(vector_store: VectorStore) -> int:
+    """Estimated memory of a vector store (Pinecone stores hold no vectors locally)"""
+    memory_bytes = getattr(vector_store, "memory_bytes", None)
+    return memory_bytes() if memory_bytes else 0
+
+
+def _on_vector_store_evicted(key, vector_store: VectorStore):
+    """Drop QA chains that still reference an evicted vector store"""
+    # Imported here to avoid a circular import (retrieval depends on database)
+    from retrieval.qa_chain import evict_qa_chains
+    evict_qa_chains(key[0])
+
+
+_vector_stores = ResourceRegistry(
+    "vector_stores",
+    config.VECTOR_STORE_CACHE_MAX_ENTRIES,
+    config.VECTOR_STORE_CACHE_MAX_BYTES,
+    size_fn=_vector_store_bytes,
+    on_evict=_on_vector_store_evicted
+)
+
+
+def is_local_backend() -> bool:
+    """
+    Check whether vectors are kept in the local in-process index
+    
+    Returns:
+        bool: True for the local backend, False for Pinecone
+    """
+    return config.VECTOR_STORE_BACKEND == "local"
+
+
+def chunk_vector_id(pdf_id: str, version: int, chunk_index: int) -> str:
+    """
+    Build the vector id of a chunk embedded for a document version
+    
+    Args:
+        pdf_id: PDF identifier (namespace)
+        version: Document version the chunk was embedded for
+        chunk_index: Position of the chunk in that version
+        
+    Returns:
+        str: Vector id (version 1 keeps the original "<pdf_id>-<index>" form)
+    """
+    if version == 1:
+        return f"{pdf_id}-{chunk_index}"
+    return f"{pdf_id}-v{version}-{chunk_index}"
+
+
+def upsert_embeddings(
+    pdf_id: str,
+    texts: List[str],
+    vectors: List[List[float]],
+    chunk_indices: List[int],
+    positions: Optional[List[Dict[str, int]]] = None,
+    version: int = 1
+):
+    """
+    Write precomputed chunk embeddings with metadata to the vector store
+    
+    With positions, vectors carry only ids and offsets and the text is
+    read back from the document store, which must already hold it.
+    Without them, the text is stored alongside each vector. Chunks of a
+    first ingestion (version 1) are also recorded in the document
+    registry; later versions record theirs when they go live.
+    
+    Args:
+        pdf_id: Unique PDF identifier (namespace)
+        texts: Chunk texts
+        vectors: Embedding vector for each chunk
+        chunk_indices: Position of each chunk in the document
+        positions: 'char_start', 'char_end', 'page' and 'page_end' of
+            each chunk (see iter_chunk_spans)
+        version: Document version the chunks belong to
+    """
+    # Deterministic ids make re-ingesting the same PDF idempotent
+    ids = [chunk_vector_id(pdf_id, version, i) for i in chunk_indices]
+    metadatas = []
+    for position, chunk_index in enumerate(chunk_indices):
+        metadata = {"pdf_id": pdf_id, "chunk_index": chunk_index, "version": version}
+        if positions is not None:
+            metadata.update({key: positions[position][key] for key in POSITION_KEYS})
+        metadatas.append(metadata)
+    
+    if version == 1:
+        # Recorded before the vectors exist, so searches never meet an unknown chunk
+        add_document_chunks(pdf_id, 1, [
+            {
+                **{key: metadata[key] for key in POSITION_KEYS if key in metadata},
+                "chunk_index": metadata["chunk_index"],
+                "chunk_hash": compute_chunk_hash(text),
+                "origin_version": 1,
+                "origin_index": metadata["chunk_index"]
+            }
+            for text, metadata in zip(texts, metadatas)
+        ])
+    
+    # Keyword index for hybrid retrieval, built from the same chunks
+    get_bm25_index(pdf_id).add(ids, texts, metadatas)
+    
+    # Offsets replace the text in the vector store
+    stored_texts = [""] * len(texts) if positions is not None else texts
+    
+    if is_local_backend():
+        get_vector_store(pdf_id).add_embeddings(stored_texts, vectors, metadatas, ids)
+        return
+    
+    get_index().upsert(
+        vectors=[
+            {
+                "id": vector_id,
+                "values": vector,
+                "metadata": {**metadata, "text": text} if text else metadata
+            }
+            for vector_id, vector, metadata, text in zip(ids, vectors, metadatas, stored_texts)
+        ],
+        namespace=pdf_id  # Isolate each PDF in its own namespace
+    )
+
+
+def _embed_and_upsert(
+    pdf_id: str,
+    texts: List[str],
+    chunk_indices: List[int],
+    positions: Optional[List[Dict[str, int]]],
+    version: int
+):
+    """Embed chunks in batches, upserting each batch while the next one is embedded"""
+    if not texts:
+        return
+    
+    def upsert_batch(batch, batch_vectors):
+        upsert_embeddings(
+            pdf_id,
+            [texts[i] for i in batch],
+            batch_vectors,
+            [chunk_indices[i] for i in batch],
+            [positions[i] for i in batch] if positions is not None else None,
+            version
+        )
+    
+    # The local store appends each batch to its live generation
+    embed_in_batches(texts, upsert_batch)
+
+
+def _delete_chunk_vectors(pdf_id: str, ids: List[str]):
+    """Delete chunks by vector id from the vector store and the BM25 index"""
+    if not ids:
+        return
+    
+    get_bm25_index(pdf_id).delete(ids)
+    if is_local_backend():
+        get_vector_store(pdf_id).delete(ids)
+        return
+    
+    index = get_index()
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        index.delete(ids=ids[start:start + DELETE_BATCH_SIZE], namespace=pdf_id)
+
+
+def _list_chunk_vector_ids(pdf_id: str, prefix: str = "") -> List[str]:
+    """Ids of a namespace's vectors that start with prefix"""
+    return get_vector_store(pdf_id).list_ids(prefix)
+
+
+def discard_document_version(pdf_id: str, version: int):
+    """
+    Fail a version that is being built and delete what it stored so far
+    
+    Its vectors are found by id prefix, since the chunks it embedded are
+    only recorded in the registry once a version goes live.
+    
+    Args:
+        pdf_id: PDF identifier (namespace)
+        version: Version reserved with begin_document_version() (above 1)
+    """
+    fail_document_version(pdf_id, version)
+    _delete_chunk_vectors(pdf_id, _list_chunk_vector_ids(pdf_id, f"{pdf_id}-v{version}-"))
+    delete_document_text(pdf_id, version)
+
+
+def _store_version(
+    texts: List[str],
+    pdf_id: str,
+    pdf_name: str,
+    positions: Optional[List[Dict[str, int]]],
+    version: int
+):
+    """Store a new version of an indexed PDF incrementally and switch to it"""
+    document = get_document(pdf_id)
+    if document is None:
+        raise Exception(f"PDF {pdf_id} is not indexed")
+    live_version = document["version"]
+    previous = get_document_chunks(pdf_id, live_version)
+    
+    # Unchanged chunks keep the vector they were embedded with; repeated
+    # chunks are paired up in document order
+    unchanged = {}
+    for chunk in previous:
+        unchanged.setdefault(chunk["chunk_hash"], deque()).append(chunk)
+    
+    chunks = []
+    added = []
+    for chunk_index, text in enumerate(texts):
+        chunk_hash = compute_chunk_hash(text)
+        matches = unchanged.get(chunk_hash)
+        if matches:
+            origin = matches.popleft()
+            origin_version, origin_index = origin["origin_version"], origin["origin_index"]
+        else:
+            origin_version, origin_index = version, chunk_index
+            added.append(chunk_index)
+        
+        chunk = {
+            "chunk_index": chunk_index,
+            "chunk_hash": chunk_hash,
+            "origin_version": origin_version,
+            "origin_index": origin_index
+        }
+        if positions is not None:
+            chunk.update({key: positions[chunk_index][key] for key in POSITION_KEYS})
+        chunks.append(chunk)
+    
+    if previous:
+        removed = [
+            chunk_vector_id(pdf_id, chunk["origin_version"], chunk["origin_index"])
+            for matches in unchanged.values()
+            for chunk in matches
+        ]
+    else:
+        # Indexed before chunk hashes were recorded, so nothing can be reused;
+        # such vectors may have random ids, so everything else is listed
+        removed = None
+    chunks_removed = document["total_chunks"] if removed is None else len(removed)
+    
+    try:
+        # Searches ignore these chunks until the version goes live
+        _embed_and_upsert(
+            pdf_id,
+            [texts[i] for i in added],
+            added,
+            [positions[i] for i in added] if positions is not None else None,
+            version
+        )
+        activate_document_version(pdf_id, version, chunks, len(added), chunks_removed)
+    except Exception:
+        try:
+            _delete_chunk_vectors(pdf_id, [chunk_vector_id(pdf_id, version, i) for i in added])
+            fail_document_version(pdf_id, version)
+        except Exception as e:
+            print(f"Error discarding version {version} of PDF {pdf_id}: {str(e)}")
+        raise
+    
+    # Searches drop chunks outside the live version, so cleanup can trail the switch
+    try:
+        # Imported here to avoid a circular import (retrieval depends on database)
+        from retrieval.cache import invalidate_pdf_cache
+        invalidate_pdf_cache(pdf_id)
+        
+        if removed is None:
+            live_prefix = f"{pdf_id}-v{version}-"
+            removed = [
+                vector_id for vector_id in _list_chunk_vector_ids(pdf_id)
+                if not vector_id.startswith(live_prefix)
+            ]
+        _delete_chunk_vectors(pdf_id, removed)
+        # Keep the previous version's text for searches that resolved against it
+        for old_version in range(1, live_version):
+            delete_document_text(pdf_id, old_version)
+    except Exception as e:
+        print(f"Error removing chunks of version {live_version} of PDF {pdf_id}: {str(e)}")
+    
+    print(f"Updated PDF: {pdf_name} (ID: {pdf_id}) to version {version}: "
+          f"{len(added)} chunks embedded, {len(chunks) - len(added)} reused, {chunks_removed} removed")
 
 
 def store_embeddings(
     texts: List[str],
     pdf_id: str,
-    pdf_name: str
-) -> PineconeVectorStore:
+    pdf_name: str,
+    positions: Optional[List[Dict[str, int]]] = None,
+    version: int = 1
+) -> VectorStore:
     """
-    Store text chunks as embeddings in Pinecone with metadata
+    Store text chunks as embeddings in the vector store with metadata
+    
+    Version 1 is a first ingestion. A later version (reserved with
+    begin_document_version()) updates the indexed PDF incrementally: the
+    chunks are diffed against the chunk hashes of the live version, only
+    new chunks are embedded and upserted, the version goes live in one
+    registry transaction (dropping cached answers), and the vectors of
+    chunks that vanished are deleted by id afterwards.
     
     Args:
         texts: List of text chunks
         pdf_id: Unique PDF identifier
         pdf_name: Name of the PDF file
+        positions: Chunk offsets and pages into the stored document text
+            of this version (see upsert_embeddings)
+        version: Document version the chunks belong to
         
     Returns:
-        PineconeVectorStore: Vector store instance
+        VectorStore: Vector store instance
     """
     try:
-        # Get embedding model
-        embeddings = get_embedding_model()
-        
-        # Prepare metadata for each chunk
-        metadatas = [
-            {
-                "pdf_id": pdf_id,
-                "pdf_name": pdf_name,
-                "chunk_index": i,
-                "upload_date": datetime.now().isoformat(),
-                "total_chunks": len(texts),
-                "chunk_length": len(text)
-            }
-            for i, text in enumerate(texts)
-        ]
+        if version == 1:
+            _embed_and_upsert(pdf_id, texts, list(range(len(texts))), positions, version)
+            print(f"Stored {len(texts)} chunks for PDF: {pdf_name} (ID: {pdf_id})")
+        else:
+            _store_version(texts, pdf_id, pdf_name, positions, version)
         
-        # Create vector store and store embeddings
-        vector_store = PineconeVectorStore.from_texts(
-            texts=texts,
-            embedding=embeddings,
-            index_name=config.INDEX_NAME,
-            metadatas=metadatas,
-            namespace=pdf_id  # Isolate each PDF in its own namespace
-        )
-        
-        print(f"Stored {len(texts)} chunks for PDF: {pdf_name} (ID: {pdf_id})")
-        return vector_store
+        return get_vector_store(pdf_id)
     
     except Exception as e:
         raise Exception(f"Error storing embeddings: {str(e)}")
 
 
-def get_vector_store(pdf_id: str) -> PineconeVectorStore:
+def get_vector_store(pdf_id: str, embeddings: Embeddings = None) -> VectorStore:
     """
-    Get vector store instance for a specific PDF
+    Get the shared vector store instance for a specific PDF
+    
+    Instances are kept in a process-wide LRU registry, so sessions and
+    repeated searches reuse the loaded index and client.
     
     Args:
         pdf_id: PDF identifier
+        embeddings: Embedding model to use (default: shared embedding model)
         
     Returns:
-        PineconeVectorStore: Vector store for the PDF
+        VectorStore: Vector store for the PDF
     """
     try:
-        embeddings = get_embedding_model()
+        if embeddings is None:
+            embeddings = get_embedding_model()
         
-        vector_store = PineconeVectorStore(
-            index_name=config.INDEX_NAME,
-            embedding=embeddings,
-            namespace=pdf_id
-        )
+        def create_vector_store() -> VectorStore:
+            if is_local_backend():
+                return LocalVectorStore(namespace=pdf_id, embedding=embeddings)
+            
+            return PineconeChunkStore(
+                index=get_index(),
+                embedding=embeddings,
+                namespace=pdf_id
+            )
         
-        return vector_store
+        # Embedding models are process singletons, so their id is a stable key
+        return _vector_stores.get_or_create((pdf_id, id(embeddings)), create_vector_store)
     
     except Exception as e:
         raise Exception(f"Error getting vector store: {str(e)}")
 
 
+def evict_vector_stores(pdf_id: str) -> int:
+    """
+    Drop the shared vector store instances for a PDF (and chains using them)
+    
+    Args:
+        pdf_id: PDF identifier
+        
+    Returns:
+        int: Number of vector store instances removed
+    """
+    return _vector_stores.evict(lambda key: key[0] == pdf_id)
+
+
+def get_vector_store_registry_stats() -> Dict[str, Any]:
+    """
+    Get size and hit/miss counters of the vector store registry
+    
+    Returns:
+        Dict with registry statistics
+    """
+    return _vector_stores.get_stats()
+
+
+def delete_document_vectors(pdf_id: str):
+    """
+    Delete all vectors (plus the BM25 index and document text) for a PDF
+    
+    Args:
+        pdf_id: PDF identifier (namespace) to delete
+    """
+    delete_bm25_index(pdf_id)
+    delete_document_text(pdf_id)
+    
+    if not is_local_backend():
+        delete_namespace(pdf_id)
+        return
+    
+    try:
+        get_vector_store(pdf_id).delete()
+        unregister_document(pdf_id)
+        
+        # Imported here to avoid a circular import (retrieval depends on database)
+        from retrieval.cache import invalidate_pdf_cache
+        invalidate_pdf_cache(pdf_id)
+        print(f"Deleted local namespace: {pdf_id}")
+    
+    except Exception as e:
+        raise Exception(f"Error deleting namespace: {str(e)}")
+
+
 def search_similar_chunks(
     query: str,
     pdf_id: str,
@@ -115,17 +466,54 @@ def search_similar_chunks(
             filter={"pdf_id": pdf_id}
         )
         
-        # Format results
-        formatted_results = [
-            {
-                "content": doc.page_content,
-                "metadata": doc.metadata,
-                "score": score
-            }
-            for doc, score in results
-        ]
+        return _format_search_results(results)
+    
+    except Exception as e:
+        raise Exception(f"Error searching chunks: {str(e)}")
+
+
+async def asearch_similar_chunks(
+    query: str,
+    pdf_id: str,
+    top_k: int = None
+) -> List[Dict[str, Any]]:
+    """
+    Search for similar chunks for a query without blocking the event loop
+    
+    Args:
+        query: Query text
+        pdf_id: PDF identifier to search within
+        top_k: Number of results to return (default from config)
+        
+    Returns:
+        List of dicts with 'content', 'metadata', and 'score'
+    """
+    try:
+        if top_k is None:
+            top_k = config.TOP_K_RESULTS
+        
+        # The first use of a namespace loads its index from disk
+        vector_store = await asyncio.to_thread(get_vector_store, pdf_id)
         
-        return formatted_results
+        results = await vector_store.asimilarity_search_with_score(
+            query=query,
+            k=top_k,
+            filter={"pdf_id": pdf_id}
+        )
+        
+        return _format_search_results(results)
     
     except Exception as e:
-        raise Exception(f"Error searching chunks: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error searching chunks: {str(e)}")
+
+
+def _format_search_results(results) -> List[Dict[str, Any]]:
+    """Convert (Document, score) pairs into plain result dicts"""
+    return [
+        {
+            "content": doc.page_content,
+            "metadata": doc.metadata,
+            "score": score
+        }
+        for doc, score in results
+    ]
\ No newline at end of file
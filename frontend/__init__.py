@@ -35,23 +35,30 @@ from .ui_components import (
     display_pdf_uploader,
     display_question_input,
     display_answer,
+    display_answer_stream,
     display_source_documents,
     display_sidebar_info,
     display_error,
     display_success,
     display_info,
     display_warning,
-    display_chat_history
+    display_chat_history,
+    display_ingestion_progress
 )
 from .session_manager import (
     initialize_session_state,
     update_pdf_session,
     get_current_pdf_id,
     get_current_pdf_name,
+    get_current_pdf_hash,
     get_qa_chain,
     is_pdf_loaded,
     add_to_chat_history,
     get_chat_history,
+    set_ingestion_job,
+    get_ingestion_job_status,
+    set_failed_pdf_hash,
+    get_failed_pdf_hash,
     clear_session
 )
 
@@ -60,6 +67,7 @@ __all__ = [
     'display_pdf_uploader',
     'display_question_input',
     'display_answer',
+    'display_answer_stream',
     'display_source_documents',
     'display_sidebar_info',
     'display_error',
@@ -67,13 +75,19 @@ __all__ = [
     'display_info',
     'display_warning',
     'display_chat_history',
+    'display_ingestion_progress',
     'initialize_session_state',
     'update_pdf_session',
     'get_current_pdf_id',
     'get_current_pdf_name',
+    'get_current_pdf_hash',
     'get_qa_chain',
     'is_pdf_loaded',
     'add_to_chat_history',
     'get_chat_history',
+    'set_ingestion_job',
+    'get_ingestion_job_status',
+    'set_failed_pdf_hash',
+    'get_failed_pdf_hash',
     'clear_session'
 ]
\ No newline at end of file
@@ -5,7 +5,9 @@ Handles Streamlit session state management
 """
 
 import streamlit as st
-from typing import Optional
+from typing import Optional, Dict, Any
+from ingestion import get_job
+from retrieval import get_qa_chain_for_pdf
 
 
 def initialize_session_state():
@@ -17,28 +19,37 @@ def initialize_session_state():
     if 'pdf_name' not in st.session_state:
         st.session_state.pdf_name = None
     
-    if 'qa_chain' not in st.session_state:
-        st.session_state.qa_chain = None
+    if 'pdf_hash' not in st.session_state:
+        st.session_state.pdf_hash = None
     
     if 'processing' not in st.session_state:
         st.session_state.processing = False
     
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
+    
+    if 'ingestion_job_id' not in st.session_state:
+        st.session_state.ingestion_job_id = None
+    
+    if 'failed_pdf_hash' not in st.session_state:
+        st.session_state.failed_pdf_hash = None
 
 
-def update_pdf_session(pdf_id: str, pdf_name: str, qa_chain):
+def update_pdf_session(pdf_id: str, pdf_name: str, pdf_hash: Optional[str] = None):
     """
     Update session state with new PDF information
     
+    The QA chain itself is not stored in the session; it is shared by all
+    sessions through the process-wide registry (see get_qa_chain).
+    
     Args:
         pdf_id: Unique PDF identifier
         pdf_name: Name of the PDF file
-        qa_chain: Configured QA chain
+        pdf_hash: Content hash of the uploaded PDF bytes
     """
     st.session_state.pdf_id = pdf_id
     st.session_state.pdf_name = pdf_name
-    st.session_state.qa_chain = qa_chain
+    st.session_state.pdf_hash = pdf_hash
     st.session_state.chat_history = []  # Reset chat history for new PDF
 
 
@@ -62,14 +73,27 @@ def get_current_pdf_name() -> Optional[str]:
     return st.session_state.get('pdf_name', None)
 
 
+def get_current_pdf_hash() -> Optional[str]:
+    """
+    Get the content hash of the current PDF from session
+    
+    Returns:
+        str or None: Current PDF content hash
+    """
+    return st.session_state.get('pdf_hash', None)
+
+
 def get_qa_chain():
     """
-    Get the current QA chain from session
+    Get the shared QA chain for the session's current PDF
     
     Returns:
         QA chain or None
     """
-    return st.session_state.get('qa_chain', None)
+    pdf_id = st.session_state.get('pdf_id', None)
+    if pdf_id is None:
+        return None
+    return get_qa_chain_for_pdf(pdf_id)
 
 
 def is_pdf_loaded() -> bool:
@@ -79,10 +103,7 @@ def is_pdf_loaded() -> bool:
     Returns:
         bool: True if PDF is loaded
     """
-    return (
-        st.session_state.get('pdf_id') is not None and
-        st.session_state.get('qa_chain') is not None
-    )
+    return st.session_state.get('pdf_id') is not None
 
 
 def add_to_chat_history(question: str, answer: str):
@@ -109,10 +130,55 @@ def get_chat_history() -> list:
     return st.session_state.get('chat_history', [])
 
 
+def set_ingestion_job(job_id: Optional[str]):
+    """
+    Remember the background ingestion job for this session's upload
+    
+    Args:
+        job_id: Ingestion job identifier (None to forget the job)
+    """
+    st.session_state.ingestion_job_id = job_id
+
+
+def set_failed_pdf_hash(pdf_hash: Optional[str]):
+    """
+    Remember the content hash of an upload whose ingestion failed
+    
+    Args:
+        pdf_hash: Content hash of the failed upload (None to forget it)
+    """
+    st.session_state.failed_pdf_hash = pdf_hash
+
+
+def get_failed_pdf_hash() -> Optional[str]:
+    """
+    Get the content hash of the last upload whose ingestion failed
+    
+    Returns:
+        str or None: Content hash, until a different file is uploaded
+    """
+    return st.session_state.get('failed_pdf_hash', None)
+
+
+def get_ingestion_job_status() -> Optional[Dict[str, Any]]:
+    """
+    Poll the state of this session's ingestion job
+    
+    Returns:
+        Dict with job status and progress counters, or None if no job
+    """
+    job_id = st.session_state.get('ingestion_job_id', None)
+    if job_id is None:
+        return None
+    return get_job(job_id)
+
+
 def clear_session():
     """Clear all session state"""
     st.session_state.pdf_id = None
     st.session_state.pdf_name = None
-    st.session_state.qa_chain = None
+    st.session_state.pdf_hash = None
     st.session_state.chat_history = []
-    st.session_state.processing = False
\ No newline at end of file
+    st.session_state.processing = False
+    st.session_state.ingestion_job_id = None
+    st.session_state.failed_pdf_hash = None
\ No newline at end of file
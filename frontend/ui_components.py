@@ -5,7 +5,7 @@ Reusable Streamlit UI components
 """
 
 import streamlit as st
-from typing import Optional, List
+from typing import Optional, List, Iterable, Callable
 
 
 def display_header():
@@ -67,6 +67,28 @@ def display_answer(answer: str):
     st.success(answer)
 
 
+def display_answer_stream(token_stream: Iterable[str]) -> str:
+    """
+    Display the answer incrementally as tokens arrive
+    
+    Args:
+        token_stream: Iterable of answer text fragments
+        
+    Returns:
+        str: Full answer text once the stream is exhausted
+    """
+    st.subheader("💬 Answer")
+    placeholder = st.empty()
+    answer = ""
+    
+    for token in token_stream:
+        answer += token
+        placeholder.success(answer + "▌")
+    
+    placeholder.success(answer)
+    return answer
+
+
 def display_source_documents(source_docs: list):
     """
     Display source documents in an expander
@@ -79,7 +101,14 @@ def display_source_documents(source_docs: list):
     
     with st.expander(f"📚 View Source Context ({len(source_docs)} chunks)", expanded=False):
         for i, doc in enumerate(source_docs, 1):
-            st.markdown(f"**Chunk {i}**")
+            page = doc.metadata.get("page") if hasattr(doc, 'metadata') else None
+            page_end = doc.metadata.get("page_end", page) if page else None
+            if page and page_end != page:
+                st.markdown(f"**Chunk {i}** · pages {page}–{page_end}")
+            elif page:
+                st.markdown(f"**Chunk {i}** · page {page}")
+            else:
+                st.markdown(f"**Chunk {i}**")
             
             # Display content
             st.text_area(
@@ -129,6 +158,40 @@ def display_sidebar_info(pdf_name: Optional[str] = None, pdf_id: Optional[str] =
         """)
 
 
+@st.fragment(run_every=1.0)
+def display_ingestion_progress(get_job_status: Callable[[], Optional[dict]], was_queryable: bool):
+    """
+    Display live progress of a background ingestion job
+    
+    Re-runs itself every second without rerunning the whole script, and
+    triggers a full rerun once the job finishes or becomes queryable.
+    
+    Args:
+        get_job_status: Returns the current job state dict (or None)
+        was_queryable: Whether the job was queryable when the page rendered
+    """
+    job = get_job_status()
+    if job is None:
+        return
+    
+    if job['status'] not in ('queued', 'running') or job['queryable'] != was_queryable:
+        st.rerun()
+    
+    st.markdown(f"**⏳ Processing '{job['pdf_name']}'** ({job['stage']})")
+    
+    if job['pages_total']:
+        st.progress(
+            job['pages_done'] / job['pages_total'],
+            text=f"📖 Extracted {job['pages_done']}/{job['pages_total']} pages"
+        )
+    
+    chunks_total = f"/{job['chunks_total']}" if job['chunks_total'] else ""
+    st.caption(
+        f"🔍 Embedded {job['chunks_embedded']}{chunks_total} chunks · "
+        f"💾 Stored {job['chunks_stored']}{chunks_total} chunks"
+    )
+
+
 def display_processing_status(status: str):
     """
     Display a processing status message
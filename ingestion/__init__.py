@@ -0,0 +1,10 @@
+"""Ingestion package for RAG Chatbot"""
+
+from .pipeline import ingest_pdf_streaming
+from .jobs import submit_ingestion_job, get_job
+
+__all__ = [
+    'ingest_pdf_streaming',
+    'submit_ingestion_job',
+    'get_job'
+]
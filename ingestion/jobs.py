@@ -0,0 +1,406 @@
+# Background ingestion jobs
+"""
+Ingestion Jobs Module
+Runs PDF ingestion on a bounded worker pool and tracks progress in a job table
+"""
+
+import os
+import json
+import uuid
+import socket
+import sqlite3
+import threading
+from io import BytesIO
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any
+import config
+from utils.pdf_processor import extract_pages_from_pdf, iter_chunk_spans, validate_pdf_content
+from database.vector_store import store_embeddings, delete_document_vectors, discard_document_version
+from database.document_store import write_document_text, delete_document_text
+from database.document_registry import (
+    register_document,
+    get_document,
+    get_document_versions,
+    begin_document_version,
+    fail_document_version
+)
+from ingestion.pipeline import ingest_pdf_streaming, report_chunk_tokens
+
+
+ACTIVE_STATUSES = ("queued", "running")
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_connection = None  # Singleton pattern
+_executor = None
+_lock = threading.Lock()
+
+
+def _process_alive(pid: int) -> bool:
+    """Check whether a process with this pid exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _get_connection() -> sqlite3.Connection:
+    """
+    Get or open the job table (singleton)
+
+    Active jobs owned by a dead process on this host can never finish
+    (their PDF bytes lived in memory), so they are marked failed on first
+    open and whatever they had stored is deleted: a partial ingestion, or
+    the version an interrupted update was building (unless a live job is
+    working on the same document). Jobs carrying this process's own
+    worker id are dead too (a restarted container reuses the hostname and
+    pid, and no job has been submitted yet), as are jobs without progress
+    for INGESTION_JOB_TIMEOUT_SECONDS.
+
+    Returns:
+        sqlite3.Connection: Open job database connection
+    """
+    global _connection
+
+    if _connection is None:
+        os.makedirs(os.path.dirname(config.INGESTION_JOBS_PATH) or ".", exist_ok=True)
+        connection = sqlite3.connect(config.INGESTION_JOBS_PATH, check_same_thread=False, timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                pdf_id TEXT NOT NULL,
+                pdf_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                pages_done INTEGER NOT NULL DEFAULT 0,
+                pages_total INTEGER,
+                chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                chunks_stored INTEGER NOT NULL DEFAULT 0,
+                chunks_total INTEGER,
+                queryable INTEGER NOT NULL DEFAULT 0,
+                chunk_tokens TEXT,
+                update_of TEXT,
+                error TEXT,
+                worker TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        # Job tables created before token reporting lack the chunk_tokens column
+        columns = [row["name"] for row in connection.execute("PRAGMA table_info(jobs)")]
+        if "chunk_tokens" not in columns:
+            connection.execute("ALTER TABLE jobs ADD COLUMN chunk_tokens TEXT")
+        # ...and before document updates, the update_of column
+        if "update_of" not in columns:
+            connection.execute("ALTER TABLE jobs ADD COLUMN update_of TEXT")
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_content_hash ON jobs (content_hash)"
+        )
+        host = socket.gethostname()
+        active = connection.execute(
+            "SELECT job_id, pdf_id, worker, updated_at FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchall()
+        interrupted = []
+        running = set()
+        for row in active:
+            worker_host, _, worker_pid = row["worker"].rpartition(":")
+            if (
+                row["worker"] == WORKER_ID or
+                (worker_host == host and not _process_alive(int(worker_pid))) or
+                _is_stale(row)
+            ):
+                connection.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart' "
+                    "WHERE job_id = ?",
+                    (row["job_id"],)
+                )
+                interrupted.append(row["pdf_id"])
+            else:
+                running.add(row["pdf_id"])
+        connection.commit()
+        _connection = connection
+
+        for pdf_id in interrupted:
+            if pdf_id not in running:
+                _discard_interrupted(pdf_id)
+
+    return _connection
+
+
+def _is_stale(row: sqlite3.Row) -> bool:
+    """Whether an active job has made no progress for INGESTION_JOB_TIMEOUT_SECONDS"""
+    deadline = datetime.now() - timedelta(seconds=config.INGESTION_JOB_TIMEOUT_SECONDS)
+    return datetime.fromisoformat(row["updated_at"]) < deadline
+
+
+def _discard_interrupted(pdf_id: str):
+    """Delete what an interrupted ingestion or update stored"""
+    document = get_document(pdf_id)
+    if document is not None and document["status"] != "indexing":
+        # Fully indexed before the interruption; only an update can be left over
+        for version in get_document_versions(pdf_id):
+            if version["status"] != "building":
+                continue
+            try:
+                discard_document_version(pdf_id, version["version"])
+                print(f"Discarded version {version['version']} of interrupted update (ID: {pdf_id})")
+            except Exception as e:
+                print(f"Error discarding version {version['version']} of {pdf_id}: {str(e)}")
+        return
+
+    try:
+        delete_document_vectors(pdf_id)
+        print(f"Deleted partial ingestion of interrupted job (ID: {pdf_id})")
+    except Exception as e:
+        print(f"Error deleting partial ingestion {pdf_id}: {str(e)}")
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Get or create the ingestion worker pool (singleton)
+
+    Returns:
+        ThreadPoolExecutor: Pool running at most INGESTION_MAX_CONCURRENT_JOBS jobs
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=config.INGESTION_MAX_CONCURRENT_JOBS,
+            thread_name_prefix="ingestion"
+        )
+
+    return _executor
+
+
+def _update_job(job_id: str, **fields):
+    """Update job columns and touch updated_at"""
+    fields["updated_at"] = datetime.now().isoformat()
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+
+    with _lock:
+        connection = _get_connection()
+        connection.execute(
+            f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+            (*fields.values(), job_id)
+        )
+        connection.commit()
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the current state of an ingestion job
+
+    Args:
+        job_id: Job identifier
+
+    Returns:
+        Dict with job columns (status, stage, progress counters, ...) or None;
+        'chunk_tokens' is the tokens per chunk summary once ingested
+    """
+    try:
+        with _lock:
+            row = _get_connection().execute(
+                "SELECT * FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["queryable"] = bool(job["queryable"])
+        if job["chunk_tokens"]:
+            job["chunk_tokens"] = json.loads(job["chunk_tokens"])
+        return job
+
+    except Exception as e:
+        raise Exception(f"Error reading ingestion job: {str(e)}")
+
+
+def _run_streaming(job_id: str, pdf_bytes: bytes, pdf_id: str, pdf_name: str, content_hash: str) -> Dict[str, Any]:
+    """Run the streaming pipeline, mirroring its progress into the job table"""
+    counters = {
+        "extracting": "pages_done",
+        "embedding": "chunks_embedded",
+        "upserting": "chunks_stored"
+    }
+
+    def on_progress(stage: str, done: int, total: Optional[int]):
+        if stage == "queryable":
+            _update_job(job_id, queryable=1)
+        elif stage == "extracting":
+            _update_job(job_id, stage=stage, pages_done=done, pages_total=total)
+        else:
+            _update_job(job_id, stage=stage, **{counters[stage]: done})
+
+    return ingest_pdf_streaming(BytesIO(pdf_bytes), pdf_id, pdf_name, content_hash, on_progress)
+
+
+def _run_staged(job_id: str, pdf_bytes: bytes, pdf_id: str, pdf_name: str, content_hash: str) -> Dict[str, Any]:
+    """Run extraction, chunking and embedding as separate stages"""
+    _update_job(job_id, stage="extracting")
+    pages = extract_pages_from_pdf(BytesIO(pdf_bytes))
+    text = "\n".join(page for page in pages if page).strip()
+    _update_job(job_id, pages_done=len(pages), pages_total=len(pages))
+
+    if not validate_pdf_content(text):
+        return {"pdf_id": pdf_id, "total_chunks": 0}
+
+    _update_job(job_id, stage="chunking")
+    write_document_text(pdf_id, pages)
+    spans = list(iter_chunk_spans(pages))
+    chunks = [span["text"] for span in spans]
+
+    _update_job(job_id, stage="embedding", chunks_total=len(chunks))
+    store_embeddings(chunks, pdf_id, pdf_name, spans)
+    _update_job(job_id, chunks_embedded=len(chunks), chunks_stored=len(chunks))
+
+    document = register_document(content_hash, pdf_id, pdf_name, len(chunks))
+    return {
+        "pdf_id": document["pdf_id"],
+        "total_chunks": len(chunks),
+        "chunk_tokens": report_chunk_tokens(
+            [span["tokens"] for span in spans if "tokens" in span], pdf_name
+        )
+    }
+
+
+def _run_update(job_id: str, pdf_bytes: bytes, pdf_id: str, pdf_name: str, content_hash: str) -> Dict[str, Any]:
+    """Re-index an already indexed namespace with a revised PDF, embedding only changed chunks"""
+    _update_job(job_id, stage="extracting")
+    pages = extract_pages_from_pdf(BytesIO(pdf_bytes))
+    text = "\n".join(page for page in pages if page).strip()
+    _update_job(job_id, pages_done=len(pages), pages_total=len(pages))
+
+    if not validate_pdf_content(text):
+        return {"pdf_id": pdf_id, "total_chunks": 0}
+
+    _update_job(job_id, stage="chunking")
+    version = begin_document_version(pdf_id, content_hash, pdf_name)
+    try:
+        write_document_text(pdf_id, pages, version)
+        spans = list(iter_chunk_spans(pages))
+        chunks = [span["text"] for span in spans]
+
+        _update_job(job_id, stage="embedding", chunks_total=len(chunks))
+        store_embeddings(chunks, pdf_id, pdf_name, spans, version)
+    except Exception:
+        fail_document_version(pdf_id, version)
+        delete_document_text(pdf_id, version)
+        raise
+    _update_job(job_id, chunks_embedded=len(chunks), chunks_stored=len(chunks))
+
+    return {
+        "pdf_id": pdf_id,
+        "total_chunks": len(chunks),
+        "chunk_tokens": report_chunk_tokens(
+            [span["tokens"] for span in spans if "tokens" in span], pdf_name
+        )
+    }
+
+
+def _run_job(
+    job_id: str,
+    pdf_bytes: bytes,
+    pdf_id: str,
+    pdf_name: str,
+    content_hash: str,
+    update: bool = False
+):
+    """Worker entry point: ingest (or re-index) one PDF and record the outcome"""
+    try:
+        _update_job(job_id, status="running")
+
+        if update:
+            result = _run_update(job_id, pdf_bytes, pdf_id, pdf_name, content_hash)
+        elif config.STREAMING_INGESTION:
+            result = _run_streaming(job_id, pdf_bytes, pdf_id, pdf_name, content_hash)
+        else:
+            result = _run_staged(job_id, pdf_bytes, pdf_id, pdf_name, content_hash)
+
+        if result["total_chunks"] == 0:
+            _update_job(job_id, status="failed", error="PDF appears to be empty or has no extractable text")
+            return
+
+        _update_job(
+            job_id,
+            status="done",
+            stage="done",
+            pdf_id=result["pdf_id"],
+            chunks_total=result["total_chunks"],
+            chunk_tokens=json.dumps(result["chunk_tokens"]) if result.get("chunk_tokens") else None,
+            queryable=1
+        )
+
+    except Exception as e:
+        _update_job(job_id, status="failed", error=str(e))
+
+
+def submit_ingestion_job(
+    pdf_bytes: bytes,
+    pdf_name: str,
+    content_hash: str,
+    update_pdf_id: Optional[str] = None
+) -> str:
+    """
+    Queue a PDF for background ingestion
+
+    If the same content is already being ingested for the same target (a
+    new document, or an update of update_pdf_id), the existing job is
+    returned instead of starting a second one. Jobs without progress for
+    INGESTION_JOB_TIMEOUT_SECONDS are ignored.
+
+    Args:
+        pdf_bytes: PDF file content
+        pdf_name: Name of the PDF file
+        content_hash: Hash of the PDF bytes
+        update_pdf_id: Indexed namespace this PDF is a revision of; only
+            its changed chunks are embedded and it switches to the new
+            version once they are stored (default: ingest as a new PDF)
+
+    Returns:
+        str: Job identifier to poll with get_job()
+    """
+    try:
+        with _lock:
+            connection = _get_connection()
+            stale_before = (
+                datetime.now() - timedelta(seconds=config.INGESTION_JOB_TIMEOUT_SECONDS)
+            ).isoformat()
+            row = connection.execute(
+                f"""
+                SELECT job_id FROM jobs
+                WHERE content_hash = ? AND update_of IS ? AND updated_at >= ?
+                    AND status IN ({",".join("?" * len(ACTIVE_STATUSES))})
+                """,
+                (content_hash, update_pdf_id, stale_before, *ACTIVE_STATUSES)
+            ).fetchone()
+            if row:
+                return row["job_id"]
+
+            job_id = str(uuid.uuid4())
+            pdf_id = update_pdf_id or str(uuid.uuid4())
+            now = datetime.now().isoformat()
+            connection.execute(
+                """
+                INSERT INTO jobs
+                    (job_id, content_hash, pdf_id, pdf_name, status, stage, update_of, worker, created_at, updated_at)
+                VALUES (?, ?, ?, ?, 'queued', 'queued', ?, ?, ?, ?)
+                """,
+                (job_id, content_hash, pdf_id, pdf_name, update_pdf_id, WORKER_ID, now, now)
+            )
+            connection.commit()
+
+        _get_executor().submit(
+            _run_job, job_id, pdf_bytes, pdf_id, pdf_name, content_hash, update_pdf_id is not None
+        )
+        return job_id
+
+    except Exception as e:
+        raise Exception(f"Error submitting ingestion job: {str(e)}")
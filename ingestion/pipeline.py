@@ -0,0 +1,224 @@
+# Streaming ingestion
+"""
+Ingestion Pipeline Module
+Streams a PDF through extract → chunk → embed → upsert with bounded queues
+"""
+
+import time
+import queue
+import threading
+from typing import List, Dict, Any, Callable, Optional
+import config
+from utils.pdf_processor import (
+    iter_pages_from_pdf,
+    iter_chunk_spans,
+    get_pdf_page_count,
+    summarize_chunk_tokens
+)
+from utils.embeddings import get_embedding_model, embedding_slots
+from database.vector_store import upsert_embeddings, delete_document_vectors
+from database.document_store import open_document_text, delete_document_text
+from database.document_registry import register_document, mark_document_ready
+
+
+_END = object()  # Marks the end of a stage's output
+
+
+def _put(stage_queue: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put an item, giving up if the pipeline is being stopped"""
+    while not stop.is_set():
+        try:
+            stage_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(stage_queue: queue.Queue, stop: threading.Event):
+    """Get an item, returning _END if the pipeline is being stopped"""
+    while not stop.is_set():
+        try:
+            return stage_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def report_chunk_tokens(token_counts: List[int], pdf_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Log how well chunks fill the embedding model's input
+
+    Args:
+        token_counts: Embedding tokenizer count of each chunk
+        pdf_name: Name of the PDF file
+
+    Returns:
+        Dict from summarize_chunk_tokens(), or None without counts
+    """
+    if not token_counts:
+        return None
+
+    summary = summarize_chunk_tokens(token_counts)
+    print(f"Tokens per chunk for PDF: {pdf_name} (limit {summary['limit']}): "
+          f"min {summary['min']}, p50 {summary['p50']}, p90 {summary['p90']}, "
+          f"p99 {summary['p99']}, max {summary['max']}; "
+          f"{summary['truncated']} truncated, {summary['small']} under a quarter of the limit")
+    return summary
+
+
+def ingest_pdf_streaming(
+    pdf_file,
+    pdf_id: str,
+    pdf_name: str,
+    content_hash: str,
+    on_progress: Optional[Callable[[str, int, Optional[int]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Ingest a PDF as a pipeline of extract/chunk, embed and upsert stages
+
+    Pages are extracted, appended to the document store and chunked on a
+    producer thread, embedded on the calling thread and upserted on a
+    third thread. Stages are connected by
+    queues of INGESTION_QUEUE_SIZE batches, so memory stays flat regardless
+    of document size. The document is registered as "indexing" (and is
+    therefore queryable) as soon as its first batch is stored, and marked
+    "ready" when the last one lands. On failure the partial namespace is
+    deleted again.
+
+    Args:
+        pdf_file: File object or path to PDF
+        pdf_id: Namespace to store the chunks in
+        pdf_name: Name of the PDF file
+        content_hash: Hash of the PDF bytes (registry key)
+        on_progress: Called with (stage, done, total) where stage is
+            "extracting" (pages), "embedding" or "upserting" (chunks), or
+            "queryable"; total is None when not known yet
+
+    Returns:
+        Dict with 'pdf_id' (may be another upload's namespace if the same
+        content was registered concurrently), 'total_chunks', 'seconds'
+        and 'chunk_tokens' (see report_chunk_tokens)
+    """
+    batch_size = config.INGESTION_BATCH_SIZE
+    chunk_queue = queue.Queue(maxsize=config.INGESTION_QUEUE_SIZE)
+    upsert_queue = queue.Queue(maxsize=config.INGESTION_QUEUE_SIZE)
+    stop = threading.Event()
+    errors = []
+    token_counts = []
+    state = {"stored": 0, "pdf_id": pdf_id}
+    start_time = time.perf_counter()
+
+    def report(stage: str, done: int, total: Optional[int] = None):
+        if on_progress:
+            on_progress(stage, done, total)
+
+    def stored_pages(writer):
+        num_pages = get_pdf_page_count(pdf_file)
+        for page_number, page in enumerate(iter_pages_from_pdf(pdf_file), 1):
+            # Written before any of its chunks, so their vectors can be hydrated
+            writer.add_page(page)
+            report("extracting", page_number, num_pages)
+            yield page
+
+    def produce_chunks():
+        try:
+            with open_document_text(pdf_id) as writer:
+                batch = []
+                for span in iter_chunk_spans(stored_pages(writer)):
+                    if stop.is_set():
+                        return
+                    batch.append(span)
+                    if "tokens" in span:
+                        token_counts.append(span["tokens"])
+                    if len(batch) == batch_size:
+                        _put(chunk_queue, batch, stop)
+                        batch = []
+                if batch:
+                    _put(chunk_queue, batch, stop)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(chunk_queue, _END, stop)
+
+    def upsert_batches():
+        try:
+            while True:
+                item = _get(upsert_queue, stop)
+                if item is _END:
+                    return
+                spans, vectors, first_index = item
+                texts = [span["text"] for span in spans]
+                upsert_embeddings(
+                    pdf_id, texts, vectors,
+                    list(range(first_index, first_index + len(texts))),
+                    spans
+                )
+
+                first_batch = state["stored"] == 0
+                state["stored"] += len(texts)
+                report("upserting", state["stored"])
+
+                if first_batch:
+                    # Queryable from now on; another upload of the same bytes may have won
+                    document = register_document(
+                        content_hash, pdf_id, pdf_name, state["stored"], status="indexing"
+                    )
+                    state["pdf_id"] = document["pdf_id"]
+                    if document["pdf_id"] != pdf_id:
+                        stop.set()
+                        return
+                    report("queryable", state["stored"])
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    producer = threading.Thread(target=produce_chunks, name=f"ingest-chunk-{pdf_id[:8]}", daemon=True)
+    uploader = threading.Thread(target=upsert_batches, name=f"ingest-upsert-{pdf_id[:8]}", daemon=True)
+    producer.start()
+    uploader.start()
+
+    embedded = 0
+    try:
+        embedding_model = get_embedding_model()
+        while True:
+            batch = _get(chunk_queue, stop)
+            if batch is _END:
+                break
+            with embedding_slots:
+                vectors = embedding_model.embed_documents([span["text"] for span in batch])
+            _put(upsert_queue, (batch, vectors, embedded), stop)
+            embedded += len(batch)
+            report("embedding", embedded)
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(upsert_queue, _END, stop)
+        producer.join()
+        uploader.join()
+
+    if errors or state["pdf_id"] != pdf_id:
+        # Drop the partial namespace (and its registry entry, if any)
+        if state["stored"]:
+            delete_document_vectors(pdf_id)
+        delete_document_text(pdf_id)
+        if errors:
+            raise Exception(f"Error ingesting PDF: {str(errors[0])}")
+    elif state["stored"]:
+        mark_document_ready(content_hash, state["stored"])
+    else:
+        # No chunks (e.g. a scanned PDF without a text layer): nothing will ever read the text
+        delete_document_text(pdf_id)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Streamed {state['stored']} chunks for PDF: {pdf_name} (ID: {state['pdf_id']}) "
+          f"in {elapsed:.1f}s")
+
+    return {
+        "pdf_id": state["pdf_id"],
+        "total_chunks": state["stored"],
+        "seconds": elapsed,
+        "chunk_tokens": report_chunk_tokens(token_counts, pdf_name)
+    }
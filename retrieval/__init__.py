@@ -1,10 +1,23 @@
 """Retrieval package for RAG Chatbot"""
 
 from .retriever import create_retriever
-from .qa_chain import build_qa_chain, ask_question
+from .qa_chain import build_qa_chain, get_qa_chain_for_pdf, get_registry_stats, ask_question, stream_question, aask_question, astream_question
+from .cache import invalidate_pdf_cache, get_cache_stats
+from .reranker import get_reranker_stats
+from .context_packer import pack_context, get_context_stats
 
 __all__ = [
     'create_retriever',
     'build_qa_chain',
-    'ask_question'
+    'get_qa_chain_for_pdf',
+    'get_registry_stats',
+    'ask_question',
+    'stream_question',
+    'aask_question',
+    'astream_question',
+    'invalidate_pdf_cache',
+    'get_cache_stats',
+    'get_reranker_stats',
+    'pack_context',
+    'get_context_stats'
 ]
\ No newline at end of file
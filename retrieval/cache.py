@@ -0,0 +1,208 @@
+# Query and answer caching
+"""
+QA Cache Module
+Caches query embeddings and answers for repeated questions
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+import config
+from utils.embeddings import get_embedding_model
+from utils.prompts import PROMPT_VERSION
+from database.vector_store import evict_vector_stores
+from database.document_registry import get_document_version
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries expire after a TTL
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches the predicate"""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries)
+            }
+
+
+_query_embedding_cache = TTLCache(config.QUERY_CACHE_MAX_ENTRIES, config.QUERY_CACHE_TTL_SECONDS)
+_answer_cache = TTLCache(config.ANSWER_CACHE_MAX_ENTRIES, config.ANSWER_CACHE_TTL_SECONDS)
+_query_embedding_model = None  # Singleton pattern
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a question so trivially different phrasings share cache entries
+
+    Args:
+        query: Raw user question
+
+    Returns:
+        str: Lowercased question with collapsed whitespace and no trailing punctuation
+    """
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!. ")
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that reuses query vectors for normalized repeat questions
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = (config.EMBEDDING_MODEL_NAME, normalize_query(text))
+        vector = _query_embedding_cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            _query_embedding_cache.set(key, vector)
+        return vector
+
+
+def get_query_embedding_model() -> CachedQueryEmbeddings:
+    """
+    Get the embedding model wrapped with the in-memory query cache (singleton)
+
+    Returns:
+        CachedQueryEmbeddings: Query-caching embedding model
+    """
+    global _query_embedding_model
+
+    if _query_embedding_model is None:
+        _query_embedding_model = CachedQueryEmbeddings(get_embedding_model())
+
+    return _query_embedding_model
+
+
+def answer_cache_key(pdf_id: str, question: str) -> Tuple[str, int, str, str, str]:
+    """
+    Build the answer cache key for a question against a document
+
+    The live document version is part of the key, so answers cached by any
+    process before a re-index are not served for the new version (after
+    DOCUMENT_VERSION_TTL_SECONDS at most, see get_document_version).
+
+    Args:
+        pdf_id: PDF identifier
+        question: User question
+
+    Returns:
+        Tuple of (pdf_id, document version, normalized question, LLM model,
+        prompt version)
+    """
+    return (
+        pdf_id, get_document_version(pdf_id), normalize_query(question), config.LLM_MODEL, PROMPT_VERSION
+    )
+
+
+def get_cached_answer(pdf_id: str, question: str) -> Tuple[Optional[tuple], Optional[Dict[str, Any]]]:
+    """
+    Look up a previously generated answer
+
+    The returned key is the one to store a newly generated answer under:
+    it names the version the answer is about to be generated from, so an
+    answer that is still being generated when a re-index goes live is
+    never stored under the new version.
+
+    Args:
+        pdf_id: PDF identifier
+        question: User question
+
+    Returns:
+        Tuple of the cache key (None if answers are not cached) and a dict
+        with 'answer' and 'source_documents', or None on a miss
+    """
+    if not config.ANSWER_CACHE_ENABLED or pdf_id is None:
+        return None, None
+    key = answer_cache_key(pdf_id, question)
+    return key, _answer_cache.get(key)
+
+
+def cache_answer(key: Optional[tuple], answer: str, source_documents: list):
+    """
+    Store a generated answer with its source documents
+
+    Args:
+        key: Cache key returned by get_cached_answer() (None: not cached)
+        answer: Generated answer text
+        source_documents: Documents the answer was generated from
+    """
+    if key is None:
+        return
+    _answer_cache.set(key, {"answer": answer, "source_documents": list(source_documents)})
+
+
+def invalidate_pdf_cache(pdf_id: str) -> int:
+    """
+    Drop all cached answers and shared resources for a document (e.g. after
+    its namespace is deleted or re-indexed)
+
+    Args:
+        pdf_id: PDF identifier
+
+    Returns:
+        int: Number of cached answers removed
+    """
+    evict_vector_stores(pdf_id)  # Also drops QA chains using them
+    return _answer_cache.invalidate(lambda key: key[0] == pdf_id)
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get hit/miss counters for both cache levels
+
+    Returns:
+        Dict with 'query_embeddings' and 'answers' statistics
+    """
+    return {
+        "query_embeddings": _query_embedding_cache.get_stats(),
+        "answers": _answer_cache.get_stats()
+    }
@@ -0,0 +1,171 @@
+# Prompt context assembly
+"""
+Context Packer Module
+Merges overlapping retrieved chunks and fits them into a token budget
+"""
+
+import threading
+from typing import List, Dict, Any, Tuple
+from langchain_core.documents import Document
+import config
+
+
+MIN_OVERLAP_CHARS = 16   # Shorter suffix/prefix matches are treated as coincidence
+
+_stats_lock = threading.Lock()
+_stats = {"questions": 0, "tokens_in": 0, "tokens_out": 0, "chunks_in": 0, "chunks_used": 0}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the LLM token count of a text
+
+    The LLM's tokenizer lives in the Ollama server, so a characters per
+    token ratio is used instead.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        int: Approximate number of tokens
+    """
+    return -(-len(text) // config.CONTEXT_CHARS_PER_TOKEN)
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right"""
+    longest = min(len(left), len(right), config.CHUNK_OVERLAP * 2)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Cut text to max_chars, preferring to end at a sentence or word"""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    for separator in (". ", "\n", " "):
+        position = cut.rfind(separator)
+        if position > max_chars // 2:
+            return cut[:position + 1].rstrip()
+    return cut
+
+
+def _chunk_index(doc: Document):
+    index = doc.metadata.get("chunk_index")
+    return int(index) if index is not None else None
+
+
+def pack_context(docs: List[Document], max_tokens: int = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the prompt context from retrieved documents
+
+    Chunks are taken in retrieval order (most relevant first) until the
+    token budget is spent; a chunk's cost is its text minus the overlap
+    it shares with already selected neighbours. Duplicates are dropped,
+    neighbouring chunks (consecutive chunk_index) are merged into one
+    passage without their repeated overlap, and passages are ordered by
+    their position in the document.
+
+    Args:
+        docs: Retrieved documents, best first
+        max_tokens: Token budget (default CONTEXT_MAX_TOKENS)
+
+    Returns:
+        Tuple of the context text and a dict with 'tokens_in' (naive join),
+        'tokens_out', 'tokens_saved', 'chunks_in', 'chunks_used' and 'passages'
+    """
+    if max_tokens is None:
+        max_tokens = config.CONTEXT_MAX_TOKENS
+    max_chars = max_tokens * config.CONTEXT_CHARS_PER_TOKEN
+
+    selected = {}       # chunk_index -> text
+    unindexed = []      # Texts without a chunk_index, kept in retrieval order
+    seen_texts = set()
+    used_chars = 0
+
+    for doc in docs:
+        text = doc.page_content.strip()
+        index = _chunk_index(doc)
+        if not text or text in seen_texts or index in selected:
+            continue
+
+        cost = len(text) + 2  # Passage separator
+        if index is not None:
+            if index - 1 in selected:
+                cost -= _overlap(selected[index - 1], text) + 2
+            if index + 1 in selected:
+                cost -= _overlap(text, selected[index + 1]) + 2
+
+        if used_chars + cost > max_chars:
+            if used_chars == 0:
+                # Never send an empty context: keep the start of the best chunk
+                text = _truncate(text, max_chars)
+                cost = len(text)
+            else:
+                continue
+
+        seen_texts.add(text)
+        used_chars += cost
+        if index is None:
+            unindexed.append(text)
+        else:
+            selected[index] = text
+
+    # Merge runs of consecutive chunks, dropping the overlap they repeat
+    passages = []
+    previous_index = None
+    for index in sorted(selected):
+        text = selected[index]
+        if previous_index is not None and index == previous_index + 1:
+            overlap = _overlap(passages[-1], text)
+            passages[-1] = passages[-1] + (text[overlap:] if overlap else "\n" + text)
+        else:
+            passages.append(text)
+        previous_index = index
+
+    # Hits contained in another passage add nothing
+    passages += [
+        text for text in unindexed
+        if not any(text in passage for passage in passages)
+    ]
+
+    context = "\n\n".join(passages)
+    tokens_in = estimate_tokens("\n\n".join(doc.page_content for doc in docs))
+    tokens_out = estimate_tokens(context)
+    stats = {
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "tokens_saved": tokens_in - tokens_out,
+        "chunks_in": len(docs),
+        "chunks_used": len(selected) + len(unindexed),
+        "passages": len(passages)
+    }
+    _record(stats)
+    return context, stats
+
+
+def _record(stats: Dict[str, Any]):
+    with _stats_lock:
+        _stats["questions"] += 1
+        for key in ("tokens_in", "tokens_out", "chunks_in", "chunks_used"):
+            _stats[key] += stats[key]
+
+
+def get_context_stats() -> Dict[str, Any]:
+    """
+    Get context packing counters since startup
+
+    Returns:
+        Dict with totals plus 'tokens_saved' and 'mean_tokens_saved'
+        (per question)
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["tokens_saved"] = stats["tokens_in"] - stats["tokens_out"]
+    stats["mean_tokens_saved"] = (
+        stats["tokens_saved"] / stats["questions"] if stats["questions"] else 0.0
+    )
+    return stats
@@ -120,17 +120,118 @@ QA Chain Module
 Handles question answering chain construction and execution
 """
 
-from langchain_community.llms import Ollama
+import asyncio
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List, Iterator, AsyncIterator
 import config
 from utils.prompts import get_qa_prompt_template
+from utils.resource_registry import ResourceRegistry
+from database.vector_store import get_vector_store_registry_stats
 from retrieval.retriever import create_retriever
+from retrieval.reranker import RerankingRetriever
+from retrieval.context_packer import pack_context
+from retrieval.cache import get_cached_answer, cache_answer
 
 
-def build_qa_chain(pdf_id: str):
+if TYPE_CHECKING:
+    from langchain_community.llms import Ollama
+
+_llm = None  # Singleton pattern
+_qa_chains = ResourceRegistry("qa_chains", config.QA_CHAIN_CACHE_MAX_ENTRIES)
+
+
+class QAChainWrapper:
+    """
+    Retrieval + generation pipeline for a single PDF
+    
+    Retrieves once per question and feeds the same documents to both the
+    prompt and the returned source documents. The prompt context is packed
+    by pack_context(): overlapping chunks merged, within CONTEXT_MAX_TOKENS.
+    """
+    
+    def __init__(self, chain, retriever, pdf_id: str = None):
+        self.chain = chain
+        self.retriever = retriever
+        self.pdf_id = pdf_id
+    
+    def retrieve(self, query: str) -> list:
+        """Retrieve source documents for a query"""
+        return self.retriever.invoke(query)
+    
+    def invoke(self, inputs):
+        query = inputs.get("query", "")
+        # Retrieve once; the same documents become context and sources
+        source_docs = self.retrieve(query)
+        context, context_stats = pack_context(source_docs)
+        answer = self.chain.invoke({
+            "context": context,
+            "question": query
+        })
+        return {
+            "result": answer,
+            "source_documents": source_docs,
+            "query": query,
+            "context_stats": context_stats
+        }
+    
+    def stream(self, query: str, source_docs: list) -> Iterator[str]:
+        """Stream answer tokens for already retrieved documents"""
+        return self.chain.stream({
+            "context": pack_context(source_docs)[0],
+            "question": query
+        })
+    
+    async def aretrieve(self, query: str) -> list:
+        """Retrieve source documents for a query without blocking the event loop"""
+        return await self.retriever.ainvoke(query)
+    
+    async def ainvoke(self, inputs):
+        query = inputs.get("query", "")
+        source_docs = await self.aretrieve(query)
+        context, context_stats = pack_context(source_docs)
+        answer = await self.chain.ainvoke({
+            "context": context,
+            "question": query
+        })
+        return {
+            "result": answer,
+            "source_documents": source_docs,
+            "query": query,
+            "context_stats": context_stats
+        }
+    
+    def astream(self, query: str, source_docs: list) -> AsyncIterator[str]:
+        """Asynchronously stream answer tokens for already retrieved documents"""
+        return self.chain.astream({
+            "context": pack_context(source_docs)[0],
+            "question": query
+        })
+
+
+def get_llm() -> "Ollama":
+    """
+    Get the shared Ollama client (singleton)
+    
+    Returns:
+        Ollama: LLM client reused by every QA chain
+    """
+    global _llm
+    
+    if _llm is None:
+        # Imported on first use to keep app startup fast
+        from langchain_community.llms import Ollama
+        
+        _llm = Ollama(
+            model=config.LLM_MODEL,
+            temperature=config.LLM_TEMPERATURE,
+            base_url=config.OLLAMA_BASE_URL
+        )
+    
+    return _llm
+
+
+def build_qa_chain(pdf_id: str) -> QAChainWrapper:
     """
     Build a question answering chain for a specific PDF
     
@@ -138,61 +239,78 @@ def build_qa_chain(pdf_id: str):
         pdf_id: PDF identifier
         
     Returns:
-        Configured QA chain
+        QAChainWrapper: Configured QA chain
     """
     try:
         # Create retriever for this PDF
-        retriever = create_retriever(pdf_id)
+        if config.RERANK_ENABLED:
+            # Over-fetch candidates and keep the cross-encoder's best TOP_K_RESULTS
+            retriever = RerankingRetriever(
+                base_retriever=create_retriever(pdf_id, config.RERANK_FETCH_K),
+                k=config.TOP_K_RESULTS,
+                budget_ms=config.RERANK_BUDGET_MS
+            )
+        else:
+            retriever = create_retriever(pdf_id)
         
-        # Initialize LLM
-        llm = Ollama(
-            model=config.LLM_MODEL,
-            temperature=config.LLM_TEMPERATURE
-        )
+        # Shared LLM client
+        llm = get_llm()
         
         # Get custom prompt template
         prompt = get_qa_prompt_template()
         
-        # Build chain using LCEL (LangChain Expression Language)
-        def format_docs(docs):
-            return "\n\n".join(doc.page_content for doc in docs)
+        # Build generation chain using LCEL (LangChain Expression Language);
+        # retrieval happens in the wrapper so it runs once per question
+        answer_chain = prompt | llm | StrOutputParser()
         
-        # Create the chain
-        rag_chain = (
-            {
-                "context": retriever | format_docs,
-                "question": RunnablePassthrough()
-            }
-            | prompt
-            | llm
-            | StrOutputParser()
-        )
-        
-        # Wrap in a class to maintain compatibility
-        class QAChainWrapper:
-            def __init__(self, chain, retriever):
-                self.chain = chain
-                self.retriever = retriever
-            
-            def invoke(self, inputs):
-                query = inputs.get("query", "")
-                # Get answer
-                answer = self.chain.invoke(query)
-                # Get source documents
-                # source_docs = self.retriever.get_relevant_documents(query)
-                source_docs = self.retriever.invoke(query)  # ✅ NEW
-                return {
-                    "result": answer,
-                    "source_documents": source_docs,
-                    "query": query
-                }
-        
-        return QAChainWrapper(rag_chain, retriever)
+        return QAChainWrapper(answer_chain, retriever, pdf_id)
     
     except Exception as e:
         raise Exception(f"Error building QA chain: {str(e)}")
 
 
+def get_qa_chain_for_pdf(pdf_id: str) -> QAChainWrapper:
+    """
+    Get the shared QA chain for a PDF, building it on first use
+    
+    Chains are kept in a process-wide LRU registry, so every session
+    asking about the same document reuses one chain.
+    
+    Args:
+        pdf_id: PDF identifier
+        
+    Returns:
+        QAChainWrapper: Configured QA chain
+    """
+    return _qa_chains.get_or_create(pdf_id, lambda: build_qa_chain(pdf_id))
+
+
+def evict_qa_chains(pdf_id: str) -> int:
+    """
+    Drop the shared QA chain for a PDF
+    
+    Args:
+        pdf_id: PDF identifier
+        
+    Returns:
+        int: Number of chains removed
+    """
+    return _qa_chains.evict(lambda key: key == pdf_id)
+
+
+def get_registry_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get size and hit/miss counters of the shared resource registries
+    
+    Returns:
+        Dict with 'vector_stores' and 'qa_chains' statistics
+    """
+    return {
+        "vector_stores": get_vector_store_registry_stats(),
+        "qa_chains": _qa_chains.get_stats()
+    }
+
+
 def ask_question(qa_chain, question: str) -> Dict[str, Any]:
     """
     Ask a question using the QA chain
@@ -202,28 +320,179 @@ def ask_question(qa_chain, question: str) -> Dict[str, Any]:
         question: User question
         
     Returns:
-        Dict with 'answer', 'source_documents', and 'metadata'
+        Dict with 'answer', 'source_documents', 'metadata' and, unless
+        answered from cache, 'context_stats'
     """
     try:
-        # Invoke the QA chain
-        response = qa_chain.invoke({"query": question})
-        
-        # Format response
-        result = {
-            "answer": response.get("result", ""),
-            "source_documents": response.get("source_documents", []),
-            "query": question
+        pdf_id = getattr(qa_chain, "pdf_id", None)
+        cache_key, cached = get_cached_answer(pdf_id, question)
+        
+        if cached:
+            response = {
+                "result": cached["answer"],
+                "source_documents": cached["source_documents"]
+            }
+        else:
+            # Invoke the QA chain
+            response = qa_chain.invoke({"query": question})
+            cache_answer(cache_key, response.get("result", ""), response.get("source_documents", []))
+        
+        return _format_response(question, response)
+    
+    except Exception as e:
+        raise Exception(f"Error processing question: {str(e)}")
+
+
+async def aask_question(qa_chain, question: str) -> Dict[str, Any]:
+    """
+    Ask a question using the QA chain without blocking the event loop
+    
+    Query embedding and vector search run in the default executor, and
+    generation uses the LLM's async client, so many questions can be in
+    flight on one event loop.
+    
+    Args:
+        qa_chain: Configured QA chain
+        question: User question
+        
+    Returns:
+        Dict with 'answer', 'source_documents', 'metadata' and, unless
+        answered from cache, 'context_stats'
+    """
+    try:
+        pdf_id = getattr(qa_chain, "pdf_id", None)
+        # The cache key reads the document version from the registry
+        cache_key, cached = await asyncio.to_thread(get_cached_answer, pdf_id, question)
+        
+        if cached:
+            response = {
+                "result": cached["answer"],
+                "source_documents": cached["source_documents"]
+            }
+        else:
+            response = await qa_chain.ainvoke({"query": question})
+            cache_answer(cache_key, response.get("result", ""), response.get("source_documents", []))
+        
+        return _format_response(question, response)
+    
+    except Exception as e:
+        raise Exception(f"Error processing question: {str(e)}")
+
+
+def _format_response(question: str, response: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a chain response into the answer dict returned to callers"""
+    result = {
+        "answer": response.get("result", ""),
+        "source_documents": response.get("source_documents", []),
+        "query": question
+    }
+    if "context_stats" in response:
+        result["context_stats"] = response["context_stats"]
+    
+    # Extract metadata from source documents
+    if result["source_documents"]:
+        result["metadata"] = [
+            doc.metadata for doc in result["source_documents"]
+        ]
+    else:
+        result["metadata"] = []
+    
+    return result
+
+
+def _cache_streamed_answer(cache_key, token_stream, source_docs: list) -> Iterator[str]:
+    """Pass tokens through and cache the full answer once the stream completes"""
+    tokens = []
+    for token in token_stream:
+        tokens.append(token)
+        yield token
+    cache_answer(cache_key, "".join(tokens), source_docs)
+
+
+def stream_question(qa_chain, question: str) -> Dict[str, Any]:
+    """
+    Ask a question and stream the answer token by token
+    
+    Retrieval runs before this returns, so sources can be shown while
+    the LLM is still generating.
+    
+    Args:
+        qa_chain: Configured QA chain
+        question: User question
+        
+    Returns:
+        Dict with 'answer_stream' (iterator of text tokens),
+        'source_documents', 'query' and 'metadata'
+    """
+    try:
+        pdf_id = getattr(qa_chain, "pdf_id", None)
+        cache_key, cached = get_cached_answer(pdf_id, question)
+        
+        if cached:
+            source_docs = cached["source_documents"]
+            answer_stream = iter([cached["answer"]])
+        else:
+            source_docs = qa_chain.retrieve(question)
+            answer_stream = _cache_streamed_answer(
+                cache_key, qa_chain.stream(question, source_docs), source_docs
+            )
+        
+        return {
+            "answer_stream": answer_stream,
+            "source_documents": source_docs,
+            "query": question,
+            "metadata": [doc.metadata for doc in source_docs]
         }
+    
+    except Exception as e:
+        raise Exception(f"Error processing question: {str(e)}")
+
+
+async def _acache_streamed_answer(cache_key, token_stream, source_docs: list) -> AsyncIterator[str]:
+    """Async variant of _cache_streamed_answer"""
+    tokens = []
+    async for token in token_stream:
+        tokens.append(token)
+        yield token
+    cache_answer(cache_key, "".join(tokens), source_docs)
+
+
+async def _aiter_answer(answer: str) -> AsyncIterator[str]:
+    """Replay a cached answer as a single-token async stream"""
+    yield answer
+
+
+async def astream_question(qa_chain, question: str) -> Dict[str, Any]:
+    """
+    Async variant of stream_question
+    
+    Args:
+        qa_chain: Configured QA chain
+        question: User question
         
-        # Extract metadata from source documents
-        if result["source_documents"]:
-            result["metadata"] = [
-                doc.metadata for doc in result["source_documents"]
-            ]
+    Returns:
+        Dict with 'answer_stream' (async iterator of text tokens),
+        'source_documents', 'query' and 'metadata'
+    """
+    try:
+        pdf_id = getattr(qa_chain, "pdf_id", None)
+        cache_key, cached = await asyncio.to_thread(get_cached_answer, pdf_id, question)
+        
+        if cached:
+            source_docs = cached["source_documents"]
+            answer_stream = _aiter_answer(cached["answer"])
         else:
-            result["metadata"] = []
+            source_docs = await qa_chain.aretrieve(question)
+            answer_stream = _acache_streamed_answer(
+                cache_key, qa_chain.astream(question, source_docs), source_docs
+            )
         
-        return result
+        return {
+            "answer_stream": answer_stream,
+            "source_documents": source_docs,
+            "query": question,
+            "metadata": [doc.metadata for doc in source_docs]
+        }
     
     except Exception as e:
         raise Exception(f"Error processing question: {str(e)}")
@@ -0,0 +1,165 @@
+# Cross-encoder reranking
+"""
+Reranker Module
+Re-scores retrieved chunks with a cross-encoder within a latency budget
+"""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+import config
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+
+_reranker = None  # Singleton pattern
+_reranker_lock = threading.Lock()
+_executor = None
+_stats_lock = threading.Lock()
+_stats = {"reranked": 0, "fallbacks": 0, "total_ms": 0.0}
+
+
+def get_reranker() -> "CrossEncoder":
+    """
+    Get or load the cross-encoder model (singleton)
+
+    Returns:
+        CrossEncoder: Reranking model on CPU
+    """
+    global _reranker
+
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                # Imported on first use: pulls in torch and sentence-transformers
+                from sentence_transformers import CrossEncoder
+                _reranker = CrossEncoder(config.RERANKER_MODEL, device="cpu", max_length=512)
+
+    return _reranker
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Single reranking thread (singleton)
+
+    One request is scored at a time; under load the queue wait counts
+    against the budget, so excess requests fall back instead of piling up.
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+
+    return _executor
+
+
+def _rerank(query: str, docs: List[Document], k: int, deadline: float) -> Optional[List[Document]]:
+    """
+    Score every (query, chunk) pair in one batch and keep the best k
+
+    A running future cannot be cancelled, so a request whose caller has
+    already fallen back (deadline on the perf_counter clock has passed
+    while it queued or the model loaded) is dropped here instead of
+    occupying the reranking thread.
+
+    Returns:
+        The best k documents, or None if the deadline passed before scoring
+    """
+    reranker = get_reranker()
+    if time.perf_counter() >= deadline:
+        return None
+    scores = reranker.predict([(query, doc.page_content) for doc in docs])
+    order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+    return [docs[i] for i in order[:k]]
+
+
+def _record(start_time: float, fell_back: bool):
+    with _stats_lock:
+        _stats["fallbacks" if fell_back else "reranked"] += 1
+        _stats["total_ms"] += (time.perf_counter() - start_time) * 1000
+
+
+def get_reranker_stats() -> Dict[str, Any]:
+    """
+    Get reranking counters
+
+    Returns:
+        Dict with 'reranked', 'fallbacks' (budget exceeded or error) and
+        'mean_ms' (including fallbacks)
+    """
+    with _stats_lock:
+        requests = _stats["reranked"] + _stats["fallbacks"]
+        return {
+            "reranked": _stats["reranked"],
+            "fallbacks": _stats["fallbacks"],
+            "mean_ms": _stats["total_ms"] / requests if requests else 0.0
+        }
+
+
+class RerankingRetriever(BaseRetriever):
+    """
+    Retriever that over-fetches candidates and reranks them with a cross-encoder
+
+    If scoring does not finish within budget_ms (including waiting for the
+    model to load or for other requests), the first k candidates are
+    returned in retrieval order, and the queued request is skipped once
+    the reranking thread reaches it.
+    """
+
+    base_retriever: BaseRetriever
+    k: int = 5
+    budget_ms: float = 150.0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        candidates = self.base_retriever.invoke(query)
+        if len(candidates) <= 1:
+            return candidates[:self.k]
+
+        start_time = time.perf_counter()
+        future = _get_executor().submit(
+            _rerank, query, candidates, self.k, start_time + self.budget_ms / 1000
+        )
+        try:
+            docs = future.result(timeout=self.budget_ms / 1000)
+            if docs is not None:
+                _record(start_time, fell_back=False)
+                return docs
+        except FutureTimeoutError:
+            future.cancel()
+        except Exception as e:
+            print(f"Reranking failed, using retrieval order: {str(e)}")
+
+        _record(start_time, fell_back=True)
+        return candidates[:self.k]
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        candidates = await self.base_retriever.ainvoke(query)
+        if len(candidates) <= 1:
+            return candidates[:self.k]
+
+        start_time = time.perf_counter()
+        future = _get_executor().submit(
+            _rerank, query, candidates, self.k, start_time + self.budget_ms / 1000
+        )
+        try:
+            docs = await asyncio.wait_for(asyncio.wrap_future(future), self.budget_ms / 1000)
+            if docs is not None:
+                _record(start_time, fell_back=False)
+                return docs
+        except asyncio.TimeoutError:
+            future.cancel()
+        except Exception as e:
+            print(f"Reranking failed, using retrieval order: {str(e)}")
+
+        _record(start_time, fell_back=True)
+        return candidates[:self.k]
@@ -5,15 +5,123 @@ Handles document retrieval logic
 """
 
 # from langchain.schema.retriever import BaseRetriever
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
 from database.vector_store import get_vector_store
+from database.bm25_index import get_bm25_index
+from database.document_store import search_live_documents
+from retrieval.cache import get_query_embedding_model
 import config
 
 
+_sparse_executor = None  # Singleton pattern
+
+
+def _get_sparse_executor() -> ThreadPoolExecutor:
+    """Threads running BM25 searches alongside dense searches (singleton)"""
+    global _sparse_executor
+    
+    if _sparse_executor is None:
+        _sparse_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bm25")
+    
+    return _sparse_executor
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], rrf_k: int) -> List[str]:
+    """
+    Merge ranked id lists with reciprocal rank fusion
+    
+    Args:
+        rankings: Lists of ids, best first
+        rrf_k: Fusion constant (larger = flatter rank weighting)
+        
+    Returns:
+        List[str]: Ids ordered by fused score
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, 1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever fusing BM25 keyword search with dense vector search
+    
+    Both searches run concurrently and their rankings are merged with
+    reciprocal rank fusion, so exact identifiers found by BM25 surface
+    even when their embedding is not among the nearest neighbours.
+    """
+    
+    vector_store: VectorStore
+    pdf_id: str
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+    
+    def _dense(self, query: str) -> List[Document]:
+        return self.vector_store.similarity_search(
+            query, k=self.fetch_k, filter={"pdf_id": self.pdf_id}
+        )
+    
+    def _sparse(self, query: str) -> List[Document]:
+        bm25_index = get_bm25_index(self.pdf_id)
+        
+        def search(fetch_k: int):
+            return [
+                (Document(page_content=text, metadata=metadata), score)
+                for _, score, text, metadata in bm25_index.search(query, fetch_k)
+            ]
+        
+        # Same view of re-indexed documents as the vector store results
+        return [
+            doc for doc, _ in search_live_documents(search, self.fetch_k, self.pdf_id, len(bm25_index))
+        ]
+    
+    def _fuse(self, dense_docs: List[Document], sparse_docs: List[Document]) -> List[Document]:
+        def chunk_id(doc: Document) -> str:
+            return f"{self.pdf_id}-{doc.metadata.get('chunk_index')}"
+        
+        # Prefer the dense copy of a chunk; it comes straight from the vector store
+        docs = {chunk_id(doc): doc for doc in sparse_docs}
+        docs.update({chunk_id(doc): doc for doc in dense_docs})
+        
+        fused = reciprocal_rank_fusion(
+            [[chunk_id(doc) for doc in dense_docs], [chunk_id(doc) for doc in sparse_docs]],
+            self.rrf_k
+        )
+        return [docs[item_id] for item_id in fused[:self.k]]
+    
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        sparse_future = _get_sparse_executor().submit(self._sparse, query)
+        dense_docs = self._dense(query)
+        return self._fuse(dense_docs, sparse_future.result())
+    
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense_docs, sparse_docs = await asyncio.gather(
+            self.vector_store.asimilarity_search(query, k=self.fetch_k, filter={"pdf_id": self.pdf_id}),
+            asyncio.get_running_loop().run_in_executor(_get_sparse_executor(), self._sparse, query)
+        )
+        return self._fuse(dense_docs, sparse_docs)
+
+
 def create_retriever(pdf_id: str, top_k: int = None) -> BaseRetriever:
     """
     Create a retriever for a specific PDF
     
+    Returns a HybridRetriever (BM25 + dense) when RETRIEVAL_MODE is
+    "hybrid", a plain dense retriever otherwise.
+    
     Args:
         pdf_id: PDF identifier
         top_k: Number of chunks to retrieve (default from config)
@@ -25,8 +133,17 @@ def create_retriever(pdf_id: str, top_k: int = None) -> BaseRetriever:
         if top_k is None:
             top_k = config.TOP_K_RESULTS
         
-        # Get vector store for this PDF
-        vector_store = get_vector_store(pdf_id)
+        # Get vector store for this PDF; repeated questions reuse cached query vectors
+        vector_store = get_vector_store(pdf_id, get_query_embedding_model())
+        
+        if config.RETRIEVAL_MODE == "hybrid":
+            return HybridRetriever(
+                vector_store=vector_store,
+                pdf_id=pdf_id,
+                k=top_k,
+                fetch_k=max(config.HYBRID_FETCH_K, top_k),
+                rrf_k=config.RRF_K
+            )
         
         # Create retriever with search configuration
         retriever = vector_store.as_retriever(
@@ -60,5 +177,26 @@ def get_relevant_context(query: str, pdf_id: str, top_k: int = None) -> list:
         documents = retriever.get_relevant_documents(query)
         return documents
     
+    except Exception as e:
+        raise Exception(f"Error retrieving context: {str(e)}")
+
+
+async def aget_relevant_context(query: str, pdf_id: str, top_k: int = None) -> list:
+    """
+    Async variant of get_relevant_context
+    
+    Args:
+        query: User question
+        pdf_id: PDF identifier
+        top_k: Number of chunks to retrieve
+        
+    Returns:
+        List of relevant documents
+    """
+    try:
+        # Creating a retriever may load the vector store
+        retriever = await asyncio.to_thread(create_retriever, pdf_id, top_k)
+        return await retriever.ainvoke(query)
+    
     except Exception as e:
         raise Exception(f"Error retrieving context: {str(e)}")
\ No newline at end of file
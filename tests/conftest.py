@@ -0,0 +1,15 @@
+# Test configuration
+"""
+Test Configuration
+Runs the tests against a throwaway data directory and the local vector
+store; both must be set before config is imported
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["RAG_DATA_DIR"] = tempfile.mkdtemp(prefix="rag-tests-")
+os.environ["VECTOR_STORE_BACKEND"] = "local"
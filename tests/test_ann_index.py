@@ -0,0 +1,98 @@
+# ANN index tests
+"""
+ANN Index Tests
+The IVF-PQ index must find nearly the same neighbours as exact search,
+respect metadata masks, follow appended vectors and survive a reload,
+and decline to answer when exact search is the only correct option
+"""
+
+import numpy as np
+import pytest
+from database.ann_index import IVFPQIndex
+
+
+DIM = 64
+K = 5
+
+
+def _vectors(count: int, seed: int = 0) -> np.ndarray:
+    """Clustered, L2-normalized vectors, like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((32, DIM))
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.6 * rng.standard_normal((count, DIM))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _exact(query: np.ndarray, k: int, vectors: np.ndarray) -> set:
+    return set(np.argsort(-(vectors @ query))[:k].tolist())
+
+
+@pytest.fixture(scope="module")
+def data():
+    vectors = _vectors(3200)
+    return vectors[:3000], vectors[3000:]
+
+
+@pytest.fixture(scope="module")
+def index(data):
+    index = IVFPQIndex(nprobe=8, subvectors=8, rerank_factor=16, min_train_size=1024)
+    index.sync(data[0])
+    return index
+
+
+def test_recall_against_exact_search(index, data):
+    vectors, queries = data
+    hits = 0
+    for query in queries:
+        rows, scores = index.search(query, K, vectors)
+        assert np.all(np.diff(scores) <= 0)
+        hits += len(_exact(query, K, vectors) & set(rows.tolist()))
+
+    assert hits / (len(queries) * K) >= 0.9
+
+
+def test_mask_limits_results(index, data):
+    vectors, queries = data
+    mask = np.zeros(len(vectors), dtype=bool)
+    mask[::2] = True
+
+    for query in queries[:20]:
+        rows, _ = index.search(query, K, vectors, mask)
+        assert len(rows) == K
+        assert np.all(rows % 2 == 0)
+
+
+def test_declines_without_enough_data(data):
+    vectors, queries = data
+    index = IVFPQIndex(subvectors=8, min_train_size=1024)
+
+    index.sync(vectors[:500])
+    assert not index.is_trained
+    assert index.search(queries[0], K, vectors[:500]) is None
+
+    index.sync(vectors)
+    # The index no longer matches a matrix that changed without a sync
+    assert index.search(queries[0], K, vectors[:2000]) is None
+    assert index.search(queries[0], K, vectors, np.zeros(len(vectors), dtype=bool)) is None
+
+
+def test_appended_vectors_are_searchable(data):
+    vectors, queries = data
+    index = IVFPQIndex(nprobe=8, subvectors=8, rerank_factor=16, min_train_size=1024)
+    index.sync(vectors[:2500])
+
+    index.sync(vectors, appended_from=2500)
+
+    assert index.ntotal == len(vectors)
+    assert index.trained_size == 2500  # Encoded incrementally, not retrained
+    assert index.search(vectors[2900], 1, vectors)[0].tolist() == [2900]
+
+
+def test_reload_gives_same_results(index, data, tmp_path):
+    vectors, queries = data
+    index.save(str(tmp_path))
+    reloaded = IVFPQIndex(nprobe=8, subvectors=8, rerank_factor=16).load(str(tmp_path))
+
+    for query in queries[:20]:
+        expected, actual = index.search(query, K, vectors), reloaded.search(query, K, vectors)
+        assert actual[0].tolist() == expected[0].tolist()
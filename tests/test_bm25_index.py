@@ -0,0 +1,71 @@
+# BM25 index tests
+"""
+BM25 Index Tests
+The append-only log must rebuild the same index when reopened, after
+deletes, and after the log is compacted
+"""
+
+import os
+from typing import List
+import pytest
+from database.bm25_index import INDEX_FILE, BM25Index
+
+
+def _add(index: BM25Index, start: int, stop: int):
+    ids = [f"doc-{i}" for i in range(start, stop)]
+    texts = [f"clause {i} covers pump unit{i} maintenance" for i in range(start, stop)]
+    index.add(ids, texts, [{"chunk_index": i} for i in range(start, stop)])
+
+
+def _ranked(index: BM25Index, query: str) -> List[tuple]:
+    return [(chunk_id, round(score, 5), text) for chunk_id, score, text, _ in index.search(query, 10)]
+
+
+@pytest.fixture
+def index(tmp_path) -> BM25Index:
+    index = BM25Index("doc", directory=str(tmp_path))
+    _add(index, 0, 4)
+    _add(index, 4, 8)
+    return index
+
+
+def test_reopened_index_matches(index, tmp_path):
+    reopened = BM25Index("doc", directory=str(tmp_path))
+
+    assert len(reopened) == 8
+    assert _ranked(reopened, "unit5 pump") == _ranked(index, "unit5 pump")
+    assert reopened.search("unit5", 1)[0][0] == "doc-5"
+
+
+def test_deletes_survive_reopen(index, tmp_path):
+    index.delete(["doc-1", "doc-5", "missing"])
+    with open(os.path.join(index.directory, INDEX_FILE), "rb") as f:
+        assert len(f.read().splitlines()) == 3  # Two adds and a delete; not compacted yet
+
+    reopened = BM25Index("doc", directory=str(tmp_path))
+
+    assert len(reopened) == 6
+    assert reopened.search("unit5", 10) == []
+    assert _ranked(reopened, "clause pump") == _ranked(index, "clause pump")
+
+
+def test_compaction_rewrites_live_chunks(index, tmp_path):
+    index.delete(["doc-0", "doc-1", "doc-2", "doc-3", "doc-4"])
+    with open(os.path.join(index.directory, INDEX_FILE), "rb") as f:
+        assert len(f.read().splitlines()) == 1
+
+    reopened = BM25Index("doc", directory=str(tmp_path))
+
+    assert len(reopened) == 3
+    assert _ranked(reopened, "clause pump") == _ranked(index, "clause pump")
+    assert {chunk_id for chunk_id, _, _ in _ranked(reopened, "clause")} == {"doc-5", "doc-6", "doc-7"}
+
+
+def test_open_instance_follows_another_writer(index, tmp_path):
+    writer = BM25Index("doc", directory=str(tmp_path))
+    writer.delete(["doc-0", "doc-1", "doc-2", "doc-3", "doc-4"])  # Compacts
+    _add(writer, 8, 10)
+
+    assert len(index.search("clause", 10)) == 5
+    assert index.search("unit9", 1)[0][0] == "doc-9"
+    assert index.search("unit2", 10) == []
@@ -0,0 +1,159 @@
+# Chunker tests
+"""
+Chunking Tests
+split_spans() must produce exactly the chunks of LangChain's
+RecursiveCharacterTextSplitter for the same size, overlap and separators,
+and "tokens" mode chunks must fit the embedding model's input
+"""
+
+import re
+import random
+import itertools
+import pytest
+import config
+from utils import pdf_processor
+from utils.pdf_processor import CHUNK_SEPARATORS, split_spans, chunk_text, chunk_spans, iter_chunk_spans
+
+text_splitters = pytest.importorskip("langchain_text_splitters")
+
+# Separators, near-separators, whitespace runs, unicode and over-long words
+_PIECES = [
+    "\n\n", "\n", ". ", " ", "  ", ".", "\t", "\n\n\n",
+    "a", "clause", "4.2.1", "AB-1234", "naïve", "日本語", "x" * 40, "lorem ipsum dolor sit amet"
+]
+
+
+def _random_text(rng: random.Random) -> str:
+    return "".join(rng.choice(_PIECES) for _ in range(rng.randint(0, 400)))
+
+
+def _non_space(text: str) -> int:
+    return sum(not char.isspace() for char in text)
+
+
+def _assert_same_chunks(text: str, chunk_size: int, chunk_overlap: int, measured: bool = False):
+    splitter = text_splitters.RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=_non_space if measured else len,
+        separators=CHUNK_SEPARATORS
+    )
+    expected = splitter.split_text(text)
+    measure = None
+    if measured:
+        prefix = [0] + list(itertools.accumulate(0 if char.isspace() else 1 for char in text))
+        measure = prefix.__getitem__
+    actual = [text[start:end] for start, end in split_spans(text, chunk_size, chunk_overlap, measure=measure)]
+    assert actual == expected, f"chunk_size={chunk_size} chunk_overlap={chunk_overlap} text={text!r}"
+
+
+def test_randomized_equivalence():
+    rng = random.Random(0)
+    for _ in range(1500):
+        chunk_size = rng.choice([1, 2, 5, 17, 50, 200, 1000])
+        chunk_overlap = rng.randint(0, chunk_size - 1) if chunk_size > 1 else 0
+        _assert_same_chunks(_random_text(rng), chunk_size, chunk_overlap)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   \n\n  ",
+    "one",
+    "Page 1 line 1. Page 1 line 2.\nPage 2 line 1.\n\n" * 60,
+    "word " * 1000
+])
+def test_edge_cases_match_default_settings(text):
+    _assert_same_chunks(text, 1000, 200)
+
+
+def test_randomized_equivalence_with_measure():
+    # Lengths in another additive unit, as "tokens" mode measures them
+    rng = random.Random(1)
+    for _ in range(500):
+        chunk_size = rng.choice([1, 2, 5, 17, 50, 200])
+        chunk_overlap = rng.randint(0, chunk_size - 1) if chunk_size > 1 else 0
+        _assert_same_chunks(_random_text(rng), chunk_size, chunk_overlap, measured=True)
+
+
+def test_chunk_text_and_spans_agree(monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_LENGTH_UNIT", "chars")
+    text = _random_text(random.Random(2)) * 20
+
+    spans = chunk_spans(text, count_tokens=False)
+
+    assert chunk_text(text) == [span["text"] for span in spans]
+    assert all(text[span["char_start"]:span["char_end"]] == span["text"] for span in spans)
+    _assert_same_chunks(text, config.CHUNK_SIZE, config.CHUNK_OVERLAP)
+
+
+class WordTokenizer:
+    """Fast-tokenizer stand-in: every word and punctuation mark is a token"""
+
+    is_fast = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def num_special_tokens_to_add(self) -> int:
+        return 2
+
+    def __call__(self, text: str, **kwargs):
+        self.calls += 1
+        return {"offset_mapping": [match.span() for match in re.finditer(r"\w+|[^\w\s]", text)]}
+
+
+def _tokens(text: str) -> int:
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+@pytest.fixture
+def tokenizer(monkeypatch):
+    tokenizer = WordTokenizer()
+    monkeypatch.setattr(pdf_processor, "_chunk_tokenizer", tokenizer)
+    monkeypatch.setattr(pdf_processor, "_token_counts_unavailable", False)
+    monkeypatch.setattr(config, "EMBEDDING_MAX_TOKENS", 42)
+    monkeypatch.setattr(config, "CHUNK_OVERLAP_TOKENS", 8)
+    return tokenizer
+
+
+def test_token_chunks_fit_the_model(tokenizer, monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_LENGTH_UNIT", "tokens")
+    rng = random.Random(0)
+    words = ["clause", "4.2", "pump", "maintenance", "of", "valve", "AB-1234."]
+    pages = [
+        " ".join(rng.choice(words) for _ in range(rng.randint(50, 300))) + rng.choice(["", "\n\n"])
+        for _ in range(10)
+    ]
+    text = "\n".join(pages)
+
+    spans = list(iter_chunk_spans(pages))
+
+    assert len(spans) > 20
+    for span, next_span in zip(spans, spans[1:]):
+        assert span["tokens"] == _tokens(span["text"])
+        assert span["tokens"] + tokenizer.num_special_tokens_to_add() <= config.EMBEDDING_MAX_TOKENS
+        assert _tokens(text[next_span["char_start"]:span["char_end"]]) <= config.CHUNK_OVERLAP_TOKENS
+
+
+def test_token_chunks_overlap_by_configured_tokens(tokenizer, monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_LENGTH_UNIT", "tokens")
+    text = " ".join(f"word{i}" for i in range(500))
+
+    spans = chunk_spans(text)
+
+    assert all(span["tokens"] == config.EMBEDDING_MAX_TOKENS - 2 for span in spans[:-1])
+    for span, next_span in zip(spans, spans[1:]):
+        assert _tokens(text[next_span["char_start"]:span["char_end"]]) == config.CHUNK_OVERLAP_TOKENS
+
+
+def test_char_chunks_are_tokenized_only_on_request(tokenizer, monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_LENGTH_UNIT", "chars")
+    monkeypatch.setattr(config, "REPORT_CHUNK_TOKENS", False)
+    pages = ["lorem ipsum dolor sit amet " * 100] * 3
+
+    assert all("tokens" not in span for span in iter_chunk_spans(pages))
+    assert tokenizer.calls == 0
+
+    spans = list(iter_chunk_spans(pages, count_tokens=True))
+    assert tokenizer.calls > 0
+    assert all(span["tokens"] == _tokens(span["text"]) for span in spans)
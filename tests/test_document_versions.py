@@ -0,0 +1,207 @@
+# Document versioning tests
+"""
+Document Versioning Tests
+Incremental re-indexing of a namespace: only changed chunks are embedded,
+searches see one version at a time, and every way a version can end
+(activated, rejected, interrupted) leaves no stray vectors behind
+"""
+
+import os
+import uuid
+import hashlib
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+from typing import List
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+import config
+import utils.embeddings
+from database.vector_store import store_embeddings, get_vector_store, upsert_embeddings
+from database import document_registry
+from database.document_store import write_document_text
+from database.document_registry import (
+    register_document,
+    get_document,
+    get_document_versions,
+    begin_document_version
+)
+from ingestion import jobs
+from retrieval.cache import answer_cache_key
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings that count embedded texts"""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(64, dtype=np.float32)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+        return (vector / (np.linalg.norm(vector) or 1)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded += len(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    model = HashingEmbeddings()
+    monkeypatch.setattr(utils.embeddings, "_embedding_model", model)
+    return model
+
+
+def _texts(*words) -> List[str]:
+    return [f"chunk about {word} and nothing else" for word in words]
+
+
+def _ingest(texts: List[str]) -> str:
+    """Index texts as version 1 of a new document"""
+    pdf_id = str(uuid.uuid4())
+    store_embeddings(texts, pdf_id, "v1.pdf")
+    register_document(str(uuid.uuid4()), pdf_id, "v1.pdf", len(texts))
+    return pdf_id
+
+
+def _search(pdf_id: str, query: str, k: int) -> List[str]:
+    return [
+        doc.page_content
+        for doc, _ in get_vector_store(pdf_id).similarity_search_with_score(query, k, {"pdf_id": pdf_id})
+    ]
+
+
+def test_update_embeds_only_changed_chunks(embeddings):
+    pdf_id = _ingest(_texts("alpha", "beta", "gamma", "delta"))
+    embeddings.embedded = 0
+
+    version = begin_document_version(pdf_id, str(uuid.uuid4()), "v2.pdf")
+    store_embeddings(_texts("alpha", "beta", "omega", "delta", "sigma"), pdf_id, "v2.pdf", None, version)
+
+    assert embeddings.embedded == 2
+    assert get_document(pdf_id)["version"] == version == 2
+    assert [(v["version"], v["status"]) for v in get_document_versions(pdf_id)] == [
+        (1, "superseded"), (2, "active")
+    ]
+    assert sorted(get_vector_store(pdf_id).list_ids()) == sorted([
+        f"{pdf_id}-0", f"{pdf_id}-1", f"{pdf_id}-3", f"{pdf_id}-v2-2", f"{pdf_id}-v2-4"
+    ])
+    assert "chunk about gamma and nothing else" not in _search(pdf_id, "gamma", 5)
+
+
+def test_begin_rejects_indexed_content(embeddings):
+    pdf_id = _ingest(_texts("alpha", "beta"))
+    other_hash = str(uuid.uuid4())
+    other_id = str(uuid.uuid4())
+    register_document(other_hash, other_id, "other.pdf", 1)
+
+    with pytest.raises(Exception, match=f"already indexed as document {other_id}"):
+        begin_document_version(pdf_id, other_hash, "other.pdf")
+    with pytest.raises(Exception, match="already holds this content"):
+        begin_document_version(pdf_id, get_document(pdf_id)["content_hash"], "v1.pdf")
+
+    assert [v["status"] for v in get_document_versions(pdf_id)] == ["active"]
+
+
+def test_update_removes_legacy_vectors(embeddings):
+    # Ingested before versioning: random vector ids and no chunk hashes
+    pdf_id = str(uuid.uuid4())
+    texts = _texts("alpha", "beta", "gamma")
+    get_vector_store(pdf_id).add_embeddings(
+        texts,
+        embeddings.embed_documents(texts),
+        [{"pdf_id": pdf_id, "chunk_index": i} for i in range(len(texts))]
+    )
+    register_document(str(uuid.uuid4()), pdf_id, "legacy.pdf", len(texts))
+
+    version = begin_document_version(pdf_id, str(uuid.uuid4()), "v2.pdf")
+    store_embeddings(_texts("alpha", "omega"), pdf_id, "v2.pdf", None, version)
+
+    assert sorted(get_vector_store(pdf_id).list_ids()) == [f"{pdf_id}-v2-0", f"{pdf_id}-v2-1"]
+
+
+def test_search_skips_chunks_of_unfinished_version(embeddings):
+    pdf_id = _ingest(_texts("alpha", "beta", "gamma", "delta"))
+    version = begin_document_version(pdf_id, str(uuid.uuid4()), "v2.pdf")
+
+    # Vectors of the version being built rank above every live chunk
+    texts = ["beta"] * 6
+    upsert_embeddings(pdf_id, texts, embeddings.embed_documents(texts), list(range(6)), None, version)
+
+    results = _search(pdf_id, "beta", 3)
+    assert len(results) == 3
+    assert "beta" not in results
+
+
+def test_sweep_discards_interrupted_update(embeddings, monkeypatch):
+    pdf_id = _ingest(_texts("alpha", "beta"))
+    version = begin_document_version(pdf_id, str(uuid.uuid4()), "v2.pdf")
+    write_document_text(pdf_id, ["revised text"], version)
+    upsert_embeddings(pdf_id, ["omega"], embeddings.embed_documents(["omega"]), [0], None, version)
+
+    # A job owned by a process that has exited
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    jobs._get_connection()
+    now = datetime.now().isoformat()
+    with sqlite3.connect(config.INGESTION_JOBS_PATH) as connection:
+        connection.execute(
+            """
+            INSERT INTO jobs
+                (job_id, content_hash, pdf_id, pdf_name, status, stage, worker, created_at, updated_at)
+            VALUES (?, ?, ?, 'v2.pdf', 'running', 'embedding', ?, ?, ?)
+            """,
+            (str(uuid.uuid4()), str(uuid.uuid4()), pdf_id, f"{jobs.socket.gethostname()}:{dead.pid}", now, now)
+        )
+
+    monkeypatch.setattr(jobs, "_connection", None)
+    jobs._get_connection()
+
+    assert [(v["version"], v["status"]) for v in get_document_versions(pdf_id)] == [
+        (1, "active"), (version, "failed")
+    ]
+    assert sorted(get_vector_store(pdf_id).list_ids()) == [f"{pdf_id}-0", f"{pdf_id}-1"]
+    assert not os.path.exists(os.path.join(config.DOCUMENT_STORE_DIR, pdf_id, f"v{version}"))
+    assert _search(pdf_id, "alpha", 1) == ["chunk about alpha and nothing else"]
+
+
+def test_answer_cache_key_follows_live_version(embeddings):
+    pdf_id = _ingest(_texts("alpha", "beta"))
+    before = answer_cache_key(pdf_id, "What is alpha?")
+    assert answer_cache_key(pdf_id, "what is  alpha?") == before
+
+    version = begin_document_version(pdf_id, str(uuid.uuid4()), "v2.pdf")
+    store_embeddings(_texts("alpha", "omega"), pdf_id, "v2.pdf", None, version)
+
+    assert answer_cache_key(pdf_id, "What is alpha?")[1] == version
+
+
+def test_searches_reuse_the_cached_chunk_map(embeddings, monkeypatch):
+    pdf_id = _ingest(_texts("alpha", "beta", "gamma"))
+    assert _search(pdf_id, "alpha", 1) == ["chunk about alpha and nothing else"]
+
+    def no_registry_access():
+        raise AssertionError("search read the registry")
+
+    monkeypatch.setattr(document_registry, "_get_connection", no_registry_access)
+    for query in ("alpha", "beta", "gamma"):
+        assert _search(pdf_id, query, 1) == [f"chunk about {query} and nothing else"]
+
+
+def test_activation_invalidates_the_cached_chunk_map(embeddings, monkeypatch):
+    monkeypatch.setattr(config, "DOCUMENT_VERSION_TTL_SECONDS", 3600)
+    pdf_id = _ingest(_texts("alpha", "beta"))
+    assert _search(pdf_id, "beta", 1) == ["chunk about beta and nothing else"]
+
+    version = begin_document_version(pdf_id, str(uuid.uuid4()), "v2.pdf")
+    store_embeddings(_texts("alpha", "omega"), pdf_id, "v2.pdf", None, version)
+
+    assert "chunk about beta and nothing else" not in _search(pdf_id, "beta", 2)
+    assert _search(pdf_id, "omega", 1) == ["chunk about omega and nothing else"]
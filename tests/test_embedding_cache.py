@@ -0,0 +1,69 @@
+# Embedding cache tests
+"""
+Embedding Cache Tests
+Cache hits must not write to the database one lookup at a time, and the
+in-memory entry count must keep the cache within max_entries
+"""
+
+import os
+import tempfile
+from typing import List
+from langchain_core.embeddings import Embeddings
+from utils import embedding_cache
+from utils.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Stub model embedding each text as its length, counting embedded texts"""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded += len(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _cache(max_entries: int = 100) -> CachedEmbeddings:
+    path = os.path.join(tempfile.mkdtemp(), "embeddings.db")
+    return CachedEmbeddings(CountingEmbeddings(), "stub-model", path, max_entries)
+
+
+def test_hits_do_not_commit_per_lookup():
+    cache = _cache()
+    texts = [f"chunk {i}" for i in range(10)]
+    cache.embed_documents(texts)
+    commits = cache._connection.total_changes
+
+    for _ in range(20):
+        assert cache.embed_documents(texts) == [[float(len(t)), 1.0] for t in texts]
+
+    assert cache.embeddings.embedded == 10
+    assert cache._connection.total_changes == commits
+    assert len(cache._touched) == 10
+
+
+def test_touches_flush_in_batches(monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_TOUCH_FLUSH_SIZE", 5)
+    cache = _cache()
+    texts = [f"chunk {i}" for i in range(10)]
+    cache.embed_documents(texts)
+
+    cache.embed_documents(texts)
+    assert cache._touched == {}
+
+
+def test_entry_count_tracks_inserts_and_eviction():
+    cache = _cache(max_entries=50)
+    for start in range(0, 200, 10):
+        cache.embed_documents([f"chunk {i}" for i in range(start, start + 10)])
+        assert cache._entries == cache._count()
+        assert cache._entries <= 50
+
+    # Storing keys that are already cached must not inflate the count
+    known = [row[0] for row in cache._connection.execute("SELECT key FROM embeddings LIMIT 5")]
+    cache._store({key: [1.0, 1.0] for key in known})
+    assert cache._entries == cache._count()
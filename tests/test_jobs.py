@@ -0,0 +1,75 @@
+# Ingestion job tests
+"""
+Ingestion Jobs Tests
+Jobs whose worker is gone are failed when the job table is opened, and
+duplicate submissions only reuse a job with the same target
+"""
+
+import uuid
+import sqlite3
+from datetime import datetime, timedelta
+import config
+from ingestion import jobs
+
+
+def _insert_job(worker: str, updated_at: datetime = None, update_of: str = None) -> str:
+    """Add an active job row as another process would have left it"""
+    jobs._get_connection()
+    job_id = str(uuid.uuid4())
+    now = datetime.now().isoformat()
+    with sqlite3.connect(config.INGESTION_JOBS_PATH) as connection:
+        connection.execute(
+            """
+            INSERT INTO jobs
+                (job_id, content_hash, pdf_id, pdf_name, status, stage, update_of, worker, created_at, updated_at)
+            VALUES (?, ?, ?, 'doc.pdf', 'running', 'embedding', ?, ?, ?, ?)
+            """,
+            (
+                job_id, str(uuid.uuid4()), update_of or str(uuid.uuid4()), update_of, worker, now,
+                (updated_at or datetime.now()).isoformat()
+            )
+        )
+    return job_id
+
+
+def _reopen(monkeypatch) -> list:
+    """Open the job table again as a new process would; returns the discarded pdf_ids"""
+    discarded = []
+    monkeypatch.setattr(jobs, "_discard_interrupted", discarded.append)
+    monkeypatch.setattr(jobs, "_connection", None)
+    jobs._get_connection()
+    return discarded
+
+
+def test_sweep_fails_jobs_of_own_worker_id(monkeypatch):
+    # A restarted container has the same hostname and pid as before
+    job_id = _insert_job(jobs.WORKER_ID)
+    discarded = _reopen(monkeypatch)
+
+    assert jobs.get_job(job_id)["status"] == "failed"
+    assert discarded == [jobs.get_job(job_id)["pdf_id"]]
+
+
+def test_sweep_fails_jobs_without_progress(monkeypatch):
+    stalled = datetime.now() - timedelta(seconds=config.INGESTION_JOB_TIMEOUT_SECONDS + 60)
+    stalled_id = _insert_job("other-host:1", stalled)
+    active_id = _insert_job("other-host:1")
+    discarded = _reopen(monkeypatch)
+
+    assert jobs.get_job(stalled_id)["status"] == "failed"
+    assert jobs.get_job(active_id)["status"] == "running"
+    assert discarded == [jobs.get_job(stalled_id)["pdf_id"]]
+
+
+def test_duplicate_submission_matches_target(monkeypatch):
+    # Queued jobs must not run; only deduplication is under test
+    monkeypatch.setattr(jobs, "_get_executor", lambda: type("Idle", (), {"submit": lambda *args: None})())
+    existing_id = _insert_job("other-host:1")
+    content_hash = jobs.get_job(existing_id)["content_hash"]
+    target = str(uuid.uuid4())
+
+    assert jobs.submit_ingestion_job(b"%PDF", "doc.pdf", content_hash) == existing_id
+    update_id = jobs.submit_ingestion_job(b"%PDF", "doc.pdf", content_hash, update_pdf_id=target)
+    assert update_id != existing_id
+    assert jobs.get_job(update_id)["pdf_id"] == target
+    assert jobs.submit_ingestion_job(b"%PDF", "doc.pdf", content_hash, update_pdf_id=target) == update_id
@@ -0,0 +1,150 @@
+# ONNX embedding backend tests
+"""
+ONNX Embeddings Tests
+Parity of the quantized ONNX graph with the torch model, one export for
+concurrent loaders, sentence-transformers pooling, and the fallback to
+torch whenever the ONNX backend cannot be used
+"""
+
+import os
+import json
+import time
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+import config
+from utils import embeddings, onnx_embeddings
+
+
+def _installed(*modules) -> bool:
+    try:
+        return all(importlib.util.find_spec(module) is not None for module in modules)
+    except ModuleNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(
+    not _installed("onnxruntime", "optimum.onnxruntime", "sentence_transformers"),
+    reason="ONNX backend needs onnxruntime, optimum and sentence-transformers"
+)
+def test_onnx_embeddings_match_torch(tmp_path, monkeypatch):
+    from utils.embeddings import _create_torch_embeddings
+
+    monkeypatch.setattr(config, "ONNX_MODEL_DIR", str(tmp_path))
+    torch_embeddings = _create_torch_embeddings()
+    onnx_model = onnx_embeddings.load_onnx_embeddings(lambda: torch_embeddings)
+    assert onnx_model is not None, "ONNX export failed or did not pass its own parity check"
+
+    sentences = onnx_embeddings.PARITY_SENTENCES + [
+        "The warranty does not cover damage caused by improper installation.",
+        "Table 3 lists the operating temperature range of each pump model."
+    ]
+    onnx_vectors = np.asarray(onnx_model.embed_documents(sentences))
+    torch_vectors = np.asarray(torch_embeddings.embed_documents(sentences))
+
+    assert onnx_vectors.shape == torch_vectors.shape
+    cosines = np.sum(onnx_vectors * torch_vectors, axis=1)
+    assert cosines.min() >= config.ONNX_PARITY_THRESHOLD
+
+
+def test_concurrent_loaders_export_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ONNX_MODEL_DIR", str(tmp_path))
+    exports = []
+
+    def fake_export_and_check(export_dir, torch_factory):
+        exports.append(export_dir)
+        time.sleep(0.2)  # Long enough for the other loaders to reach the lock
+        with open(os.path.join(export_dir, onnx_embeddings.EXPORT_INFO_FILE), "w", encoding="utf-8") as f:
+            json.dump({"passed": False, "min_cosine": 0.0}, f)
+
+    monkeypatch.setattr(onnx_embeddings, "_export_and_check", fake_export_and_check)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: onnx_embeddings.load_onnx_embeddings(None), range(4)))
+
+    assert len(exports) == 1
+    assert results == [None] * 4  # Failed parity: every loader falls back to torch
+
+
+class FakeTokenizer:
+    """Pads to the longest text; one token per word"""
+
+    def __call__(self, texts, **kwargs):
+        width = max(len(text.split()) for text in texts)
+        mask = np.array([[1] * len(text.split()) + [0] * (width - len(text.split())) for text in texts])
+        return {"input_ids": mask.copy(), "attention_mask": mask}
+
+
+class FakeFeatureExtractor:
+    """Token j points along dimension j % 3; padding points along dimension 3"""
+
+    def __call__(self, input_ids, attention_mask):
+        batch, width = attention_mask.shape
+        hidden = np.zeros((batch, width, 4), dtype=np.float32)
+        for j in range(width):
+            hidden[:, j, j % 3] = attention_mask[:, j]
+            hidden[:, j, 3] = 100.0 * (1 - attention_mask[:, j])
+        return type("Output", (), {"last_hidden_state": hidden})
+
+
+def _onnx_model(pooling: str) -> onnx_embeddings.OnnxEmbeddings:
+    # Bypass __init__, which loads onnxruntime and the exported graph
+    model = onnx_embeddings.OnnxEmbeddings.__new__(onnx_embeddings.OnnxEmbeddings)
+    model.model, model.tokenizer = FakeFeatureExtractor(), FakeTokenizer()
+    model.pooling, model.batch_size = pooling, 2
+    return model
+
+
+@pytest.mark.parametrize("pooling, expected", [
+    ("cls", [[1, 0, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0]]),
+    ("mean", [[1, 0, 0, 0], [1, 1, 1, 0], [1, 1, 0, 0]])
+])
+def test_pooling_ignores_padding_and_normalizes(pooling, expected):
+    # Batches of two, so "one" is padded to the width of "one two three"
+    texts = ["one", "one two three", "one two"]
+
+    vectors = np.asarray(_onnx_model(pooling).embed_documents(texts))
+
+    expected = np.asarray(expected, dtype=np.float32)
+    assert np.allclose(vectors, expected / np.linalg.norm(expected, axis=1, keepdims=True))
+    assert np.allclose(_onnx_model(pooling).embed_query("one two three"), vectors[1])
+
+
+def _load_backend(monkeypatch, tmp_path, onnx_model):
+    monkeypatch.setattr(config, "EMBEDDING_BACKEND", "onnx")
+    monkeypatch.setattr(config, "QUERY_BATCHING_ENABLED", False)
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setattr(onnx_embeddings, "load_onnx_embeddings", lambda torch_factory: onnx_model)
+    monkeypatch.setattr(embeddings, "_create_torch_embeddings", lambda: "torch")
+    return embeddings._load_embedding_model()
+
+
+def test_onnx_backend_gets_its_own_cache_entries(monkeypatch, tmp_path):
+    onnx_model = _onnx_model("cls")
+
+    model = _load_backend(monkeypatch, tmp_path, onnx_model)
+
+    assert model.embeddings is onnx_model
+    assert model.model_name == f"{config.EMBEDDING_MODEL_NAME}:onnx"
+
+
+def test_unavailable_onnx_backend_falls_back_to_torch(monkeypatch, tmp_path):
+    model = _load_backend(monkeypatch, tmp_path, None)
+
+    assert model.embeddings == "torch"
+    assert model.model_name == config.EMBEDDING_MODEL_NAME
+
+
+def test_failed_export_is_not_fatal(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "ONNX_MODEL_DIR", str(tmp_path))
+
+    def missing_dependency(export_dir):
+        raise ImportError("No module named 'optimum'")
+
+    monkeypatch.setattr(onnx_embeddings, "_export", missing_dependency)
+
+    assert onnx_embeddings.load_onnx_embeddings(None) is None
+    # Nothing was recorded, so a later start with the dependency installed exports
+    assert not os.path.exists(os.path.join(onnx_embeddings._export_dir(), onnx_embeddings.EXPORT_INFO_FILE))
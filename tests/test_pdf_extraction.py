@@ -0,0 +1,57 @@
+# PDF extraction tests
+"""
+PDF Extraction Tests
+Parallel page-range extraction must return exactly the pages of serial
+extraction, in order
+"""
+
+from io import BytesIO
+import pytest
+import config
+from utils import pdf_processor
+from utils.pdf_processor import extract_pages_from_pdf, extract_text_from_pdf, get_pdf_page_count
+from benchmarks.pdf_extraction import make_pdf
+
+
+PAGES = 40
+
+
+@pytest.fixture(scope="module")
+def pdf_bytes() -> bytes:
+    return make_pdf(PAGES, lines=5)
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr(config, "PDF_EXTRACTION_WORKERS", 2)
+    monkeypatch.setattr(config, "PDF_PARALLEL_MIN_PAGES", 4)
+    monkeypatch.setattr(pdf_processor, "_extraction_pool", None)
+    yield
+    if pdf_processor._extraction_pool is not None:
+        pdf_processor._extraction_pool.shutdown()
+
+
+def test_parallel_matches_serial(pdf_bytes, parallel, monkeypatch):
+    parallel_pages = extract_pages_from_pdf(BytesIO(pdf_bytes))
+    assert pdf_processor._extraction_pool is not None
+
+    monkeypatch.setattr(config, "PDF_PARALLEL_MIN_PAGES", PAGES + 1)
+    serial_pages = extract_pages_from_pdf(BytesIO(pdf_bytes))
+
+    assert parallel_pages == serial_pages
+    assert len(parallel_pages) == get_pdf_page_count(BytesIO(pdf_bytes)) == PAGES
+    assert all(f"Section {i}.0" in page for i, page in enumerate(parallel_pages))
+
+
+def test_text_joins_pages_once(pdf_bytes, parallel, tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(pdf_bytes)
+
+    text = extract_text_from_pdf(str(path))
+
+    assert text.strip() == "\n".join(extract_pages_from_pdf(BytesIO(pdf_bytes))).strip()
+
+
+def test_unreadable_pdf_raises():
+    with pytest.raises(Exception, match="Error extracting text from PDF"):
+        extract_pages_from_pdf(BytesIO(b"not a pdf"))
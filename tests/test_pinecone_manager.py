@@ -0,0 +1,143 @@
+# Pinecone manager tests
+"""
+Pinecone Manager Tests
+The index proxy follows a moved index after connection, 404 or host
+errors only, never recreates a deleted index, and always surfaces the
+error of the original call
+"""
+
+import sys
+import types
+import pytest
+import config
+from database import pinecone_manager
+
+
+class NotFoundException(Exception):
+    status = 404
+
+
+class FakeIndex:
+    """Index connection that fails once its host is out of date"""
+
+    def __init__(self, cloud, host):
+        self.cloud = cloud
+        self.host = host
+
+    def _check(self):
+        if self.cloud.error is not None:
+            raise self.cloud.error
+        if self.host != self.cloud.host:
+            raise ConnectionError(f"cannot reach {self.host}")
+
+    def query(self, **kwargs):
+        self._check()
+        return f"results from {self.host}"
+
+    def list(self, **kwargs):
+        self._check()
+        yield [f"{self.host}-0", f"{self.host}-1"]
+
+
+class FakeCloud:
+    """Control plane of a fake pinecone package"""
+
+    def __init__(self):
+        self.host = "host-1"
+        self.exists = True
+        self.error = None
+        self.describes = 0
+        self.creates = 0
+
+    def client(self, api_key):
+        cloud = self
+
+        class Pinecone:
+            def describe_index(self, name):
+                cloud.describes += 1
+                if not cloud.exists:
+                    raise NotFoundException(name)
+                return types.SimpleNamespace(
+                    dimension=config.EMBEDDING_DIMENSION,
+                    metric=config.SIMILARITY_METRIC,
+                    host=cloud.host,
+                    status={"ready": True}
+                )
+
+            def create_index(self, **kwargs):
+                cloud.creates += 1
+                cloud.exists = True
+
+            def Index(self, name, host):
+                return FakeIndex(cloud, host)
+
+        return Pinecone()
+
+
+@pytest.fixture
+def cloud(monkeypatch, tmp_path):
+    cloud = FakeCloud()
+    package = types.ModuleType("pinecone")
+    package.Pinecone = cloud.client
+    package.ServerlessSpec = lambda **kwargs: kwargs
+    exceptions = types.ModuleType("pinecone.exceptions")
+    exceptions.NotFoundException = NotFoundException
+    monkeypatch.setitem(sys.modules, "pinecone", package)
+    monkeypatch.setitem(sys.modules, "pinecone.exceptions", exceptions)
+
+    monkeypatch.setattr(config, "PINECONE_API_KEY", "test-key")
+    monkeypatch.setattr(config, "INDEX_INFO_CACHE_PATH", str(tmp_path / "index_info.json"))
+    monkeypatch.setattr(config, "INDEX_INFO_RECHECK_SECONDS", 0)
+    for name in ("_pinecone_client", "_index", "_index_handle", "_index_info", "_last_refresh"):
+        monkeypatch.setattr(pinecone_manager, name, None)
+
+    pinecone_manager.initialize_pinecone()
+    return cloud
+
+
+def test_follows_moved_index(cloud):
+    index = pinecone_manager.get_index()
+    assert index.query(top_k=1) == "results from host-1"
+
+    cloud.host = "host-2"
+    assert index.query(top_k=1) == "results from host-2"
+    assert list(index.list(prefix="doc")) == [["host-2-0", "host-2-1"]]
+
+
+def test_other_errors_are_not_redescribed(cloud):
+    index = pinecone_manager.get_index()
+    describes = cloud.describes
+
+    cloud.error = ValueError("bad filter")
+    with pytest.raises(ValueError, match="bad filter"):
+        index.query(top_k=1)
+    assert cloud.describes == describes
+
+
+def test_deleted_index_is_not_recreated(cloud):
+    index = pinecone_manager.get_index()
+    cloud.exists = False
+    cloud.error = NotFoundException("namespace not found")
+
+    with pytest.raises(NotFoundException, match="namespace not found") as raised:
+        index.query(top_k=1)
+    assert "no longer exists" in str(raised.value.__cause__)
+    with pytest.raises(NotFoundException):
+        list(index.list(prefix="doc"))
+    assert cloud.creates == 0
+
+
+def test_original_error_is_raised_when_retry_fails(cloud, monkeypatch):
+    index = pinecone_manager.get_index()
+    cloud.host = "host-2"
+    query = FakeIndex.query
+
+    def failing_on_new_host(self, **kwargs):
+        if self.host == "host-2":
+            raise RuntimeError("retry failed")
+        return query(self, **kwargs)
+
+    monkeypatch.setattr(FakeIndex, "query", failing_on_new_host)
+    with pytest.raises(ConnectionError, match="host-1") as raised:
+        index.query(top_k=1)
+    assert isinstance(raised.value.__cause__, RuntimeError)
@@ -0,0 +1,154 @@
+# QA chain tests
+"""
+QA Chain Tests
+Each question must hit the retriever exactly once, whether the answer is
+returned whole or streamed, and an answer is cached under the document
+version it was generated from
+"""
+
+import asyncio
+import threading
+from typing import List
+import pytest
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import RunnableLambda
+import config
+from retrieval import cache, qa_chain as qa_chain_module
+from retrieval.qa_chain import (
+    QAChainWrapper,
+    build_qa_chain,
+    ask_question,
+    aask_question,
+    stream_question,
+    astream_question
+)
+
+
+class CountingRetriever(BaseRetriever):
+    """Stub retriever returning one fixed chunk and counting its calls"""
+
+    calls: int = 0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        self.calls += 1
+        return [Document(page_content="Clause 4.2 covers pump maintenance.", metadata={"chunk_index": 0})]
+
+
+def make_chain() -> QAChainWrapper:
+    # No pdf_id: the answer cache is bypassed, so every question retrieves
+    answer_chain = RunnableLambda(lambda inputs: f"Answer from: {inputs['context']}")
+    return QAChainWrapper(answer_chain, CountingRetriever())
+
+
+def test_ask_question_retrieves_once():
+    qa_chain = make_chain()
+
+    result = ask_question(qa_chain, "Which clause covers pumps?")
+
+    assert qa_chain.retriever.calls == 1
+    assert "Clause 4.2" in result["answer"]
+    assert [doc.page_content for doc in result["source_documents"]] == ["Clause 4.2 covers pump maintenance."]
+
+
+def test_stream_question_retrieves_once():
+    qa_chain = make_chain()
+
+    result = stream_question(qa_chain, "Which clause covers pumps?")
+    answer = "".join(result["answer_stream"])
+
+    assert qa_chain.retriever.calls == 1
+    assert "Clause 4.2" in answer
+    assert len(result["source_documents"]) == 1
+
+
+def test_async_variants_retrieve_once():
+    qa_chain = make_chain()
+
+    async def ask_and_stream():
+        await aask_question(qa_chain, "Which clause covers pumps?")
+        result = await astream_question(qa_chain, "Which clause covers pumps?")
+        return "".join([token async for token in result["answer_stream"]])
+
+    answer = asyncio.run(ask_and_stream())
+
+    assert qa_chain.retriever.calls == 2
+    assert "Clause 4.2" in answer
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+def test_answer_generated_across_reindex_is_cached_under_old_version(monkeypatch, streamed):
+    versions = {"live": 1}
+    monkeypatch.setattr(cache, "get_document_version", lambda pdf_id: versions["live"])
+
+    def generate(inputs):
+        # A re-index goes live while the answer is being generated
+        versions["live"] = 2
+        return "Answer built from version 1"
+
+    pdf_id = f"reindexed-{streamed}"
+    qa_chain = QAChainWrapper(RunnableLambda(generate), CountingRetriever(), pdf_id)
+    if streamed:
+        "".join(stream_question(qa_chain, "Which clause covers pumps?")["answer_stream"])
+    else:
+        ask_question(qa_chain, "Which clause covers pumps?")
+
+    assert cache.get_cached_answer(pdf_id, "Which clause covers pumps?")[1] is None
+    versions["live"] = 1
+    assert cache.get_cached_answer(pdf_id, "Which clause covers pumps?")[1]["answer"] == "Answer built from version 1"
+
+
+def test_async_variants_read_the_registry_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def get_document_version(pdf_id):
+        threads.append(threading.current_thread())
+        return 1
+
+    monkeypatch.setattr(cache, "get_document_version", get_document_version)
+    qa_chain = QAChainWrapper(RunnableLambda(lambda inputs: "Answer"), CountingRetriever(), "off-loop")
+
+    async def ask_and_stream():
+        await aask_question(qa_chain, "Which clause covers pumps?")
+        result = await astream_question(qa_chain, "Which clause covers valves?")
+        return [token async for token in result["answer_stream"]]
+
+    asyncio.run(ask_and_stream())
+
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+@pytest.mark.parametrize("rerank", [False, True])
+def test_built_chain_retrieves_once_and_prompts_with_sources(monkeypatch, rerank):
+    retriever = CountingRetriever()
+    prompts = []
+
+    def llm(prompt):
+        prompts.append(prompt.to_string())
+        return "Clause 4.2"
+
+    monkeypatch.setattr(config, "RERANK_ENABLED", rerank)
+    monkeypatch.setattr(qa_chain_module, "create_retriever", lambda pdf_id, top_k=None: retriever)
+    monkeypatch.setattr(qa_chain_module, "get_llm", lambda: RunnableLambda(llm))
+
+    result = ask_question(build_qa_chain(None), "Which clause covers pumps?")
+
+    assert retriever.calls == 1
+    assert result["answer"] == "Clause 4.2"
+    assert len(prompts) == 1 and "Clause 4.2 covers pump maintenance." in prompts[0]
+
+
+def test_cached_answer_skips_retrieval(monkeypatch):
+    monkeypatch.setattr(cache, "get_document_version", lambda pdf_id: 1)
+    qa_chain = QAChainWrapper(RunnableLambda(lambda inputs: "Answer"), CountingRetriever(), "cached")
+
+    first = ask_question(qa_chain, "Which clause covers pumps?")
+    second = ask_question(qa_chain, "which clause covers  pumps?")
+
+    assert qa_chain.retriever.calls == 1
+    assert second["answer"] == first["answer"]
+    assert [doc.page_content for doc in second["source_documents"]] == ["Clause 4.2 covers pump maintenance."]
@@ -0,0 +1,114 @@
+# Reranker tests
+"""
+Reranker Tests
+Within budget the cross-encoder order wins; past the budget, including
+time spent queued behind other requests, the retrieval order is returned
+and the queued requests are never scored
+"""
+
+import time
+import asyncio
+import threading
+from typing import List
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from retrieval import reranker
+from retrieval.reranker import RerankingRetriever, get_reranker_stats
+
+
+class FixedRetriever(BaseRetriever):
+    """Stub retriever returning the same candidates in retrieval order"""
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return [Document(page_content=f"candidate {i}") for i in range(6)]
+
+
+class FakeCrossEncoder:
+    """Scores later candidates higher, after an optional delay"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def predict(self, pairs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return [float(i) for i in range(len(pairs))]
+
+
+def _install(monkeypatch, cross_encoder: FakeCrossEncoder) -> FakeCrossEncoder:
+    monkeypatch.setattr(reranker, "_reranker", cross_encoder)
+    monkeypatch.setattr(reranker, "_executor", None)
+    monkeypatch.setattr(reranker, "_stats", {"reranked": 0, "fallbacks": 0, "total_ms": 0.0})
+    return cross_encoder
+
+
+def _drain():
+    """Wait until the reranking thread has worked through its queue"""
+    reranker._get_executor().submit(lambda: None).result()
+
+
+def _contents(docs: List[Document]) -> List[str]:
+    return [doc.page_content for doc in docs]
+
+
+def test_reranks_within_budget(monkeypatch):
+    _install(monkeypatch, FakeCrossEncoder())
+    retriever = RerankingRetriever(base_retriever=FixedRetriever(), k=3, budget_ms=1000)
+
+    assert _contents(retriever.invoke("pumps")) == ["candidate 5", "candidate 4", "candidate 3"]
+    assert get_reranker_stats()["reranked"] == 1
+
+
+def test_queued_requests_fall_back_to_retrieval_order(monkeypatch):
+    cross_encoder = _install(monkeypatch, FakeCrossEncoder(delay=0.3))
+    retriever = RerankingRetriever(base_retriever=FixedRetriever(), k=3, budget_ms=50)
+    results = []
+
+    def ask():
+        results.append(_contents(retriever.invoke("pumps")))
+
+    threads = [threading.Thread(target=ask) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    _drain()
+
+    assert results == [["candidate 0", "candidate 1", "candidate 2"]] * 4
+    assert get_reranker_stats()["fallbacks"] == 4
+    # Only the first request reached the model; the rest expired while queued
+    assert cross_encoder.calls == 1
+
+
+def test_async_requests_fall_back_to_retrieval_order(monkeypatch):
+    cross_encoder = _install(monkeypatch, FakeCrossEncoder(delay=0.3))
+    retriever = RerankingRetriever(base_retriever=FixedRetriever(), k=3, budget_ms=50)
+
+    async def ask_all():
+        return await asyncio.gather(*[retriever.ainvoke("pumps") for _ in range(4)])
+
+    results = asyncio.run(ask_all())
+    _drain()
+
+    assert [_contents(docs) for docs in results] == [["candidate 0", "candidate 1", "candidate 2"]] * 4
+    assert get_reranker_stats()["fallbacks"] == 4
+    assert cross_encoder.calls == 1
+
+
+def test_model_errors_fall_back(monkeypatch):
+    class BrokenCrossEncoder(FakeCrossEncoder):
+        def predict(self, pairs):
+            raise RuntimeError("model unavailable")
+
+    _install(monkeypatch, BrokenCrossEncoder())
+    retriever = RerankingRetriever(base_retriever=FixedRetriever(), k=2, budget_ms=1000)
+
+    assert _contents(retriever.invoke("pumps")) == ["candidate 0", "candidate 1"]
+    stats = get_reranker_stats()
+    assert (stats["reranked"], stats["fallbacks"]) == (0, 1)
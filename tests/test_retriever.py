@@ -0,0 +1,53 @@
+# Hybrid retrieval tests
+"""
+Hybrid Retrieval Tests
+Reciprocal rank fusion orders chunks by fused score with ties kept in
+first-seen order, and the hybrid retriever returns one copy of each chunk
+"""
+
+from typing import List
+from langchain_core.documents import Document
+from langchain_core.embeddings import FakeEmbeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+from retrieval.retriever import HybridRetriever, reciprocal_rank_fusion
+
+
+def test_rrf_ranks_agreement_above_single_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d", "b"]], rrf_k=60)
+
+    # b: 1/62 + 1/63, c: 1/63 + 1/61, a: 1/61, d: 1/62
+    assert fused == ["c", "b", "a", "d"]
+
+
+def test_rrf_constant_flattens_rank_weighting():
+    rankings = [["a", "b", "c", "d", "e"], ["f", "g", "h", "i", "e"]]
+
+    # A small constant lets a top rank win; a large one favours agreement
+    assert reciprocal_rank_fusion(rankings, rrf_k=0)[:2] == ["a", "f"]
+    assert reciprocal_rank_fusion(rankings, rrf_k=60)[0] == "e"
+
+
+def test_rrf_ties_keep_first_seen_order():
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "a"]], rrf_k=60) == ["a", "b"]
+    assert reciprocal_rank_fusion([["x", "y"], ["z", "w"]], rrf_k=60) == ["x", "z", "y", "w"]
+    assert reciprocal_rank_fusion([[], ["b", "a"]], rrf_k=60) == ["b", "a"]
+
+
+def _docs(source: str, chunk_indexes: List[int]) -> List[Document]:
+    return [
+        Document(page_content=f"{source} chunk {i}", metadata={"chunk_index": i})
+        for i in chunk_indexes
+    ]
+
+
+def test_hybrid_fusion_keeps_one_dense_copy_per_chunk():
+    retriever = HybridRetriever(
+        vector_store=InMemoryVectorStore(embedding=FakeEmbeddings(size=4)),
+        pdf_id="doc",
+        k=3,
+        rrf_k=60
+    )
+
+    fused = retriever._fuse(_docs("dense", [0, 1, 2]), _docs("sparse", [2, 5, 0]))
+
+    assert [doc.page_content for doc in fused] == ["dense chunk 0", "dense chunk 2", "dense chunk 1"]
@@ -1,13 +1,45 @@
 """Utils package for RAG Chatbot"""
 
-from .pdf_processor import extract_text_from_pdf, chunk_text
-from .embeddings import get_embedding_model, create_embeddings
+from .pdf_processor import (
+    extract_text_from_pdf,
+    extract_pages_from_pdf,
+    iter_pages_from_pdf,
+    chunk_text,
+    chunk_spans,
+    iter_chunks,
+    iter_chunk_spans,
+    get_chunk_tokenizer,
+    chunk_token_limit,
+    summarize_chunk_tokens,
+    compute_content_hash,
+    compute_chunk_hash
+)
+from .embeddings import (
+    get_embedding_model,
+    create_embeddings,
+    embed_in_batches,
+    get_embedding_cache_stats,
+    get_query_batching_stats
+)
 from .prompts import get_qa_prompt_template
 
 __all__ = [
     'extract_text_from_pdf',
+    'extract_pages_from_pdf',
+    'iter_pages_from_pdf',
     'chunk_text',
+    'chunk_spans',
+    'iter_chunks',
+    'iter_chunk_spans',
+    'get_chunk_tokenizer',
+    'chunk_token_limit',
+    'summarize_chunk_tokens',
+    'compute_content_hash',
+    'compute_chunk_hash',
     'get_embedding_model',
     'create_embeddings',
+    'embed_in_batches',
+    'get_embedding_cache_stats',
+    'get_query_batching_stats',
     'get_qa_prompt_template'
 ]
\ No newline at end of file
@@ -0,0 +1,184 @@
+# Persistent embedding cache
+"""
+Embedding Cache Module
+On-disk cache of embedding vectors keyed by model name and text hash
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import List, Dict, Any
+from langchain_core.embeddings import Embeddings
+
+
+_SQLITE_BATCH_SIZE = 500  # Stay under SQLite's bound parameter limit
+_TOUCH_FLUSH_SIZE = 1024  # Pending LRU timestamp updates written in one transaction...
+_TOUCH_FLUSH_SECONDS = 30.0  # ...or at least this often while lookups keep hitting
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from a SQLite cache
+
+    Entries are keyed by (model name, SHA-256 of the text) so switching
+    models never returns stale vectors. The cache is bounded; the least
+    recently used entries are evicted once it grows past max_entries.
+    Hits only queue their LRU timestamp update; queued updates are written
+    in batches, so a read-mostly workload does not commit on every lookup.
+    The entry count is kept in memory and re-counted only when it appears
+    to exceed max_entries (other processes may share the database).
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, path: str, max_entries: int):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)"
+        )
+        self._connection.commit()
+
+        self._entries = self._count()
+        self._touched = {}  # key -> last_used not yet written
+        self._last_flush = time.monotonic()
+
+    def _count(self) -> int:
+        """Exact number of cached entries (full scan of the key index)"""
+        return self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _flush_touches(self):
+        """Write queued LRU timestamps (caller holds the lock and commits)"""
+        if self._touched:
+            self._connection.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()]
+            )
+            self._touched = {}
+        self._last_flush = time.monotonic()
+
+    def _key(self, kind: str, text: str) -> str:
+        """Build the cache key for a text under the current model"""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{kind}:{digest}"
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Fetch cached vectors and queue a refresh of their LRU timestamp"""
+        found = {}
+        now = time.time()
+
+        with self._lock:
+            for start in range(0, len(keys), _SQLITE_BATCH_SIZE):
+                batch = keys[start:start + _SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            self._touched.update(dict.fromkeys(found, now))
+            if len(self._touched) >= _TOUCH_FLUSH_SIZE or \
+                    time.monotonic() - self._last_flush >= _TOUCH_FLUSH_SECONDS:
+                self._flush_touches()
+                self._connection.commit()
+
+        return found
+
+    def _store(self, entries: Dict[str, List[float]]):
+        """Insert new vectors and evict least recently used entries if needed"""
+        now = time.time()
+
+        with self._lock:
+            # A key another process stored meanwhile holds the same vector
+            self._entries += self._connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in entries.items()]
+            ).rowcount
+            self._flush_touches()
+
+            if self._entries > self.max_entries:
+                self._entries = self._count()
+            if self._entries > self.max_entries:
+                # Evict down to 90% of capacity so eviction runs in bulk, not per insert
+                excess = self._entries - int(self.max_entries * 0.9)
+                self._entries -= self._connection.execute(
+                    """
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+                    )
+                    """,
+                    (excess,)
+                ).rowcount
+            self._connection.commit()
+
+    def _embed_cached(self, kind: str, texts: List[str], embed_fn) -> List[List[float]]:
+        """Serve texts from the cache, embedding only the misses"""
+        keys = [self._key(kind, text) for text in texts]
+        vectors = self._lookup(list(set(keys)))
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            new_vectors = embed_fn(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self._store(computed)
+            vectors.update(computed)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        return [vectors[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_cached("document", texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_cached(
+            "query",
+            [text],
+            lambda texts: [self.embeddings.embed_query(texts[0])]
+        )[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit/miss counters
+
+        Returns:
+            Dict with 'hits', 'misses', 'hit_rate' and 'entries'
+        """
+        with self._lock:
+            entries = self._count()
+
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries
+        }
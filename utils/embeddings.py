@@ -4,33 +4,220 @@ Embeddings Module
 Handles embedding model initialization and text-to-vector conversion
 """
 
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from typing import List
+import os
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
+from typing import List, Dict, Any, Callable
 import config
+from utils.embedding_cache import CachedEmbeddings
 
 
 _embedding_model = None  # Singleton pattern for efficiency
+_embedding_model_lock = threading.Lock()  # Warm-up thread and requests may load concurrently
 
+# Bounds concurrent ingestion batches so parallel uploads don't oversubscribe the CPU
+embedding_slots = threading.BoundedSemaphore(config.EMBEDDING_MAX_CONCURRENT_BATCHES)
 
-def get_embedding_model() -> HuggingFaceEmbeddings:
+
+def _configure_torch_threads():
+    """Let torch use every CPU core (or EMBEDDING_NUM_THREADS) for inference"""
+    import torch
+    
+    num_threads = config.EMBEDDING_NUM_THREADS or os.cpu_count() or 1
+    torch.set_num_threads(num_threads)
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that coalesces concurrent query embeddings
+    
+    Queries are handed to a single worker thread, which waits up to
+    max_wait_ms after the first one for others to arrive and embeds up to
+    max_batch_size of them in one forward pass. Document embedding is
+    already batched by the caller and passes straight through.
+    """
+    
+    def __init__(self, embeddings: Embeddings, max_batch_size: int, max_wait_ms: float):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+    
+    def _ensure_worker(self):
+        """Start the batching thread on first use"""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="query-embedding-batcher", daemon=True
+                )
+                self._worker.start()
+    
+    def _run(self):
+        """Collect queries into batches and embed them until the process exits"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                # Identical questions in one batch share a row
+                texts = list(dict.fromkeys(text for text, _ in batch))
+                vectors = dict(zip(texts, self.embeddings.embed_documents(texts)))
+                for text, future in batch:
+                    future.set_result(vectors[text])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get batching metrics
+        
+        Returns:
+            Dict with query/batch counts, mean batch size and the
+            batch size histogram
+        """
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            queries = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "queries": queries,
+                "batches": batches,
+                "mean_batch_size": queries / batches if batches else 0.0,
+                "max_batch_size": max(self._batch_sizes, default=0),
+                "batch_sizes": dict(sorted(self._batch_sizes.items()))
+            }
+
+
+def _create_torch_embeddings() -> Embeddings:
+    """Load the sentence-transformers model on torch"""
+    # Imported on first use: pulls in torch and sentence-transformers
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    
+    _configure_torch_threads()
+    
+    return HuggingFaceEmbeddings(
+        model_name=config.EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': 'cpu'},  # Use 'cuda' if GPU available
+        encode_kwargs={
+            'normalize_embeddings': True,
+            'batch_size': config.EMBEDDING_BATCH_SIZE
+        }
+    )
+
+
+def _load_embedding_model() -> Embeddings:
+    """Build the configured backend with its batching and cache wrappers"""
+    embedding_model = None
+    cache_model_name = config.EMBEDDING_MODEL_NAME
+    
+    if config.EMBEDDING_BACKEND == "onnx":
+        # Optional dependency (optimum[onnxruntime]); falls back to torch
+        from utils.onnx_embeddings import load_onnx_embeddings
+        embedding_model = load_onnx_embeddings(_create_torch_embeddings)
+        if embedding_model is not None:
+            # Quantized vectors differ slightly, so don't share cache entries
+            cache_model_name = f"{config.EMBEDDING_MODEL_NAME}:onnx"
+    
+    if embedding_model is None:
+        embedding_model = _create_torch_embeddings()
+    
+    if config.QUERY_BATCHING_ENABLED:
+        embedding_model = MicroBatchingEmbeddings(
+            embedding_model,
+            max_batch_size=config.QUERY_BATCH_MAX_SIZE,
+            max_wait_ms=config.QUERY_BATCH_MAX_WAIT_MS
+        )
+    
+    if config.EMBEDDING_CACHE_ENABLED:
+        embedding_model = CachedEmbeddings(
+            embedding_model,
+            model_name=cache_model_name,
+            path=config.EMBEDDING_CACHE_PATH,
+            max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES
+        )
+    
+    return embedding_model
+
+
+def get_embedding_model() -> Embeddings:
     """
     Get or initialize the embedding model (singleton)
     
+    Uses the ONNX Runtime backend when EMBEDDING_BACKEND is "onnx" and it
+    loads and passes its parity check, torch otherwise. Concurrent queries
+    are coalesced into batched forward passes, and when the embedding
+    cache is enabled the model is wrapped (outermost) so repeated
+    document chunks and queries are served from disk.
+    
     Returns:
-        HuggingFaceEmbeddings: Initialized embedding model
+        Embeddings: Initialized embedding model
     """
     global _embedding_model
     
     if _embedding_model is None:
-        _embedding_model = HuggingFaceEmbeddings(
-            model_name=config.EMBEDDING_MODEL_NAME,
-            model_kwargs={'device': 'cpu'},  # Use 'cuda' if GPU available
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                _embedding_model = _load_embedding_model()
     
     return _embedding_model
 
 
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    """
+    Get embedding cache hit/miss counters
+    
+    Returns:
+        Dict with cache statistics (empty if the cache is disabled)
+    """
+    embedding_model = get_embedding_model()
+    if isinstance(embedding_model, CachedEmbeddings):
+        return embedding_model.get_stats()
+    return {}
+
+
+def get_query_batching_stats() -> Dict[str, Any]:
+    """
+    Get query micro-batching metrics
+    
+    Returns:
+        Dict with batching statistics (empty if batching is disabled)
+    """
+    embedding_model = get_embedding_model()
+    if isinstance(embedding_model, CachedEmbeddings):
+        embedding_model = embedding_model.embeddings
+    if isinstance(embedding_model, MicroBatchingEmbeddings):
+        return embedding_model.get_stats()
+    return {}
+
+
 def create_embeddings(texts: List[str]) -> List[List[float]]:
     """
     Create embeddings for a list of texts
@@ -50,6 +237,64 @@ def create_embeddings(texts: List[str]) -> List[List[float]]:
         raise Exception(f"Error creating embeddings: {str(e)}")
 
 
+def embed_in_batches(
+    texts: List[str],
+    on_batch: Callable[[List[int], List[List[float]]], None],
+    batch_size: int = None
+) -> Dict[str, Any]:
+    """
+    Embed texts in length-sorted batches, handing each batch to a consumer
+    
+    Texts are sorted by length so each batch pads to a similar length, and
+    the consumer (typically a vector store upsert) for batch N runs on a
+    background thread while batch N+1 is being embedded.
+    
+    Args:
+        texts: List of text strings to embed
+        on_batch: Called with (positions in `texts`, embedding vectors)
+        batch_size: Texts per batch (default from config)
+        
+    Returns:
+        Dict with 'chunks', 'seconds' and 'chunks_per_second'
+    """
+    try:
+        if batch_size is None:
+            batch_size = config.INGESTION_BATCH_SIZE
+        
+        embedding_model = get_embedding_model()
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        start_time = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=1) as upsert_executor:
+            pending = None
+            
+            for start in range(0, len(order), batch_size):
+                positions = order[start:start + batch_size]
+                with embedding_slots:
+                    vectors = embedding_model.embed_documents([texts[i] for i in positions])
+                
+                # Keep at most one batch in flight so memory stays bounded
+                if pending is not None:
+                    pending.result()
+                pending = upsert_executor.submit(on_batch, positions, vectors)
+            
+            if pending is not None:
+                pending.result()
+        
+        elapsed = time.perf_counter() - start_time
+        stats = {
+            "chunks": len(texts),
+            "seconds": elapsed,
+            "chunks_per_second": len(texts) / elapsed if elapsed > 0 else 0.0
+        }
+        print(f"Embedded {stats['chunks']} chunks in {elapsed:.1f}s "
+              f"({stats['chunks_per_second']:.1f} chunks/s)")
+        return stats
+    
+    except Exception as e:
+        raise Exception(f"Error creating embeddings: {str(e)}")
+
+
 def embed_query(query: str) -> List[float]:
     """
     Create embedding for a single query
@@ -0,0 +1,236 @@
+# ONNX Runtime embeddings
+"""
+ONNX Embeddings Module
+Runs the embedding model as an int8-quantized ONNX graph on ONNX Runtime
+"""
+
+import os
+import json
+from contextlib import contextmanager
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+import config
+
+
+QUANTIZED_FILE = "model_quantized.onnx"
+EXPORT_INFO_FILE = "export_info.json"
+EXPORT_LOCK_FILE = "export.lock"
+
+# Sentences embedded by both backends to check the quantized graph
+PARITY_SENTENCES = [
+    "What is the main topic of this document?",
+    "The quarterly revenue grew by twelve percent compared to last year.",
+    "Section 4.2 describes the installation requirements for the software.",
+    "Patients were randomly assigned to the treatment or placebo group.",
+    "Termination of this agreement requires thirty days written notice.",
+    "a"
+]
+
+
+def _export_dir() -> str:
+    """Directory holding the exported model for the configured model name"""
+    slug = config.EMBEDDING_MODEL_NAME.replace("/", "--")
+    suffix = "int8" if config.ONNX_QUANTIZE else "fp32"
+    return os.path.join(config.ONNX_MODEL_DIR, f"{slug}-{suffix}")
+
+
+def _pooling_mode(model_name: str) -> str:
+    """
+    Read the pooling mode from the model's sentence-transformers config
+
+    Returns:
+        str: "cls" or "mean" (the default when the model has no pooling config)
+    """
+    try:
+        from huggingface_hub import hf_hub_download
+
+        with open(hf_hub_download(model_name, "1_Pooling/config.json"), "r", encoding="utf-8") as f:
+            pooling = json.load(f)
+        return "cls" if pooling.get("pooling_mode_cls_token") else "mean"
+
+    except Exception:
+        return "mean"
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings computed with an ONNX Runtime feature-extraction model
+
+    Produces the same normalized vectors as the torch backend (CLS or
+    mean pooling, matching the model's sentence-transformers config).
+    """
+
+    def __init__(self, model_dir: str, file_name: str, pooling: str, batch_size: int):
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = config.EMBEDDING_NUM_THREADS or os.cpu_count() or 1
+
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir,
+            file_name=file_name,
+            session_options=session_options
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.pooling = pooling
+        self.batch_size = batch_size
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                return_tensors="np"
+            )
+            hidden = np.asarray(self.model(**inputs).last_hidden_state, dtype=np.float32)
+
+            if self.pooling == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = inputs["attention_mask"][..., None].astype(np.float32)
+                pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            vectors.extend((pooled / np.maximum(norms, 1e-12)).tolist())
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+def _export(export_dir: str) -> str:
+    """
+    Export the configured model to ONNX, optionally with dynamic int8 quantization
+
+    Returns:
+        str: File name of the graph to load from export_dir
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    print(f"Exporting {config.EMBEDDING_MODEL_NAME} to ONNX in {export_dir}...")
+    model = ORTModelForFeatureExtraction.from_pretrained(config.EMBEDDING_MODEL_NAME, export=True)
+    model.save_pretrained(export_dir)
+    AutoTokenizer.from_pretrained(config.EMBEDDING_MODEL_NAME).save_pretrained(export_dir)
+
+    if not config.ONNX_QUANTIZE:
+        return "model.onnx"
+
+    quantization_config = getattr(AutoQuantizationConfig, config.ONNX_QUANTIZATION_TARGET)(
+        is_static=False,
+        per_channel=False
+    )
+    ORTQuantizer.from_pretrained(model).quantize(
+        save_dir=export_dir,
+        quantization_config=quantization_config
+    )
+    return QUANTIZED_FILE
+
+
+@contextmanager
+def _export_lock(export_dir: str):
+    """
+    Hold an exclusive file lock on the export directory
+
+    API workers start at the same time and would otherwise all export
+    into the same directory. Not locked where fcntl is unavailable.
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    with open(os.path.join(export_dir, EXPORT_LOCK_FILE), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _parity(onnx_embeddings: OnnxEmbeddings, torch_embeddings: Embeddings) -> float:
+    """Lowest cosine similarity between ONNX and torch vectors of the parity sentences"""
+    onnx_vectors = np.asarray(onnx_embeddings.embed_documents(PARITY_SENTENCES))
+    torch_vectors = np.asarray(torch_embeddings.embed_documents(PARITY_SENTENCES))
+    return float(np.min(np.sum(onnx_vectors * torch_vectors, axis=1)))
+
+
+def _export_and_check(export_dir: str, torch_factory) -> OnnxEmbeddings:
+    """Export the model, check parity against torch and record the verdict (caller holds the lock)"""
+    file_name = _export(export_dir)
+    pooling = _pooling_mode(config.EMBEDDING_MODEL_NAME)
+    onnx_embeddings = OnnxEmbeddings(export_dir, file_name, pooling, config.EMBEDDING_BATCH_SIZE)
+    min_cosine = _parity(onnx_embeddings, torch_factory())
+
+    info = {
+        "model_name": config.EMBEDDING_MODEL_NAME,
+        "file_name": file_name,
+        "pooling": pooling,
+        "min_cosine": min_cosine,
+        "passed": min_cosine >= config.ONNX_PARITY_THRESHOLD
+    }
+    # Written last and atomically: its presence marks a complete export
+    info_path = os.path.join(export_dir, EXPORT_INFO_FILE)
+    with open(info_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(info_path + ".tmp", info_path)
+    print(f"ONNX parity vs torch: min cosine {min_cosine:.4f} "
+          f"(threshold {config.ONNX_PARITY_THRESHOLD})")
+    return onnx_embeddings
+
+
+def load_onnx_embeddings(torch_factory) -> Optional[OnnxEmbeddings]:
+    """
+    Load the ONNX embedding backend, exporting the model on first use
+
+    The first export is checked against the torch model: if any parity
+    sentence's cosine similarity falls below ONNX_PARITY_THRESHOLD the
+    export is rejected and None is returned, so the caller keeps using
+    torch. The verdict is stored next to the export, so later starts do
+    not need to load the torch model. Concurrent processes export one at
+    a time; the others wait and reuse the finished export.
+
+    Args:
+        torch_factory: Builds the torch embedding model for the parity check
+
+    Returns:
+        OnnxEmbeddings, or None if the backend is unavailable or failed parity
+    """
+    export_dir = _export_dir()
+    info_path = os.path.join(export_dir, EXPORT_INFO_FILE)
+
+    try:
+        onnx_embeddings = None
+        if not os.path.exists(info_path):
+            with _export_lock(export_dir):
+                # Another process may have finished the export while this one waited
+                if not os.path.exists(info_path):
+                    onnx_embeddings = _export_and_check(export_dir, torch_factory)
+
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+
+        if not info["passed"]:
+            print(f"ONNX export failed parity (min cosine {info['min_cosine']:.4f}); using torch")
+            return None
+
+        if onnx_embeddings is None:
+            onnx_embeddings = OnnxEmbeddings(
+                export_dir, info["file_name"], info["pooling"], config.EMBEDDING_BATCH_SIZE
+            )
+        return onnx_embeddings
+
+    except Exception as e:
+        print(f"ONNX embedding backend unavailable, using torch: {str(e)}")
+        return None
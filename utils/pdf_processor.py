@@ -4,12 +4,138 @@ PDF Processing Module
 Handles PDfromF text extraction and chunking
 """
 
+import os
+import re
+import bisect
+import hashlib
+import threading
+import multiprocessing
+from io import BytesIO
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from PyPDF2 import PdfReader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from typing import List
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, Callable, Optional
 import config
 
 
+_extraction_pool = None  # Reused across uploads; spawning workers is expensive
+_chunk_tokenizer = None
+_chunk_tokenizer_lock = threading.Lock()  # Fast tokenizers cannot be called from two threads at once
+_token_counts_unavailable = False
+
+# Tried in order; only the first may overlap itself ("\n\n\n"), since
+# it is the only one ever searched across the whole text
+CHUNK_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+def _get_extraction_pool() -> ProcessPoolExecutor:
+    """
+    Get or create the page extraction process pool (singleton)
+    
+    Returns:
+        ProcessPoolExecutor: Worker pool for PDF page extraction
+    """
+    global _extraction_pool
+    
+    if _extraction_pool is None:
+        # Spawn rather than fork: the parent holds torch and server threads
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=config.PDF_EXTRACTION_WORKERS or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    
+    return _extraction_pool
+
+
+def _read_pdf_bytes(pdf_file) -> bytes:
+    """Read raw bytes from a path or file-like object"""
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def _extract_page_range(pdf_bytes: bytes, start: int, end: int) -> List[str]:
+    """Extract text for pages [start, end) of a PDF (runs in a worker process)"""
+    reader = PdfReader(BytesIO(pdf_bytes))
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def get_pdf_page_count(pdf_file) -> int:
+    """
+    Count the pages of a PDF file without extracting any text
+    
+    Args:
+        pdf_file: File object or path to PDF
+        
+    Returns:
+        int: Number of pages
+    """
+    try:
+        return len(PdfReader(BytesIO(_read_pdf_bytes(pdf_file))).pages)
+    
+    except Exception as e:
+        raise Exception(f"Error reading PDF: {str(e)}")
+
+
+def iter_pages_from_pdf(pdf_file) -> Iterator[str]:
+    """
+    Yield the text of each page of a PDF file in order
+    
+    Large PDFs are split into page ranges extracted in parallel worker
+    processes (PyPDF2 is pure Python, so threads would contend on the GIL).
+    Only a bounded window of ranges is in flight, so memory stays flat.
+    
+    Args:
+        pdf_file: File object or path to PDF
+        
+    Yields:
+        str: Text of each page ("" for pages without text)
+    """
+    try:
+        pdf_bytes = _read_pdf_bytes(pdf_file)
+        reader = PdfReader(BytesIO(pdf_bytes))
+        num_pages = len(reader.pages)
+        workers = config.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1
+        
+        if num_pages < config.PDF_PARALLEL_MIN_PAGES or workers <= 1:
+            for page in reader.pages:
+                yield page.extract_text() or ""
+            return
+        
+        # A few ranges per worker balances pages of uneven complexity
+        range_size = max(1, -(-num_pages // (workers * 2)))
+        starts = deque(range(0, num_pages, range_size))
+        in_flight = deque()
+        
+        while starts or in_flight:
+            while starts and len(in_flight) < workers * 2:
+                start = starts.popleft()
+                in_flight.append(_get_extraction_pool().submit(
+                    _extract_page_range, pdf_bytes, start, min(start + range_size, num_pages)
+                ))
+            yield from in_flight.popleft().result()
+    
+    except Exception as e:
+        raise Exception(f"Error extracting text from PDF: {str(e)}")
+
+
+def extract_pages_from_pdf(pdf_file) -> List[str]:
+    """
+    Extract text from each page of a PDF file
+    
+    Args:
+        pdf_file: File object or path to PDF
+        
+    Returns:
+        List[str]: Text of every page in order ("" for pages without text)
+    """
+    return list(iter_pages_from_pdf(pdf_file))
+
+
 def extract_text_from_pdf(pdf_file) -> str:
     """
     Extract text from PDF file
@@ -20,19 +146,214 @@ def extract_text_from_pdf(pdf_file) -> str:
     Returns:
         str: Extracted text from all pages
     """
-    try:
-        reader = PdfReader(pdf_file)
-        text = ""
+    pages = extract_pages_from_pdf(pdf_file)
+    return "\n".join(page for page in pages if page).strip()
+
+
+def split_spans(
+    text: str,
+    chunk_size: int = None,
+    chunk_overlap: int = None,
+    separators: List[str] = None,
+    measure: Callable[[int], int] = None
+) -> List[Tuple[int, int]]:
+    """
+    Find chunk boundaries without copying the text
+    
+    Produces exactly the chunks of LangChain's RecursiveCharacterTextSplitter
+    (length_function=len, separators kept at the start of each piece,
+    whitespace stripped), as offsets. Each separator's occurrences are
+    found once per text and looked up by bisection, so nested splitting
+    never rescans or slices the text. Pieces are handled as a list of
+    boundaries, and chunk ends and overlap starts are found by bisecting
+    it rather than by adding pieces one at a time.
+    
+    Lengths are in characters unless a measure is given: measure(offset)
+    is the length of text[:offset] in some other unit (e.g. tokens), and
+    the length of a span is the difference of its two ends.
+    
+    Args:
+        text: Input text to chunk
+        chunk_size: Maximum chunk length (default CHUNK_SIZE)
+        chunk_overlap: Maximum overlap between chunks (default CHUNK_OVERLAP)
+        separators: Separators to split on, coarsest first (default
+            CHUNK_SEPARATORS)
+        measure: Cumulative length at an offset (default: the offset)
         
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
+    Returns:
+        List of (start, end) offsets into text, end exclusive
+    """
+    if chunk_size is None:
+        chunk_size = config.CHUNK_SIZE
+    if chunk_overlap is None:
+        chunk_overlap = config.CHUNK_OVERLAP
+    if separators is None:
+        separators = CHUNK_SEPARATORS
+    
+    occurrences = {}  # separator -> sorted start offsets in text
+    spans = []
+    
+    def find(separator: str, start: int, end: int) -> List[int]:
+        """Start offsets of separator occurrences lying wholly inside [start, end)"""
+        positions = occurrences.get(separator)
+        if positions is None:
+            positions = [match.start() for match in re.finditer(re.escape(separator), text)]
+            occurrences[separator] = positions
+        low = bisect.bisect_left(positions, start)
+        high = bisect.bisect_right(positions, end - len(separator))
+        return positions[low:high]
+    
+    def emit(start: int, end: int):
+        """Record a merged chunk with surrounding whitespace stripped"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            spans.append((start, end))
+    
+    def merge(bounds, lengths, low: int, high: int):
+        """
+        Pack pieces low..high-1 (each shorter than chunk_size) into chunks
+        
+        Piece i spans bounds[i]:bounds[i + 1] and is lengths[i + 1] -
+        lengths[i] long. A chunk grows until the next piece would overflow
+        it; the next chunk then starts at the first piece within
+        chunk_overlap of the end (and leaving room for the overflowing piece).
+        """
+        first = low
+        while True:
+            # First piece that does not fit after bounds[first]
+            overflow = bisect.bisect_right(lengths, lengths[first] + chunk_size, first + 1, high + 1) - 1
+            if overflow >= high:
+                break
+            emit(bounds[first], bounds[overflow])
+            keep_from = max(lengths[overflow] - chunk_overlap, lengths[overflow + 1] - chunk_size)
+            first = bisect.bisect_left(lengths, keep_from, first, overflow)
+        emit(bounds[first], bounds[high])
+    
+    def split(start: int, end: int, level: int):
+        # Coarsest separator present in this piece; finer ones are tried on oversized parts
+        bounds = [start, end]
+        next_level = None
+        for i in range(level, len(separators)):
+            separator = separators[i]
+            if not separator:
+                bounds = range(start, end + 1)  # Single characters
+                if chunk_size > 1:
+                    # A single character always fits, so skip the scan for oversized pieces
+                    lengths = bounds if measure is None else [measure(b) for b in bounds]
+                    merge(bounds, lengths, 0, end - start)
+                    return
+                break
+            positions = find(separator, start, end)
+            if positions:
+                # The separator starts each piece; only the first piece can be empty
+                bounds = ([start] if positions[0] > start else []) + positions + [end]
+                next_level = i + 1 if i + 1 < len(separators) else None
+                break
         
-        return text.strip()
+        lengths = bounds if measure is None else [measure(b) for b in bounds]
+        run_start = 0
+        for i in range(len(bounds) - 1):
+            if lengths[i + 1] - lengths[i] < chunk_size:
+                continue
+            if run_start < i:
+                merge(bounds, lengths, run_start, i)
+            if next_level is None:
+                spans.append((bounds[i], bounds[i + 1]))
+            else:
+                split(bounds[i], bounds[i + 1], next_level)
+            run_start = i + 1
+        if run_start < len(bounds) - 1:
+            merge(bounds, lengths, run_start, len(bounds) - 1)
+    
+    split(0, len(text), 0)
+    return spans
+
+
+def get_chunk_tokenizer():
+    """
+    Get the embedding model's fast tokenizer (singleton)
+    
+    Returns:
+        PreTrainedTokenizerFast: Tokenizer of EMBEDDING_MODEL_NAME
+    """
+    global _chunk_tokenizer
+    
+    with _chunk_tokenizer_lock:
+        if _chunk_tokenizer is None:
+            from transformers import AutoTokenizer
+            
+            tokenizer = AutoTokenizer.from_pretrained(config.EMBEDDING_MODEL_NAME, use_fast=True)
+            if not tokenizer.is_fast:
+                raise Exception(f"No fast tokenizer available for {config.EMBEDDING_MODEL_NAME}")
+            _chunk_tokenizer = tokenizer
+    
+    return _chunk_tokenizer
+
+
+def chunk_token_limit() -> int:
+    """
+    Get the number of text tokens that fit in one embedding model input
     
+    Returns:
+        int: EMBEDDING_MAX_TOKENS minus the special tokens the model adds
+    """
+    return config.EMBEDDING_MAX_TOKENS - get_chunk_tokenizer().num_special_tokens_to_add()
+
+
+def _token_measure(text: str) -> Callable[[int], int]:
+    """
+    Tokenize text once and return its cumulative token count by offset
+    
+    measure(offset) is the number of tokens starting before offset, so
+    the tokens of a span are measure(end) - measure(start). Chunks are cut
+    at whitespace or punctuation, where the tokenizer splits words anyway,
+    so this matches tokenizing each chunk on its own.
+    """
+    tokenizer = get_chunk_tokenizer()
+    with _chunk_tokenizer_lock:
+        encoding = tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            verbose=False  # The whole window is longer than the model limit
+        )
+    starts = [start for start, _ in encoding["offset_mapping"]]
+    return lambda offset: bisect.bisect_left(starts, offset)
+
+
+def _count_tokens_measure(text: str) -> Optional[Callable[[int], int]]:
+    """Token measure for reporting "chars" mode chunk sizes, if a tokenizer loads"""
+    global _token_counts_unavailable
+    
+    if _token_counts_unavailable:
+        return None
+    try:
+        return _token_measure(text)
     except Exception as e:
-        raise Exception(f"Error extracting text from PDF: {str(e)}")
+        _token_counts_unavailable = True
+        print(f"Chunk token counts unavailable: {str(e)}")
+        return None
+
+
+def _split_measured(text: str, count_tokens: bool) -> Tuple[List[Tuple[int, int]], Optional[Callable[[int], int]]]:
+    """
+    Chunk text in the configured CHUNK_LENGTH_UNIT
+    
+    Returns:
+        Tuple of the chunk spans and the token measure of text (None in
+        "chars" mode unless count_tokens is set and a tokenizer loads)
+    """
+    if config.CHUNK_LENGTH_UNIT == "tokens":
+        measure = _token_measure(text)
+        spans = split_spans(text, chunk_token_limit(), config.CHUNK_OVERLAP_TOKENS, measure=measure)
+        return spans, measure
+    
+    measure = _count_tokens_measure(text) if count_tokens else None
+    return split_spans(text), measure
 
 
 def chunk_text(text: str) -> List[str]:
@@ -46,20 +367,186 @@ def chunk_text(text: str) -> List[str]:
         List[str]: List of text chunks
     """
     try:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=config.CHUNK_SIZE,
-            chunk_overlap=config.CHUNK_OVERLAP,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
+        spans, _ = _split_measured(text, count_tokens=False)
+        return [text[start:end] for start, end in spans]
+    
+    except Exception as e:
+        raise Exception(f"Error chunking text: {str(e)}")
+
+
+def chunk_spans(text: str, count_tokens: bool = None) -> List[Dict[str, Any]]:
+    """
+    Split text into chunks and locate each chunk in the text
+    
+    Chunk lengths are measured in CHUNK_LENGTH_UNIT. In "tokens" mode
+    chunks are packed up to the embedding model's input limit, and their
+    token counts come for free. In "chars" mode counting tokens means
+    tokenizing the text, so it is only done when asked for.
+    
+    Args:
+        text: Input text to chunk
+        count_tokens: Count tokens in "chars" mode too (default
+            REPORT_CHUNK_TOKENS)
         
-        chunks = splitter.split_text(text)
+    Returns:
+        List of dicts with 'text', 'char_start' and 'char_end' (offsets
+        into text, end exclusive), plus 'tokens' (embedding tokenizer
+        count) when counted and the tokenizer is available
+    """
+    if count_tokens is None:
+        count_tokens = config.REPORT_CHUNK_TOKENS
+    
+    try:
+        spans, measure = _split_measured(text, count_tokens)
+        chunks = [
+            {"text": text[start:end], "char_start": start, "char_end": end}
+            for start, end in spans
+        ]
+        if measure is not None:
+            for chunk in chunks:
+                chunk["tokens"] = measure(chunk["char_end"]) - measure(chunk["char_start"])
         return chunks
     
     except Exception as e:
         raise Exception(f"Error chunking text: {str(e)}")
 
 
+def summarize_chunk_tokens(token_counts: List[int], limit: int = None) -> Dict[str, Any]:
+    """
+    Summarize the distribution of tokens per chunk
+    
+    Args:
+        token_counts: Embedding tokenizer count of each chunk
+        limit: Text tokens per model input (default chunk_token_limit())
+        
+    Returns:
+        Dict with 'chunks', 'min', 'p50', 'p90', 'p99', 'max', 'mean',
+        'limit', 'truncated' (chunks over the limit) and 'small' (chunks
+        under a quarter of the limit)
+    """
+    if limit is None:
+        limit = chunk_token_limit()
+    counts = sorted(token_counts)
+    if not counts:
+        return {"chunks": 0, "limit": limit}
+    
+    def percentile(q: float) -> int:
+        return counts[min(int(q * len(counts)), len(counts) - 1)]
+    
+    return {
+        "chunks": len(counts),
+        "min": counts[0],
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "max": counts[-1],
+        "mean": round(sum(counts) / len(counts), 1),
+        "limit": limit,
+        "truncated": len(counts) - bisect.bisect_right(counts, limit),
+        "small": bisect.bisect_left(counts, limit / 4)
+    }
+
+
+def iter_chunk_spans(
+    pages: Iterable[str],
+    window_size: int = None,
+    count_tokens: bool = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Chunk a stream of page texts, recording where each chunk came from
+    
+    Offsets refer to the document text "\n".join(pages), which is what
+    the document store keeps. Pages are buffered until roughly
+    `window_size` characters are available, the buffer is chunked, and
+    every chunk except the last is emitted. The last chunk may continue on
+    the next page, so the buffer restarts where it begins.
+    
+    Args:
+        pages: Iterable of page texts
+        window_size: Characters to buffer before chunking (default 8 chunks)
+        count_tokens: Count tokens in "chars" mode too (see chunk_spans)
+        
+    Yields:
+        Dict with 'text', 'char_start', 'char_end' (document offsets, end
+        exclusive), 'page' and 'page_end' (1-based pages the chunk spans),
+        and 'tokens' when known (see chunk_spans)
+    """
+    if window_size is None:
+        if config.CHUNK_LENGTH_UNIT == "tokens":
+            window_size = chunk_token_limit() * config.CHUNK_CHARS_PER_TOKEN * 8
+        else:
+            window_size = config.CHUNK_SIZE * 8
+    
+    page_starts = []   # Document offset of every page seen so far
+    buffer = ""
+    buffer_start = 0   # Document offset of buffer[0]
+    
+    def located(span: Dict[str, Any]) -> Dict[str, Any]:
+        span["char_start"] += buffer_start
+        span["char_end"] += buffer_start
+        span["page"] = bisect.bisect_right(page_starts, span["char_start"])
+        span["page_end"] = bisect.bisect_right(page_starts, span["char_end"] - 1)
+        return span
+    
+    for page in pages:
+        separator = "\n" if page_starts else ""
+        page_starts.append(buffer_start + len(buffer) + len(separator))
+        buffer += separator + page
+        if len(buffer) < window_size:
+            continue
+        
+        spans = chunk_spans(buffer, count_tokens)
+        for span in spans[:-1]:
+            yield located(span)
+        restart = spans[-1]["char_start"] if spans else len(buffer)
+        buffer = buffer[restart:]
+        buffer_start += restart
+    
+    for span in chunk_spans(buffer, count_tokens):
+        yield located(span)
+
+
+def iter_chunks(pages: Iterable[str], window_size: int = None) -> Iterator[str]:
+    """
+    Chunk a stream of page texts without materializing the whole document
+    
+    Args:
+        pages: Iterable of page texts
+        window_size: Characters to buffer before chunking (default 8 chunks)
+        
+    Yields:
+        str: Text chunks in document order
+    """
+    for span in iter_chunk_spans(pages, window_size):
+        yield span["text"]
+
+
+def compute_content_hash(pdf_bytes: bytes) -> str:
+    """
+    Compute a stable hash of the raw PDF bytes
+    
+    Args:
+        pdf_bytes: PDF file content
+        
+    Returns:
+        str: Hex SHA-256 digest identifying the document content
+    """
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def compute_chunk_hash(text: str) -> str:
+    """
+    Compute a stable hash of a chunk's text
+    
+    Args:
+        text: Chunk text
+        
+    Returns:
+        str: Hex SHA-256 digest identifying the chunk content
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 def validate_pdf_content(text: str) -> bool:
     """
     Validate that PDF has extractable text
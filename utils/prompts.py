@@ -8,6 +8,10 @@ Contains prompt templates for QA system
 from langchain_core.prompts import PromptTemplate
 
 
+# Bump whenever the QA prompt changes so cached answers are not reused
+PROMPT_VERSION = "1"
+
+
 def get_qa_prompt_template() -> PromptTemplate:
     """
     Get the QA prompt template for document-based question answering
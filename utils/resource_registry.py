@@ -0,0 +1,129 @@
+# Shared per-document resources
+"""
+Resource Registry Module
+Process-wide bounded LRU of reusable objects (vector stores, QA chains)
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class ResourceRegistry:
+    """
+    Thread-safe LRU of shared resources with entry and memory limits
+
+    Resources are created on first use and reused by every caller (and
+    every Streamlit session) afterwards. The least recently used entries
+    are evicted once there are more than max_entries of them or their
+    estimated size exceeds max_bytes. Sizes are measured when limits are
+    checked, so resources that grow in place are accounted for.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        max_bytes: int = 0,
+        size_fn: Optional[Callable[[Any], int]] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes  # 0 = no memory limit
+        self.size_fn = size_fn
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size(self, resource: Any) -> int:
+        return int(self.size_fn(resource)) if self.size_fn else 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Get the resource for a key, creating it on a miss
+
+        Args:
+            key: Resource key (e.g. pdf_id)
+            factory: Builds the resource when it is not registered yet
+
+        Returns:
+            The shared resource
+        """
+        with self._lock:
+            resource = self._entries.get(key)
+            if resource is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return resource
+            self.misses += 1
+
+        # Build outside the lock; if another thread won the race, use its resource
+        resource = factory()
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                return existing
+            self._entries[key] = resource
+            evicted = self._evict_over_limits(keep=key)
+
+        self._notify(evicted)
+        return resource
+
+    def _evict_over_limits(self, keep: Hashable) -> list:
+        """Pop LRU entries until within limits (caller holds the lock)"""
+        evicted = []
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or
+            (self.max_bytes and self._total_bytes() > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            evicted.append((key, self._entries.pop(key)))
+        self.evictions += len(evicted)
+        return evicted
+
+    def _total_bytes(self) -> int:
+        return sum(self._size(resource) for resource in self._entries.values())
+
+    def _notify(self, evicted: list):
+        if self.on_evict:
+            for key, resource in evicted:
+                self.on_evict(key, resource)
+
+    def evict(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Drop every resource whose key matches the predicate
+
+        Args:
+            predicate: Called with each key
+
+        Returns:
+            int: Number of resources removed
+        """
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            evicted = [(key, self._entries.pop(key)) for key in stale]
+
+        self._notify(evicted)
+        return len(evicted)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes(),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions
+            }